@@ -638,7 +638,6 @@ function AppWrapper() {
   const [messagePagination, setMessagePagination] = useState({
     next: null,
     previous: null,
-    count: 0,
     currentPage: 1,
     pageSize: 30
   });
@@ -692,6 +691,36 @@ function AppWrapper() {
     }
   }, []);
 
+  // 글로벌 소켓 구독 토픽: 서버 통계, 방 목록, 화면에 보이는 방들의 인원수
+  const wantedTopicsRef = useRef(new Set());
+  const subscribedTopicsRef = useRef(new Set());
+
+  const syncTopicSubscriptions = useCallback(() => {
+    const ws = globalSocketRef.current;
+    if (!ws || ws.readyState !== WebSocket.OPEN) return;
+
+    const wanted = wantedTopicsRef.current;
+    const subscribed = subscribedTopicsRef.current;
+    const added = [...wanted].filter(topic => !subscribed.has(topic));
+    const removed = [...subscribed].filter(topic => !wanted.has(topic));
+    if (added.length) {
+      ws.send(JSON.stringify({ type: 'subscribe', topics: added }));
+    }
+    if (removed.length) {
+      ws.send(JSON.stringify({ type: 'unsubscribe', topics: removed }));
+    }
+    subscribedTopicsRef.current = new Set(wanted);
+  }, []);
+
+  useEffect(() => {
+    wantedTopicsRef.current = new Set([
+      'stats',
+      'directory',
+      ...[...rooms, ...myRooms].map(room => `room_members.${room.id}`),
+    ]);
+    syncTopicSubscriptions();
+  }, [rooms, myRooms, syncTopicSubscriptions]);
+
   const connectGlobalSocket = useCallback((user) => {
     // 이전 연결이 있으면 닫고 참조를 해제하여 핸들러 누적을 막습니다.
     if (globalSocketRef.current) {
@@ -703,10 +732,15 @@ function AppWrapper() {
     ws.onopen = () => {
       console.log('글로벌 WebSocket 연결됨');
       globalSocketRef.current = ws;
+      subscribedTopicsRef.current = new Set();
+      syncTopicSubscriptions();
     };
     ws.onmessage = (event) => {
       const data = JSON.parse(event.data);
-      if (data.type === 'unread_count_update') {
+      if (data.type === 'ping') {
+        // 서버 하트비트 응답 (응답이 없으면 서버가 연결을 끊음)
+        ws.send(JSON.stringify({ type: 'pong' }));
+      } else if (data.type === 'unread_count_update') {
         
         setMyRooms(prevRooms => 
           prevRooms.map(room => 
@@ -766,7 +800,7 @@ function AppWrapper() {
     ws.onerror = (error) => {
       console.error('글로벌 WebSocket 오류:', error);
     };
-  }, []); 
+  }, [syncTopicSubscriptions]); 
 
   const disconnectGlobalSocket = useCallback(() => {
     if (globalSocketRef.current) {
@@ -1096,7 +1130,6 @@ function AppWrapper() {
           setMessagePagination({
             next: messagesResponse.data.next,
             previous: messagesResponse.data.previous,
-            count: messagesResponse.data.count,
             currentPage: 1,
             pageSize: 30
           });
@@ -1133,7 +1166,9 @@ function AppWrapper() {
         };
         ws.onmessage = (event) => {
           const data = JSON.parse(event.data);
-          if (data.type === 'messages_read_count_update') {
+          if (data.type === 'ping') {
+            ws.send(JSON.stringify({ type: 'pong' }));
+          } else if (data.type === 'messages_read_count_update') {
             handleMessagesReadCountUpdate(data.updated_messages, data.reader_username);
           } else if (data.type === 'chat') {
             handleChatMessage(data);
@@ -14,7 +14,7 @@ class ChatRoomAdmin(admin.ModelAdmin):
     list_display = ['id', 'name', 'description','is_active', 'created_at']
     list_filter = ['is_active', 'is_private', 'created_at']
     search_fields = ['name', 'description']
-    readonly_fields = ['created_at', 'updated_at','total_messages']
+    readonly_fields = ['created_at', 'updated_at','total_messages', 'last_seq', 'member_count', 'last_message', 'last_message_at']
     
     fieldsets = (
         ('기본 정보', {
@@ -24,7 +24,7 @@ class ChatRoomAdmin(admin.ModelAdmin):
             'fields': ('is_active', 'is_private', 'password', 'max_members')
         }),
         ('통계', {
-            'fields': ('total_messages',), 
+            'fields': ('total_messages', 'last_seq', 'member_count', 'last_message', 'last_message_at'), 
             'classes': ('collapse',)
         }),
         ('날짜', {
@@ -36,9 +36,9 @@ class ChatRoomAdmin(admin.ModelAdmin):
 
 @admin.register(RoomMember)
 class RoomMemberAdmin(admin.ModelAdmin):
-    list_display = ['id', 'user', 'room', 'is_admin', 'joined_at', 'last_seen', 'is_currently_in_room', 'last_read_message']
+    list_display = ['id', 'user', 'room', 'is_admin', 'joined_at', 'last_seen', 'last_read_seq']
     list_filter = ['is_admin', 'joined_at']
-    search_fields = ['user__username', 'room__name', 'nickname', 'joined_at', 'last_seen', 'is_currently_in_room', 'last_read_message']
+    search_fields = ['user__username', 'room__name', 'nickname', 'joined_at', 'last_seen']
 
 
 @admin.register(ChatMessage)
@@ -46,7 +46,7 @@ class ChatMessageAdmin(admin.ModelAdmin):
     list_display = ['id', 'user', 'room', 'content_preview', 'message_type', 'file_info', 'created_at']
     list_filter = ['message_type', 'is_deleted', 'created_at', 'room']
     search_fields = ['user__username', 'room__name', 'content', 'file_name']
-    readonly_fields = ['created_at', 'edited_at', 'file_size_human']
+    readonly_fields = ['created_at', 'edited_at', 'file_size_human', 'seq', 'like_count', 'good_count', 'check_count']
     ordering = ['-created_at']
     
     fieldsets = (
@@ -68,10 +68,15 @@ class ChatMessageAdmin(admin.ModelAdmin):
             'description': '다른 메시지에 대한 답장인 경우 설정됩니다.'
         }),
         ('읽음 상태', {
-            'fields': ('unread_count', 'total_members_at_time'),
+            'fields': ('seq', 'unread_count', 'total_members_at_time'),
             'classes': ('collapse',),
             'description': '메시지 읽음 상태 관련 정보입니다.'
         }),
+        ('반응', {
+            'fields': ('like_count', 'good_count', 'check_count'),
+            'classes': ('collapse',),
+            'description': '반응 유형별 개수입니다. (repair_reaction_counts 명령으로 재계산)'
+        }),
         ('메타 정보', {
             'fields': ('is_deleted', 'created_at', 'edited_at'),
             'classes': ('collapse',),
@@ -0,0 +1,89 @@
+from django.conf import settings
+from django.utils import timezone
+
+from chat.protocol import encode_json, encode_msgpack
+
+# 그룹 이벤트 → 클라이언트 프레임 변환
+# 미리 인코딩 모드에서는 보내는 쪽이 한 번만 변환/인코딩하고, 꺼져 있으면 받는 Consumer가 각자 변환
+
+
+def chat_frame(event):
+    return {
+        "message": event["message"],
+        "username": event["username"],
+        "type": "chat",
+        "message_id": event.get("message_id"),
+        "unread_count": event.get("unread_count", 0),
+        "is_read_by_all": event.get("is_read_by_all", True),
+        "user_id": event.get("user_id"),
+        # 저장된 작성 시각 (이전 이벤트 형식이면 현재 시각)
+        "timestamp": event.get("created_at") or timezone.now().isoformat(),
+    }
+
+
+def system_frame(event):
+    return {
+        "message": event["message"],
+        "username": event["username"],
+        "type": "system",
+        "message_id": event.get("message_id"),
+        "timestamp": event.get("created_at"),
+    }
+
+
+def read_count_frame(event):
+    return {
+        "type": "messages_read_count_update",
+        "updated_messages": event["updated_messages"],
+        "reader_username": event.get("reader_username"),
+    }
+
+
+def reaction_frame(event):
+    return {
+        "type": "reaction_update",
+        "message_id": event["message_id"],
+        "action": event["action"],
+        "reaction_type": event["reaction_type"],
+        "reaction_counts": event["reaction_counts"],
+        "user": event["user"],
+    }
+
+
+def file_frame(event):
+    return {
+        "type": "file",
+        "message_id": event["message_id"],
+        "username": event["username"],
+        "user_id": event["user_id"],
+        "file_name": event["file_name"],
+        "file_size": event["file_size"],
+        "file_size_human": event["file_size_human"],
+        "file_url": event["file_url"],
+        "message_type": event["message_type"],
+        "timestamp": event["timestamp"],
+        "content": event.get("content"),
+        "is_image": event["is_image"],
+    }
+
+
+FRAME_BUILDERS = {
+    "chat_message": chat_frame,
+    "system_message": system_frame,
+    "messages_read_count_update": read_count_frame,
+    "reaction_update": reaction_frame,
+    "file_message": file_frame,
+}
+
+
+async def group_send(channel_layer, group, event):
+    """
+    그룹 브로드캐스트 (BROADCAST_PREENCODED가 켜져 있으면 미리 인코딩한 프레임 전송)
+    받는 Consumer는 인코딩된 프레임을 그대로 전달하므로 수신자 수만큼 직렬화하지 않음
+    JSON 텍스트와 msgpack 바이너리를 브로드캐스트당 한 번씩 인코딩해 이벤트 하나로 보내고,
+    각 연결은 협상한 형식만 골라 전송 (채널 레이어 전송은 브로드캐스트당 한 번)
+    """
+    if getattr(settings, "BROADCAST_PREENCODED", True) and event["type"] in FRAME_BUILDERS:
+        frame = FRAME_BUILDERS[event["type"]](event)
+        event = {"type": "encoded_frame", "text": encode_json(frame), "bytes": encode_msgpack(frame)}
+    await channel_layer.group_send(group, event)
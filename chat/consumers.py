@@ -1,38 +1,67 @@
-from django.utils import timezone
-import json
+import asyncio
 from channels.generic.websocket import AsyncWebsocketConsumer
 from channels.db import database_sync_to_async
+from django.conf import settings
 from django.contrib.auth.models import User
 from .models import ChatMessage, ChatRoom, RoomMember
-from chat.models import PushSubscription
-from chat.utils import send_web_push
+from chat import broadcast, presence, replay, topics
+from chat.ingest import broadcast_unread_counts, message_ingestor
+from chat.messages import create_message
+from chat.protocol import FrameProtocolMixin
+from chat.receipts import as_read_updates, mark_read
 
 
-class ChatConsumer(AsyncWebsocketConsumer):
+class ChatConsumer(FrameProtocolMixin, AsyncWebsocketConsumer):
     """
     실시간 채팅 WebSocket Consumer
     메시지 송수신, 입퇴장 알림, 읽음 처리를 담당
     """
     
     async def connect(self):
-        """WebSocket 연결 설정"""
+        """WebSocket 연결 설정 (방, 사용자 정보는 연결 시 한 번만 조회해 재사용)"""
         self.room_id = self.scope["url_route"]["kwargs"]["room_id"]
         self.room_group_id = f"chat_{self.room_id}"
         self.username = None
+        self.user = None
+        self.present = False
+
+        self.room = await self.load_room()
+        if self.room is None:
+            await self.close()
+            return
+
+        scope_user = self.scope.get("user")
+        if scope_user is not None and scope_user.is_authenticated:
+            await self.resolve_identity(scope_user.username)
 
         await self.channel_layer.group_add(self.room_group_id, self.channel_name)
-        await self.accept()
+        await self.accept_frames()
 
     async def disconnect(self, close_code):
         """WebSocket 연결 해제"""
-        if hasattr(self, 'username') and self.username:
+        if getattr(self, 'present', False):
+            await self.update_online_status(False)
+        if hasattr(self, 'room_group_id'):
+            await self.channel_layer.group_discard(self.room_group_id, self.channel_name)
+        await self.stop_frames()
+
+    async def resolve_identity(self, username):
+        """프레임의 사용자 이름에 해당하는 사용자를 조회 (같은 사용자면 캐시 재사용)"""
+        if not username:
+            return self.user
+        if self.user is None or self.user.username != username:
+            # 다른 사용자로 바뀌면 이전 사용자의 접속 상태부터 정리
             await self.update_online_status(False)
-        await self.channel_layer.group_discard(self.room_group_id, self.channel_name)
+            self.user = await self.load_user(username)
+            self.username = username if self.user else None
+        return self.user
 
-    async def receive(self, text_data):
-        """클라이언트로부터 메시지 수신 처리"""
+    async def receive(self, text_data=None, bytes_data=None):
+        """클라이언트로부터 메시지 수신 처리 (JSON 텍스트 또는 msgpack 바이너리)"""
         try:
-            data = json.loads(text_data)
+            data = await self.admit_frame(text_data, bytes_data)
+            if data is None:
+                return
             username = data.get("username")
             message_type = data.get("type")
             
@@ -41,19 +70,21 @@ class ChatConsumer(AsyncWebsocketConsumer):
             elif message_type == 'user_leave':
                 await self.handle_user_leave(username)
             elif message_type == 'text':
-                await self.handle_text_message(username, data.get("message", ""))
+                await self.handle_text_message(username, data.get("message", ""), data.get("client_id"))
             elif message_type == 'mark_read':
                 await self.handle_mark_read(username, data.get('message_id'))
+            elif message_type == 'resume':
+                await self.handle_resume(data.get('last_message_id'))
                 
-        except json.JSONDecodeError:
-            print("JSON 파싱 오류")
         except Exception as e:
             print(f"메시지 처리 오류: {e}")
 
     # 메시지 타입별 핸들러
     async def handle_user_join(self, username):
         """사용자 입장 처리"""
-        self.username = username
+        if not await self.resolve_identity(username):
+            return
+        await self.ensure_membership()
         await self.update_online_status(True)
         
         # 기존 메시지들의 읽음 수 업데이트
@@ -61,21 +92,13 @@ class ChatConsumer(AsyncWebsocketConsumer):
         
         try:
             # 입장 메시지 전송
-            message = f"{username}님이 입장했습니다."
-            await self.save_message(username, message, "system")
-            await self.channel_layer.group_send(
-                self.room_group_id, 
-                {
-                    "type": "system_message", 
-                    "message": message, 
-                    "username": username
-                }
-            )
+            await self.send_system_message(username, f"{username}님이 입장했습니다.")
             print(f"입장 메시지 브로드캐스트 완료")
             
             # 기존 메시지 읽음 수 업데이트 알림
             if updated_messages:
-                await self.channel_layer.group_send(
+                await broadcast.group_send(
+                    self.channel_layer,
                     self.room_group_id,
                     {
                         "type": "messages_read_count_update",
@@ -92,284 +115,218 @@ class ChatConsumer(AsyncWebsocketConsumer):
 
     async def handle_user_leave(self, username):
         """사용자 퇴장 처리"""
-        message = f"{username}님이 퇴장했습니다."
-        await self.save_message(username, message, "system")
-        await self.channel_layer.group_send(
-            self.room_group_id, 
-            {
-                "type": "system_message", 
-                "message": message, 
-                "username": username
-            }
-        )
+        if not await self.resolve_identity(username):
+            return
+        await self.send_system_message(username, f"{username}님이 퇴장했습니다.")
+
+    async def send_system_message(self, username, message):
+        """시스템 메시지 저장 후 재전송 버퍼에 기록하고 방에 브로드캐스트"""
+        system_message = await self.save_message(message, "system")
+        event = {
+            "type": "system_message",
+            "message": message,
+            "username": username,
+            "message_id": system_message.id,
+            "created_at": system_message.created_at.isoformat()
+        }
+        try:
+            await replay.arecord(self.room.id, [broadcast.system_frame(event)])
+        except Exception as e:
+            print(f"재전송 버퍼 기록 오류: {e}")
+        await broadcast.group_send(self.channel_layer, self.room_group_id, event)
+
+    async def handle_text_message(self, username, message, client_id=None):
+        """텍스트 메시지 처리 (방별 배치 저장기에 넘기고, 저장되면 전송자에게 확인 응답)"""
+        if not await self.resolve_identity(username):
+            return
+        # 브로드캐스트, 읽음/안읽은 수 알림, 푸시 등록은 배치 단위로 저장기가 처리
+        message_data = await message_ingestor.submit(self.room.id, self.user, message, "text")
 
-    async def handle_text_message(self, username, message):
-        """텍스트 메시지 처리"""
-        self.username = username
-        message_data = await self.save_message_with_read_info(username, message, "text")
-        
         if message_data:
-            # 채팅방 내 메시지 브로드캐스트
-            await self.channel_layer.group_send(
-                self.room_group_id, 
-                {
-                    "type": "chat_message", 
-                    "message": message, 
-                    "username": username,
-                    "message_id": message_data['id'],
-                    "unread_count": message_data['unread_count'],
-                    "is_read_by_all": message_data['is_read_by_all'],
-                    "user_id": message_data['user_id']
-                }
-            )
-            
-            # 전체 안읽은 메시지 수 업데이트 브로드캐스트
-            await self.broadcast_unread_counts_update()
-            user = await database_sync_to_async(User.objects.get)(username=username)
-            room = await database_sync_to_async(ChatRoom.objects.get)(id=self.room_id)
-            await send_push_to_offline_members(room, user, message)
+            await self.send_frame({
+                "type": "message_ack",
+                "client_id": client_id,
+                "message_id": message_data["id"],
+                "seq": message_data["seq"],
+                "created_at": message_data["created_at"],
+            })
 
     async def handle_mark_read(self, username, message_id):
         """읽음 처리"""
-        if message_id:
-            await self.mark_message_read(username, message_id)
+        if message_id and await self.resolve_identity(username):
+            changed = await self.mark_message_read(message_id)
+            if changed:
+                await broadcast.group_send(
+                    self.channel_layer,
+                    self.room_group_id,
+                    {
+                        "type": "messages_read_count_update",
+                        "updated_messages": as_read_updates(changed),
+                        "reader_username": username
+                    }
+                )
 
-    # WebSocket 이벤트 핸들러
+    async def handle_resume(self, last_message_id):
+        """
+        재연결 후 놓친 메시지 재전송 (last_message_id 이후, ID 순)
+        방 링 버퍼가 그 지점부터 덮고 있으면 메모리에서, 더 오래된 공백이면 DB에서 최대 REPLAY_DB_LIMIT건
+        재연결 직후 받은 실시간 메시지와 겹칠 수 있으므로 클라이언트는 message_id로 중복 제거
+        인증된 방 멤버에게만, 입장 이후 메시지만 재전송 (GetMessageAPIView와 같은 범위)
+        """
+        try:
+            last_message_id = int(last_message_id)
+        except (TypeError, ValueError):
+            return
+
+        joined_at = await self.load_joined_at()
+        if joined_at is None:
+            await self.send_frame({"type": "resume_rejected", "reason": "not_member"})
+            return
+
+        frames = None
+        try:
+            frames = await replay.aread_since(self.room.id, last_message_id)
+        except Exception as e:
+            print(f"재전송 버퍼 조회 오류: {e}")
+
+        source, truncated = "buffer", False
+        if frames is None:
+            source = "database"
+            frames, truncated = await self.load_missed_frames(last_message_id, joined_at)
+        else:
+            frames = replay.since_joined(frames, joined_at)
+
+        for frame in frames:
+            await self.send_frame_waiting(frame)
+        # truncated면 남은 메시지는 REST 히스토리로 다시 불러와야 함
+        await self.send_frame({
+            "type": "resume_complete",
+            "source": source,
+            "count": len(frames),
+            "truncated": truncated,
+        })
+
+    # WebSocket 이벤트 핸들러 (미리 인코딩된 프레임은 FrameProtocolMixin.encoded_frame이 처리)
     async def chat_message(self, event):
         """채팅 메시지 전송"""
-        await self.send(text_data=json.dumps({
-            "message": event["message"], 
-            "username": event["username"],
-            "type": "chat",
-            "message_id": event.get("message_id"),
-            "unread_count": event.get("unread_count", 0),
-            "is_read_by_all": event.get("is_read_by_all", True),
-            "user_id": event.get("user_id"),
-            "timestamp": timezone.now().isoformat()
-        }))
+        await self.send_frame(broadcast.chat_frame(event))
     
     async def system_message(self, event):
         """시스템 메시지 전송"""
-        await self.send(text_data=json.dumps({
-            "message": event["message"], 
-            "username": event["username"],
-            "type": "system"
-        }))
+        await self.send_frame(broadcast.system_frame(event))
 
     async def messages_read_count_update(self, event):
         """메시지 읽음 수 업데이트 전송"""
-        await self.send(text_data=json.dumps({
-            "type": "messages_read_count_update",
-            "updated_messages": event["updated_messages"],
-            "reader_username": event.get("reader_username")
-        }))
+        await self.send_frame(broadcast.read_count_frame(event))
     
     async def reaction_update(self, event):
         """메시지 리액션 업데이트 전송"""
-        await self.send(text_data=json.dumps({
-            'type': 'reaction_update',
-            'message_id': event['message_id'],
-            'action': event['action'],
-            'reaction_type': event['reaction_type'],
-            'reaction_counts': event['reaction_counts'],
-            'user': event['user']
-        }))
+        await self.send_frame(broadcast.reaction_frame(event))
         
     async def file_message(self, event):
         """파일 메시지 전송"""
-        await self.send(text_data=json.dumps({
-            'type': 'file',
-            'message_id': event['message_id'],
-            'username': event['username'],
-            'user_id': event['user_id'],
-            'file_name': event['file_name'],
-            'file_size': event['file_size'],
-            'file_size_human': event['file_size_human'],
-            'file_url': event['file_url'],
-            'message_type': event['message_type'],
-            'timestamp': event['timestamp'],
-            'content': event.get('content'),
-            'is_image': event['is_image']
-        }))
-
-    # 데이터베이스 작업
-    @database_sync_to_async
-    def save_message(self, username, message, message_type):
-        """기본 메시지 저장"""
-        try:
-            user = User.objects.get(username=username)
-            room = ChatRoom.objects.get(id=self.room_id)
-            return ChatMessage.objects.create(
-                room=room,
-                user=user,
-                content=message,
-                message_type=message_type
-            )
-        except (User.DoesNotExist, ChatRoom.DoesNotExist):
-            return None
-    
-    @database_sync_to_async
-    def save_message_with_read_info(self, username, message, message_type):
-        """메시지 저장 + 실시간 접속자 읽음 처리"""
-        try:
-            user = User.objects.get(username=username)
-            room = ChatRoom.objects.get(id=self.room_id)
-            
-            # 메시지 생성
-            chat_message = ChatMessage.objects.create(
-                room=room,
-                user=user,
-                content=message,
-                message_type=message_type
-            )
-
-            # 현재 온라인인 모든 멤버를 자동 읽음 처리
-            online_members = RoomMember.objects.filter(
-                room=room, 
-                is_currently_in_room=True
-            )
-
-            for member in online_members:
-                chat_message.mark_as_read_by(member.user)
-        
-            # 업데이트된 정보 반환
-            chat_message.refresh_from_db()
-            return {
-                'id': chat_message.id,
-                'unread_count': chat_message.unread_count,
-                'is_read_by_all': chat_message.is_read_by_all,
-                'user_id': user.id
-            }
-        except Exception as e:
-            print(f"메시지 저장 오류: {e}")
+        await self.send_frame(broadcast.file_frame(event))
+
+    async def room_deactivated(self, event):
+        """방 비활성화 시 캐시를 비우고 연결 종료"""
+        self.room = None
+        self.username = None
+        await self.close()
+
+    async def member_left(self, event):
+        """방에서 나간 사용자면 접속 상태를 정리하고 사용자 캐시를 비움 (다시 입장해야 활동 가능)"""
+        if self.user is not None and self.user.id == event["user_id"]:
+            await self.update_online_status(False)
+            self.user = None
+            self.username = None
+
+    # 데이터베이스 작업 (단순 조회/생성은 비동기 ORM, raw SQL 서비스만 스레드에서 실행)
+    async def load_room(self):
+        """연결 대상 활성 채팅방 조회"""
+        return await ChatRoom.objects.filter(id=self.room_id, is_active=True).afirst()
+
+    async def load_user(self, username):
+        """프레임의 사용자 이름으로 사용자 조회"""
+        return await User.objects.filter(username=username).afirst()
+
+    async def ensure_membership(self):
+        """입장 프레임을 보낸 사용자가 멤버가 아니면 생성 (읽음 위치는 연결 시점이 아닌 현재 방의 마지막 seq)"""
+        if await RoomMember.objects.filter(room_id=self.room.id, user_id=self.user.id).aexists():
+            return
+        last_seq = await ChatRoom.objects.filter(id=self.room.id).values_list("last_seq", flat=True).afirst()
+        await RoomMember.objects.aget_or_create(
+            room_id=self.room.id, user_id=self.user.id, defaults={"last_read_seq": last_seq or 0}
+        )
+
+    async def load_joined_at(self):
+        """연결의 인증 사용자가 이 방 멤버면 입장 시각, 아니면 None (프레임의 username은 신뢰하지 않음)"""
+        scope_user = self.scope.get("user")
+        if scope_user is None or not scope_user.is_authenticated:
             return None
+        return await RoomMember.objects.filter(
+            room_id=self.room.id, user_id=scope_user.id
+        ).values_list("joined_at", flat=True).afirst()
+
+    async def load_missed_frames(self, last_message_id, joined_at):
+        """링 버퍼보다 오래된 공백의 입장 이후 메시지를 DB에서 조회 (프레임 목록, 잘렸는지 여부)"""
+        limit = getattr(settings, "REPLAY_DB_LIMIT", 200)
+        messages = ChatMessage.objects.filter(
+            room_id=self.room.id, id__gt=last_message_id, is_deleted=False, created_at__gte=joined_at
+        ).select_related("user").order_by("id")[:limit + 1]
+        frames = [replay.message_frame(message) async for message in messages]
+        return frames[:limit], len(frames) > limit
 
     @database_sync_to_async
-    def update_existing_messages_read_count(self):
+    def save_message(self, message, message_type):
+        """기본 메시지 저장 (입장/퇴장 시스템 메시지, DB 왕복 1회)"""
+        return create_message(self.room.id, self.user, message, message_type)
+    
+    async def update_existing_messages_read_count(self):
         """기존 메시지들의 읽음 수 재계산 (사용자 입장 시)"""
-        try:
-            room = ChatRoom.objects.get(id=self.room_id)
-            
-            # 최근 메시지들만 처리 (성능 최적화)
-            recent_messages = ChatMessage.objects.filter(
-                room=room,
-                is_deleted=False,
-                message_type__in=['text', 'file', 'image']
-            ).order_by('-created_at')[:50]
-            
-            # 현재 온라인 멤버들
-            online_members = RoomMember.objects.filter(
-                room=room, 
-                is_currently_in_room=True
-            )
-            
-            updated_messages = []
-            
-            for message in recent_messages:
-                # 온라인 멤버들을 읽음 처리
-                for member in online_members:
-                    message.mark_as_read_by(member.user)
-                
-                # 업데이트된 정보 수집
-                message.refresh_from_db()
-                updated_messages.append({
-                    'id': message.id,
-                    'unread_count': message.unread_count,
-                    'is_read_by_all': message.is_read_by_all
-                })
-            
-            return updated_messages
-            
-        except ChatRoom.DoesNotExist:
-            return []
+        # 현재 온라인 멤버들을 방의 마지막 메시지까지 한 번에 읽음 처리
+        online_user_ids = await presence.aonline_user_ids(self.room_id)
+        changed = await database_sync_to_async(mark_read)(self.room.id, online_user_ids)
+        return as_read_updates(changed)
 
-    @database_sync_to_async
-    def mark_message_read(self, username, message_id):
+    async def mark_message_read(self, message_id):
         """특정 메시지 읽음 처리"""
-        try:
-            user = User.objects.get(username=username)
-            message = ChatMessage.objects.get(id=message_id)
-            message.mark_as_read_by(user)
-        except (User.DoesNotExist, ChatMessage.DoesNotExist):
-            pass
+        seq = await ChatMessage.objects.filter(
+            id=message_id, room_id=self.room_id
+        ).values_list('seq', flat=True).afirst()
+        if seq is None:
+            return []
+        return await database_sync_to_async(mark_read)(self.room.id, [self.user.id], up_to_seq=seq)
     
-    @database_sync_to_async
-    def update_online_status(self, is_online):
-        """온라인 상태 업데이트"""
-        if not hasattr(self, 'username') or not self.username:
+    async def update_online_status(self, is_online):
+        """접속 상태 업데이트 (Redis 접속자 레지스트리, DB 쓰기 없음)"""
+        if self.user is None:
             return
         
-        try:
-            user = User.objects.get(username=self.username)
-            room = ChatRoom.objects.get(id=self.room_id)
-            member, created = RoomMember.objects.get_or_create(room=room, user=user)
-            member.is_currently_in_room = is_online
-            member.last_seen = timezone.now()
-            member.save()
-        except (User.DoesNotExist, ChatRoom.DoesNotExist):
-            pass
+        if is_online and not self.present:
+            await presence.join(self.room_id, self.user.id)
+            self.present = True
+        elif not is_online and self.present:
+            self.present = False
+            await presence.leave(self.room_id, self.user.id)
+
+    async def on_heartbeat(self):
+        """클라이언트 응답이 확인된 ping 주기마다 접속 만료 시각 연장 (끊긴 연결은 만료 후 정리 작업이 제거)"""
+        if self.present:
+            await presence.heartbeat(self.room_id, self.user.id)
 
     async def broadcast_unread_counts_update(self):
         """전체 안읽은 메시지 수 업데이트 브로드캐스트"""
         try:
-            # 현재 방의 모든 멤버들의 안읽은 메시지 수 계산
-            room_unread_data = await self.get_room_unread_counts()
-            print("broadcast_unread_counts_update 호출됨")  # 로그 추가
-            # 각 사용자별로 개별 브로드캐스트 (user_id 사용)
-            for user_data in room_unread_data:
-                print("unread_count_update 전송:", user_data)  # 로그 추가
-                await self.channel_layer.group_send(
-                    f"user_{user_data['user_id']}_global",
-                    {
-                        "type": "unread_count_update",
-                        "room_id": self.room_id,
-                        "unread_count": user_data['unread_count']
-                    }
-                )
+            await broadcast_unread_counts(self.room.id)
         except Exception as e:
             print(f"안읽은 메시지 수 브로드캐스트 오류: {e}")
 
-    @database_sync_to_async
-    def get_room_unread_counts(self):
-        """방의 모든 멤버들의 안읽은 메시지 수 계산"""
-        try:
-            from datetime import datetime
-            
-            room = ChatRoom.objects.get(id=self.room_id)
-            members = RoomMember.objects.filter(room=room).select_related('user', 'last_read_message')
-            
-            unread_data = []
-            for member in members:
-                last_read_time = (
-                    member.last_read_message.created_at 
-                    if member.last_read_message 
-                    else timezone.make_aware(datetime.min)
-                )
-                
-                unread_count = ChatMessage.objects.filter(
-                    room=room,
-                    created_at__gt=last_read_time,
-                    message_type__in=['text', 'file', 'image'],
-                    user__isnull=False,
-                    is_deleted=False,
-                ).count()
-                
-                unread_data.append({
-                    'username': member.user.username,
-                    'user_id': member.user.id,
-                    'unread_count': unread_count
-                })
-            
-            return unread_data
-        except Exception as e:
-            print(f"안읽은 메시지 수 계산 오류: {e}")
-            return []
-
 
-class GlobalNotificationConsumer(AsyncWebsocketConsumer):
+class GlobalNotificationConsumer(FrameProtocolMixin, AsyncWebsocketConsumer):
     """
     전역 알림 WebSocket Consumer
     방 목록 페이지에서 안읽은 메시지 수를 실시간으로 업데이트
+    방 생성/인원수/온라인 수 이벤트는 클라이언트가 구독한 토픽(chat.topics)으로만 수신
     """
     
     async def connect(self):
@@ -383,10 +340,11 @@ class GlobalNotificationConsumer(AsyncWebsocketConsumer):
         # 사용자별 글로벌 그룹에 참가 (user_id 사용)
         self.user_group_name = f"user_{self.user_id}_global"
         
+        self.topic_groups = {}
+
         await self.channel_layer.group_add(self.user_group_name, self.channel_name)
-        await self.channel_layer.group_add("global", self.channel_name)  # 단일 그룹 추가
 
-        await self.accept()
+        await self.accept_frames()
         
         # 연결 즉시 현재 안읽은 메시지 수 전송
         await self.send_current_unread_counts()
@@ -395,117 +353,106 @@ class GlobalNotificationConsumer(AsyncWebsocketConsumer):
         """WebSocket 연결 해제"""
         if hasattr(self, 'user_group_name'):
             await self.channel_layer.group_discard(self.user_group_name, self.channel_name)
-            await self.channel_layer.group_discard("global", self.channel_name)
+            await self.unsubscribe(list(self.topic_groups))
+        await self.stop_frames()
 
-    async def receive(self, text_data):
-        """클라이언트 메시지 수신 (필요 시 확장 가능)"""
-        try:
-            data = json.loads(text_data)
-            if data.get("type") == "refresh_unread_counts":
-                await self.send_current_unread_counts()
-        except json.JSONDecodeError:
-            pass
+    async def receive(self, text_data=None, bytes_data=None):
+        """클라이언트 메시지 수신 (필요 시 확장 가능, 해석할 수 없는 프레임은 admit_frame이 걸러냄)"""
+        data = await self.admit_frame(text_data, bytes_data)
+        if data is None:
+            return
+        message_type = data.get("type")
+        if message_type == "refresh_unread_counts":
+            await self.send_current_unread_counts()
+        elif message_type == "subscribe":
+            await self.subscribe(data.get("topics") or [])
+        elif message_type == "unsubscribe":
+            await self.unsubscribe(data.get("topics") or [])
+
+    async def subscribe(self, requested):
+        """토픽 구독 (알 수 없는 토픽은 무시, 연결당 최대 GLOBAL_MAX_TOPICS개)"""
+        if not isinstance(requested, list):
+            return
+        max_topics = getattr(settings, "GLOBAL_MAX_TOPICS", 500)
+        added = {}
+        for topic in requested:
+            group = topics.group_name(topic)
+            if group is None or topic in self.topic_groups or topic in added:
+                continue
+            if len(self.topic_groups) + len(added) >= max_topics:
+                break
+            added[topic] = group
+
+        await asyncio.gather(*(
+            self.channel_layer.group_add(group, self.channel_name) for group in added.values()
+        ))
+        self.topic_groups.update(added)
+        await self.send_frame({"type": "subscribed", "topics": list(added)})
+
+    async def unsubscribe(self, requested):
+        """토픽 구독 해제"""
+        if not isinstance(requested, list):
+            return
+        removed = [topic for topic in set(map(str, requested)) if topic in self.topic_groups]
+        await asyncio.gather(*(
+            self.channel_layer.group_discard(self.topic_groups.pop(topic), self.channel_name)
+            for topic in removed
+        ))
 
     async def unread_count_update(self, event):
         """안읽은 메시지 수 업데이트 전송"""
-        await self.send(text_data=json.dumps({
+        await self.send_frame({
             "type": "unread_count_update",
             "room_id": event["room_id"],
             "unread_count": event["unread_count"]
-        }))
+        })
 
     async def send_current_unread_counts(self):
         """현재 모든 방의 안읽은 메시지 수 전송"""
         try:
             unread_counts = await self.get_all_unread_counts()
-            await self.send(text_data=json.dumps({
+            await self.send_frame({
                 "type": "all_unread_counts",
                 "unread_counts": unread_counts
-            }))
+            })
         except Exception as e:
             print(f"전체 안읽은 메시지 수 전송 오류: {e}")
 
     async def room_created(self, event):
-        await self.send(text_data=json.dumps({
+        await self.send_frame({
             "type": "room_created",
             "room": event["room"]
-        }))
+        })
 
     async def online_stats(self, event):
-        await self.send(text_data=json.dumps({
+        await self.send_frame({
             "type": "online_stats",
             "online_users": event["online_users"]
-        }))
+        })
 
     async def room_member_update(self, event):
-        await self.send(text_data=json.dumps({
+        await self.send_frame({
             "type": "room_member_update",
             "room_id": event["room_id"],
             "member_count": event["member_count"]
-        }))
+        })
 
-    @database_sync_to_async
-    def get_all_unread_counts(self):
+    async def get_all_unread_counts(self):
         """사용자의 모든 방 안읽은 메시지 수 계산"""
         try:
-            from datetime import datetime
-            
-            user = User.objects.get(id=self.user_id)
             memberships = RoomMember.objects.filter(
-                user=user, 
+                user_id=self.user_id,
                 room__is_active=True
-            ).select_related('room', 'last_read_message')
+            ).values_list('room_id', 'room__last_seq', 'last_read_seq')
             
             unread_counts = {}
             
-            for membership in memberships:
-                last_read_time = (
-                    membership.last_read_message.created_at 
-                    if membership.last_read_message 
-                    else timezone.make_aware(datetime.min)
-                )
-                
-                unread_count = ChatMessage.objects.filter(
-                    room=membership.room,
-                    created_at__gt=last_read_time,
-                    message_type__in=['text', 'file', 'image'],
-                    user__isnull=False,
-                    is_deleted=False
-                ).count()
-                
-                unread_counts[membership.room.id] = unread_count
+            async for room_id, last_seq, last_read_seq in memberships:
+                # JSON과 msgpack 프레임의 키 형식을 맞추기 위해 문자열 키 사용
+                unread_counts[str(room_id)] = max(0, last_seq - last_read_seq)
             
             return unread_counts
             
-        except User.DoesNotExist:
-            return {}
         except Exception as e:
             print(f"전체 안읽은 메시지 수 계산 오류: {e}")
             return {}
-        
-@database_sync_to_async
-def send_push_to_offline_members(room, sender_user, message):
-    from chat.models import RoomMember, PushSubscription
-    from chat.utils import send_web_push
-    import json
-
-    targets = RoomMember.objects.filter(
-        room=room
-    ).exclude(user=sender_user).filter(is_currently_in_room=False)
-
-    for member in targets:
-        subs = PushSubscription.objects.filter(user=member.user)
-        for sub in subs:
-            subscription_info = {
-                "endpoint": sub.endpoint,
-                "keys": {
-                    "p256dh": sub.p256dh,
-                    "auth": sub.auth
-                }
-            }
-            payload = json.dumps({
-                "title": f"{room.name} 새 메세지 알림",
-                "body": f"{sender_user.username}: {message}",
-                # "url": f"/chat/api/rooms/{room.name}/messages/"
-            })
-            send_web_push(subscription_info, payload)
\ No newline at end of file
@@ -0,0 +1,28 @@
+from chat import presence, stats
+
+
+def flush_presence_last_seen():
+    """Redis에 쌓인 방 마지막 접속 시각을 DB에 반영 (django_crontab)"""
+    try:
+        flushed = presence.flush_last_seen()
+        print(f"마지막 접속 시각 {flushed}건 반영")
+    except Exception as e:
+        print(f"마지막 접속 시각 반영 오류: {e}")
+
+
+def reconcile_server_stats():
+    """서버 통계 카운터를 DB 기준으로 재계산 (django_crontab)"""
+    try:
+        stats.reconcile()
+    except Exception as e:
+        print(f"서버 통계 재계산 오류: {e}")
+
+
+def reap_stale_presence():
+    """하트비트가 끊긴 방 접속 정보 일괄 정리 (django_crontab)"""
+    try:
+        scanned, reaped = presence.reap_expired()
+        if scanned:
+            print(f"만료된 접속 {reaped}건 정리 ({scanned}건 검사)")
+    except Exception as e:
+        print(f"만료된 접속 정리 오류: {e}")
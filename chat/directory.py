@@ -0,0 +1,61 @@
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from chat.models import ChatRoom
+from chat.pagination import decode_cursor, encode_cursor
+
+# 무효화 시 버전만 올려 이전 페이지 캐시를 한 번에 버림
+VERSION_KEY = "room_directory:version"
+PAGE_KEY = "room_directory:{version}:{before}:{page_size}"
+
+
+def _version():
+    # 버전 키가 사라져도 예전 페이지를 다시 집지 않도록 현재 시각으로 시작
+    return cache.get_or_set(VERSION_KEY, time.time_ns(), timeout=None)
+
+
+def get_page(before=None, page_size=20):
+    """
+    활성 방 목록 한 페이지 ((created_at, id) 최신순 키셋)
+    공유 캐시에 있으면 DB를 거치지 않음, 반환: (rooms, next_cursor)
+    """
+    key = PAGE_KEY.format(version=_version(), before=before or "", page_size=page_size)
+    page = cache.get(key)
+    if page is None:
+        page = _load_page(before, page_size)
+        cache.set(key, page, timeout=settings.ROOM_DIRECTORY_CACHE_TIMEOUT)
+    return page
+
+
+def _load_page(before, page_size):
+    """방 목록 쿼리 1회 (멤버 수는 비정규화 필드, 생성자는 조인)"""
+    rooms = ChatRoom.objects.filter(is_active=True).order_by("-created_at", "-id")
+    if before:
+        created_at, room_id = decode_cursor(before)
+        rooms = rooms.filter(created_at__lte=created_at).exclude(created_at=created_at, id__gte=room_id)
+
+    rows = list(rooms.values(
+        "id", "name", "description", "created_at", "created_by_id",
+        "created_by__username", "max_members", "member_count",
+    )[:page_size + 1])
+
+    next_cursor = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        next_cursor = encode_cursor(rows[-1]["created_at"], rows[-1]["id"])
+    return rows, next_cursor
+
+
+def invalidate():
+    """방 목록 캐시 무효화 (트랜잭션 커밋 후 버전 증가)"""
+    def bump():
+        try:
+            cache.incr(VERSION_KEY)
+        except ValueError:
+            # 버전 키가 없으면 다음 조회 때 새로 생성되므로 무효화된 것과 같음
+            pass
+
+    transaction.on_commit(bump)
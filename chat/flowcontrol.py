@@ -0,0 +1,90 @@
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+
+# 연결 제어 지표 (공유 캐시 카운터, 연결이 끝날 때 연결별 합계를 한 번에 반영)
+THROTTLED_FRAMES_KEY = "flow:throttled_frames"
+THROTTLED_CONNECTIONS_KEY = "flow:throttled_connections"
+DROPPED_FRAMES_KEY = "flow:dropped_frames"
+EVICTED_CONNECTIONS_KEY = "flow:evicted_connections"
+OVERSIZED_FRAMES_KEY = "flow:oversized_frames"
+MALFORMED_FRAMES_KEY = "flow:malformed_frames"
+
+METRIC_KEYS = {
+    "throttled_frames": THROTTLED_FRAMES_KEY,
+    "throttled_connections": THROTTLED_CONNECTIONS_KEY,
+    "dropped_frames": DROPPED_FRAMES_KEY,
+    "evicted_connections": EVICTED_CONNECTIONS_KEY,
+    "oversized_frames": OVERSIZED_FRAMES_KEY,
+    "malformed_frames": MALFORMED_FRAMES_KEY,
+}
+
+DEFAULT_RATE_LIMITS = {
+    "text": (5, 20),
+    "mark_read": (20, 50),
+    "user_join": (1, 5),
+    "user_leave": (1, 5),
+    "resume": (1, 3),
+    "*": (10, 30),
+}
+
+
+class TokenBucket:
+    """초당 rate개씩 채워지고 최대 burst개까지 모이는 토큰 버킷"""
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+
+    def take(self):
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+    def refund(self):
+        """가져간 토큰 하나를 되돌림 (다른 버킷에서 차감할 프레임)"""
+        self.tokens = min(self.burst, self.tokens + 1)
+
+    def retry_after(self):
+        """다음 토큰까지 남은 시간(초)"""
+        return max(0.0, (1 - self.tokens) / self.rate)
+
+
+class InboundLimiter:
+    """연결별 수신 메시지 타입별 속도 제한 (WS_RATE_LIMITS, 정의되지 않은 타입은 "*" 공용 버킷)"""
+
+    def __init__(self):
+        self.limits = getattr(settings, "WS_RATE_LIMITS", DEFAULT_RATE_LIMITS)
+        self.buckets = {}
+
+    def bucket(self, message_type):
+        key = message_type if message_type in self.limits else "*"
+        if key not in self.buckets:
+            self.buckets[key] = TokenBucket(*self.limits.get(key, DEFAULT_RATE_LIMITS["*"]))
+        return self.buckets[key]
+
+
+def record_connection(counters):
+    """연결별 집계를 공유 카운터에 반영 (없는 키는 새로 만듦)"""
+    for name, delta in counters.items():
+        if not delta:
+            continue
+        key = METRIC_KEYS[name]
+        if not cache.add(key, delta, timeout=None):
+            cache.incr(key, delta)
+
+
+arecord_connection = sync_to_async(record_connection)
+
+
+def get_metrics():
+    values = cache.get_many(METRIC_KEYS.values())
+    return {name: values.get(key, 0) for name, key in METRIC_KEYS.items()}
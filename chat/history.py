@@ -0,0 +1,359 @@
+import json
+import logging
+from datetime import datetime, timedelta, timezone
+
+from django.conf import settings
+from django.db import transaction
+from rest_framework.utils.urls import replace_query_param
+
+from chat.models import ChatMessage, ChatRoom, MessageReaction, RoomMember
+from chat.pagination import MessageCursorPagination, encode_cursor
+from chat.presence import get_client
+from chat.serializers import CachedMessageSerializer
+
+logger = logging.getLogger(__name__)
+
+# 방별 최신 메시지 첫 페이지 캐시 (GetMessageAPIView 기본 요청)
+# 메시지 HASH: m:<id> 공통 직렬화 JSON, u:<id> 안읽은 수, c:<id> 반응 수 JSON, r:<id> 사용자별 반응 JSON, room_name
+PAGE_KEY = "history:room:{room_id}"
+# 메시지 순서: ZSET(0으로 채운 메시지 ID → 작성 시각(마이크로초)), 같은 시각이면 ID 순
+ORDER_KEY = "history:room:{room_id}:order"
+# 멤버 입장 시각: HASH(user_id → joined_at(마이크로초)), 입장 이후 메시지만 보여 줌
+MEMBERS_KEY = "history:room:{room_id}:members"
+# 방 캐시 변경 세대: 쓰기마다 증가, 채우는 동안 바뀌었으면 DB에서 읽은 값을 버림
+GEN_KEY = "history:room:{room_id}:gen"
+
+# 페이지 크기 + 1개 (다음 페이지 유무 판단)
+KEEP = MessageCursorPagination.page_size + 1
+
+# ARGV: 읽은 세대, TTL, 방 이름, 멤버 수, (user_id, 입장 시각)..., (ID, 시각, 공통 JSON, 안읽은 수, 반응 수, 사용자별 반응)...
+FILL_SCRIPT = """
+if (redis.call('GET', KEYS[4]) or '0') ~= ARGV[1] then
+    return 0
+end
+redis.call('DEL', KEYS[1], KEYS[2], KEYS[3])
+redis.call('HSET', KEYS[1], 'room_name', ARGV[3])
+local i = 5
+for _ = 1, tonumber(ARGV[4]) do
+    redis.call('HSET', KEYS[3], ARGV[i], ARGV[i + 1])
+    i = i + 2
+end
+while i <= #ARGV do
+    local id = ARGV[i]
+    redis.call('ZADD', KEYS[2], ARGV[i + 1], id)
+    redis.call('HSET', KEYS[1], 'm:' .. id, ARGV[i + 2], 'u:' .. id, ARGV[i + 3], 'c:' .. id, ARGV[i + 4], 'r:' .. id, ARGV[i + 5])
+    i = i + 6
+end
+for k = 1, 4 do
+    redis.call('EXPIRE', KEYS[k], ARGV[2])
+end
+return 1
+"""
+
+# 쓰기 공통 머리말: 세대를 올리고, 캐시가 없으면 아무것도 하지 않음
+WRITE_PREAMBLE = """
+redis.call('INCR', KEYS[4])
+redis.call('EXPIRE', KEYS[4], ARGV[1])
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    return 0
+end
+for k = 1, 3 do
+    redis.call('EXPIRE', KEYS[k], ARGV[1])
+end
+"""
+
+# ARGV: TTL, (ID, 시각, 공통 JSON, 안읽은 수, 반응 수)... → 추가 후 가장 오래된 것부터 KEEP개만 남김
+APPEND_SCRIPT = WRITE_PREAMBLE + """
+for i = 2, #ARGV, 5 do
+    local id = ARGV[i]
+    redis.call('ZADD', KEYS[2], ARGV[i + 1], id)
+    redis.call('HSETNX', KEYS[1], 'm:' .. id, ARGV[i + 2])
+    redis.call('HSETNX', KEYS[1], 'u:' .. id, ARGV[i + 3])
+    redis.call('HSETNX', KEYS[1], 'c:' .. id, ARGV[i + 4])
+    redis.call('HSETNX', KEYS[1], 'r:' .. id, '{}')
+end
+local excess = redis.call('ZCARD', KEYS[2]) - %(keep)d
+if excess > 0 then
+    for _, id in ipairs(redis.call('ZRANGE', KEYS[2], 0, excess - 1)) do
+        redis.call('HDEL', KEYS[1], 'm:' .. id, 'u:' .. id, 'c:' .. id, 'r:' .. id)
+    end
+    redis.call('ZREMRANGEBYRANK', KEYS[2], 0, excess - 1)
+end
+return 1
+""" % {"keep": KEEP}
+
+# ARGV: TTL, (ID, 안읽은 수)... → 안읽은 수는 줄어들기만 하므로 더 작은 값만 반영 (콜백 순서가 바뀌어도 안전)
+UNREAD_SCRIPT = WRITE_PREAMBLE + """
+for i = 2, #ARGV, 2 do
+    local current = redis.call('HGET', KEYS[1], 'u:' .. ARGV[i])
+    if current and tonumber(ARGV[i + 1]) < tonumber(current) then
+        redis.call('HSET', KEYS[1], 'u:' .. ARGV[i], ARGV[i + 1])
+    end
+end
+return 1
+"""
+
+# ARGV: TTL, ID, 반응 수 JSON, user_id, 반응 유형(제거면 빈 문자열)
+REACTION_SCRIPT = WRITE_PREAMBLE + """
+local reactions = redis.call('HGET', KEYS[1], 'r:' .. ARGV[2])
+if not reactions then
+    return 0
+end
+reactions = cjson.decode(reactions)
+if ARGV[5] == '' then
+    reactions[ARGV[4]] = nil
+else
+    reactions[ARGV[4]] = ARGV[5]
+end
+redis.call('HSET', KEYS[1], 'c:' .. ARGV[2], ARGV[3], 'r:' .. ARGV[2], next(reactions) and cjson.encode(reactions) or '{}')
+return 1
+"""
+
+# ARGV: TTL, user_id, 입장 시각(퇴장이면 빈 문자열)
+MEMBER_SCRIPT = WRITE_PREAMBLE + """
+if ARGV[3] == '' then
+    redis.call('HDEL', KEYS[3], ARGV[2])
+else
+    redis.call('HSET', KEYS[3], ARGV[2], ARGV[3])
+end
+return 1
+"""
+
+INVALIDATE_SCRIPT = """
+redis.call('INCR', KEYS[4])
+redis.call('DEL', KEYS[1], KEYS[2], KEYS[3])
+return 1
+"""
+
+# ARGV: user_id → {입장 시각, (시각, 공통 JSON, 안읽은 수, 반응 수, 내 반응)...} 최신순
+# 캐시가 없으면 nil, 캐시에 없는 멤버면 빈 목록
+READ_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    return false
+end
+local joined = redis.call('HGET', KEYS[3], ARGV[1])
+if not joined then
+    return {}
+end
+local out = {joined, redis.call('HGET', KEYS[1], 'room_name')}
+local order = redis.call('ZREVRANGE', KEYS[2], 0, -1, 'WITHSCORES')
+for i = 1, #order, 2 do
+    local id = order[i]
+    local fields = redis.call('HMGET', KEYS[1], 'm:' .. id, 'u:' .. id, 'c:' .. id, 'r:' .. id)
+    out[#out + 1] = order[i + 1]
+    out[#out + 1] = fields[1]
+    out[#out + 1] = fields[2]
+    out[#out + 1] = fields[3]
+    out[#out + 1] = cjson.decode(fields[4])[ARGV[1]] or ''
+end
+return out
+"""
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+def _keys(room_id):
+    return (
+        PAGE_KEY.format(room_id=room_id),
+        ORDER_KEY.format(room_id=room_id),
+        MEMBERS_KEY.format(room_id=room_id),
+        GEN_KEY.format(room_id=room_id),
+    )
+
+
+def _ttl():
+    return getattr(settings, "HISTORY_CACHE_TTL", 600)
+
+
+def _enabled():
+    return getattr(settings, "HISTORY_CACHE_ENABLED", True)
+
+
+def _micros(value):
+    """datetime → 정수 마이크로초 (ZSET 점수, 정밀도 손실 없음)"""
+    return (value - EPOCH) // timedelta(microseconds=1)
+
+
+def _member_id(message_id):
+    # 같은 작성 시각이면 ZSET 사전순 = ID 순이 되도록 0으로 채움
+    return f"{message_id:020d}"
+
+
+def _message_args(message):
+    return [
+        _member_id(message.id),
+        _micros(message.created_at),
+        json.dumps(CachedMessageSerializer(message).data),
+        message.unread_count,
+        json.dumps(message.reaction_counts),
+    ]
+
+
+def is_first_page(request):
+    """캐시로 응답할 수 있는 기본 요청 (커서 없음, 기본 페이지 크기)"""
+    params = request.query_params
+    if any(params.get(name) for name in ("before", "after", "after_id")):
+        return False
+    return params.get("page_size", str(MessageCursorPagination.page_size)) == str(MessageCursorPagination.page_size)
+
+
+def get_first_page(room_id, request):
+    """
+    방 최신 메시지 첫 페이지 응답 (캐시 적중 시 DB 조회 없음)
+    캐시가 없으면 DB에서 채운 뒤 응답, 방/멤버가 없거나 Redis 오류면 None (일반 조회 경로)
+    """
+    if not _enabled():
+        return None
+    try:
+        cached = get_client().eval(READ_SCRIPT, 4, *_keys(room_id), request.user.id)
+        if cached is None:
+            cached = _fill(room_id, request.user)
+    except Exception:
+        logger.exception("메시지 첫 페이지 캐시 조회 오류 (room=%s)", room_id)
+        return None
+    if not cached:
+        return None
+    return _render(cached, request)
+
+
+def _fill(room_id, user):
+    """DB에서 방 이름, 멤버 입장 시각, 최신 KEEP개 메시지와 반응을 읽어 캐시를 채우고 READ_SCRIPT와 같은 형식으로 반환"""
+    keys = _keys(room_id)
+    client = get_client()
+    generation = client.get(keys[3]) or "0"
+
+    room = ChatRoom.objects.filter(id=room_id, is_active=True).only("name").first()
+    if room is None:
+        return None
+    members = dict(RoomMember.objects.filter(room_id=room_id).values_list("user_id", "joined_at"))
+    if user.id not in members:
+        return None
+
+    messages = list(
+        ChatMessage.objects.filter(room_id=room_id, is_deleted=False)
+        .select_related("user")
+        .order_by("-created_at", "-id")[:KEEP]
+    )
+    reactions = {message.id: {} for message in messages}
+    for message_id, user_id, reaction_type in MessageReaction.objects.filter(message__in=messages).values_list(
+        "message_id", "user_id", "reaction_type"
+    ):
+        reactions[message_id][str(user_id)] = reaction_type
+
+    args = [generation, _ttl(), room.name, len(members)]
+    for member_id, joined_at in members.items():
+        args += [member_id, _micros(joined_at)]
+    cached = [_micros(members[user.id]), room.name]
+    for message in messages:
+        message_args = _message_args(message)
+        args += message_args + [json.dumps(reactions[message.id])]
+        cached += message_args[1:] + [reactions[message.id].get(str(user.id), "")]
+    client.eval(FILL_SCRIPT, 4, *keys, *args)
+    return cached
+
+
+def _render(cached, request):
+    """캐시 값 + 사용자별 부분(내 반응, 입장 이후 메시지) → MessageCursorPagination과 같은 응답"""
+    joined_at, room_name = int(cached[0]), cached[1]
+    rows = []
+    for i in range(2, len(cached), 5):
+        created_at, data, unread_count, reaction_counts, user_reaction = cached[i:i + 5]
+        if int(float(created_at)) < joined_at:
+            break
+        rows.append((int(float(created_at)), data, int(unread_count), reaction_counts, user_reaction))
+
+    page_size = MessageCursorPagination.page_size
+    has_older, rows = len(rows) > page_size, rows[:page_size]
+
+    results = []
+    for _, data, unread_count, reaction_counts, user_reaction in rows:
+        message = json.loads(data)
+        if message["file"]:
+            message["file"] = request.build_absolute_uri(message["file"])
+        results.append({
+            "id": message["id"],
+            "room_name": room_name,
+            "user_id": message["user_id"],
+            "username": message["username"],
+            "content": message["content"],
+            "file": message["file"],
+            "file_name": message["file_name"],
+            "file_size": message["file_size"],
+            "message_type": message["message_type"],
+            "created_at": message["created_at"],
+            "edited_at": message["edited_at"],
+            "reactions": json.loads(reaction_counts),
+            "user_reaction": user_reaction or None,
+            "unread_count": unread_count,
+            "is_read_by_all": unread_count == 0,
+        })
+
+    next_link = None
+    if has_older:
+        oldest_at = EPOCH + timedelta(microseconds=rows[-1][0])
+        next_link = replace_query_param(
+            request.build_absolute_uri(), "before", encode_cursor(oldest_at, results[-1]["id"])
+        )
+    return {"next": next_link, "previous": None, "results": results}
+
+
+# 쓰기 경로 (트랜잭션 커밋 후 반영, 캐시가 없으면 세대만 올림)
+def _write(script, room_id, args):
+    if not _enabled():
+        return
+
+    def apply():
+        try:
+            get_client().eval(script, 4, *_keys(room_id), _ttl(), *args)
+        except Exception:
+            logger.exception("메시지 첫 페이지 캐시 반영 오류 (room=%s)", room_id)
+
+    transaction.on_commit(apply)
+
+
+def messages_created(room_id, messages):
+    """새 메시지 추가 (작성자가 로드된 ChatMessage 목록)"""
+    args = []
+    for message in messages:
+        if not message.is_deleted:
+            args += _message_args(message)
+    if args:
+        _write(APPEND_SCRIPT, room_id, args)
+
+
+def unread_changed(room_id, changed):
+    """안읽은 수 변경 ((message_id, unread_count) 목록)"""
+    args = []
+    for message_id, unread_count in changed:
+        args += [_member_id(message_id), unread_count]
+    if args:
+        _write(UNREAD_SCRIPT, room_id, args)
+
+
+def reaction_changed(message, user, reaction_type, reaction_counts):
+    """반응 추가/변경/제거 (제거면 reaction_type=None)"""
+    _write(REACTION_SCRIPT, message.room_id, [
+        _member_id(message.id), json.dumps(reaction_counts), user.id, reaction_type or "",
+    ])
+
+
+def member_joined(room_id, user_id, joined_at):
+    _write(MEMBER_SCRIPT, room_id, [user_id, _micros(joined_at)])
+
+
+def member_left(room_id, user_id):
+    _write(MEMBER_SCRIPT, room_id, [user_id, ""])
+
+
+def invalidate(room_id):
+    """방 캐시 삭제 (메시지 수정/삭제, 방 정보 변경 등 부분 반영하지 않는 변경)"""
+    if not _enabled():
+        return
+
+    def apply():
+        try:
+            get_client().eval(INVALIDATE_SCRIPT, 4, *_keys(room_id))
+        except Exception:
+            logger.exception("메시지 첫 페이지 캐시 무효화 오류 (room=%s)", room_id)
+
+    transaction.on_commit(apply)
@@ -0,0 +1,238 @@
+import asyncio
+import logging
+
+from channels.db import database_sync_to_async
+from channels.layers import get_channel_layer
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from chat import broadcast, history, presence, replay, stats
+from chat.models import ChatMessage, ChatRoom, RoomMember
+from chat.push import push_dispatcher
+from chat.receipts import as_read_updates, mark_read
+from chat.sequences import advances_seq
+
+logger = logging.getLogger(__name__)
+
+
+class MessageIngestor:
+    """
+    채팅 메시지 마이크로 배치 저장기
+    방별로 짧은 시간(INGEST_BATCH_WINDOW_MS) 동안 들어온 메시지를 모아 bulk_create 한 번으로 저장
+    - 버퍼가 INGEST_MAX_BATCH개에 도달하면 기다리지 않고 바로 저장
+    - 방별 저장은 한 번에 하나씩 순서대로 처리 (순번 발급 순서 = 브로드캐스트 순서)
+    - 저장 후 배치 단위로 브로드캐스트하고, 각 전송자에게는 저장된 메시지 정보를 반환
+    """
+
+    def __init__(self):
+        self.window = getattr(settings, "INGEST_BATCH_WINDOW_MS", 5) / 1000
+        self.max_batch = getattr(settings, "INGEST_MAX_BATCH", 100)
+
+        self._loop = None
+        self._buffers = {}
+        self._flushers = {}
+        self._wakeups = {}
+        self.stats = {"messages": 0, "batches": 0}
+
+    def _ensure_loop(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._buffers = {}
+            self._flushers = {}
+            self._wakeups = {}
+        return loop
+
+    async def submit(self, room_id, user, content, message_type="text"):
+        """메시지를 방 버퍼에 넣고 저장될 때까지 대기 (저장 실패 시 None)"""
+        loop = self._ensure_loop()
+        future = loop.create_future()
+        buffer = self._buffers.setdefault(room_id, [])
+        buffer.append((user, content, message_type, future))
+
+        flusher = self._flushers.get(room_id)
+        if flusher is None or flusher.done():
+            self._wakeups[room_id] = asyncio.Event()
+            self._flushers[room_id] = loop.create_task(self._flush_loop(room_id))
+        elif len(buffer) >= self.max_batch:
+            self._wakeups[room_id].set()
+        return await future
+
+    async def _flush_loop(self, room_id):
+        """방 버퍼가 빌 때까지 배치 단위로 저장"""
+        wakeup = self._wakeups[room_id]
+        while self._buffers.get(room_id):
+            if len(self._buffers[room_id]) < self.max_batch:
+                try:
+                    await asyncio.wait_for(wakeup.wait(), self.window)
+                except asyncio.TimeoutError:
+                    pass
+            wakeup.clear()
+
+            batch = self._buffers[room_id][:self.max_batch]
+            del self._buffers[room_id][:len(batch)]
+            await self._flush(room_id, batch)
+        self._buffers.pop(room_id, None)
+
+    async def _flush(self, room_id, batch):
+        futures = [entry[3] for entry in batch]
+        try:
+            saved, updated_messages = await persist_messages(room_id, [entry[:3] for entry in batch])
+        except Exception:
+            logger.exception("메시지 배치 저장 오류 (room=%s, %s건)", room_id, len(batch))
+            for future in futures:
+                if not future.done():
+                    future.set_result(None)
+            return
+
+        self.stats["messages"] += len(saved)
+        self.stats["batches"] += 1
+        for future, message in zip(futures, saved):
+            if not future.done():
+                future.set_result(message)
+
+        try:
+            await broadcast_batch(room_id, saved, updated_messages)
+        except Exception:
+            logger.exception("메시지 배치 브로드캐스트 오류 (room=%s)", room_id)
+
+
+@database_sync_to_async
+def persist_messages(room_id, entries):
+    """
+    메시지 여러 건을 한 트랜잭션으로 저장 (entries: [(user, content, message_type), ...])
+    순번 일괄 발급, bulk_create, 안읽은 수 일괄 계산 후
+    (저장된 메시지 정보 목록, 함께 읽음 처리된 이전 메시지 변경 목록) 반환
+    """
+    with transaction.atomic():
+        # 순번은 안읽은 수에 포함되는 메시지만 올리고, 멤버 수는 create_message와 같이 방의 비정규화 카운터 사용
+        advancing = [advances_seq(user.id if user else None, message_type) for user, _, message_type in entries]
+        room = ChatRoom(pk=room_id)
+        last_seq = room.allocate_seq(sum(advancing))
+        current_members = room.member_count
+
+        seq = last_seq - sum(advancing)
+        messages = []
+        for (user, content, message_type), advances in zip(entries, advancing):
+            seq += advances
+            messages.append(ChatMessage(
+                room_id=room_id,
+                user=user,
+                content=content,
+                message_type=message_type,
+                seq=seq,
+                total_members_at_time=current_members,
+                # 작성자 제외한 모든 멤버가 안 읽은 상태로 시작
+                unread_count=max(0, current_members - 1) if user else current_members,
+            ))
+        messages = ChatMessage.objects.bulk_create(messages)
+        history.messages_created(room_id, messages)
+
+        # 방 목록에 보일 마지막 사용자 메시지
+        user_messages = [m for m in messages if m.user_id]
+        if user_messages:
+            ChatRoom.objects.filter(id=room_id).update(
+                last_message=user_messages[-1],
+                last_message_at=user_messages[-1].created_at,
+                updated_at=timezone.now(),
+            )
+
+        # 온라인 멤버는 배치 끝까지 한 번에 읽음 처리
+        online_user_ids = set(presence.online_user_ids(room_id))
+        changed = dict(mark_read(room_id, online_user_ids, up_to_seq=last_seq))
+
+        # 오프라인 작성자는 자기 마지막 메시지까지 읽음 처리
+        author_seqs = {}
+        for message in user_messages:
+            author_seqs[message.user_id] = message.seq
+        for user_id, seq in author_seqs.items():
+            if user_id not in online_user_ids:
+                changed.update(mark_read(room_id, [user_id], up_to_seq=seq))
+
+        stats.messages_created(len(messages))
+
+    saved = []
+    for message in messages:
+        unread_count = changed.pop(message.id, message.unread_count)
+        saved.append({
+            "id": message.id,
+            "seq": message.seq,
+            "message": message.content,
+            "username": message.user.username if message.user else None,
+            "user_id": message.user_id,
+            "message_type": message.message_type,
+            "unread_count": unread_count,
+            "is_read_by_all": unread_count == 0,
+            "created_at": message.created_at.isoformat(),
+        })
+    return saved, as_read_updates(sorted(changed.items()))
+
+
+async def broadcast_batch(room_id, saved, updated_messages):
+    """저장된 배치를 순번 순서대로 방에 전송하고, 읽음 수/안읽은 수 알림은 배치당 한 번만 전송"""
+    channel_layer = get_channel_layer()
+    room_group_id = f"chat_{room_id}"
+
+    events = [
+        {
+            "type": "chat_message",
+            "message": message["message"],
+            "username": message["username"],
+            "message_id": message["id"],
+            "unread_count": message["unread_count"],
+            "is_read_by_all": message["is_read_by_all"],
+            "user_id": message["user_id"],
+            "created_at": message["created_at"],
+        }
+        for message in saved
+    ]
+
+    # 재연결한 클라이언트가 놓친 메시지를 받을 수 있도록 배치 단위로 방 링 버퍼에 기록 (브로드캐스트보다 먼저)
+    try:
+        await replay.arecord(room_id, [broadcast.chat_frame(event) for event in events])
+    except Exception:
+        logger.exception("재전송 버퍼 기록 오류 (room=%s)", room_id)
+
+    for event in events:
+        await broadcast.group_send(channel_layer, room_group_id, event)
+
+    # 함께 읽음 처리된 이전 메시지들의 읽음 수 업데이트 알림
+    if updated_messages:
+        await broadcast.group_send(channel_layer, room_group_id, {
+            "type": "messages_read_count_update",
+            "updated_messages": updated_messages,
+        })
+
+    await broadcast_unread_counts(room_id)
+
+    # 오프라인 멤버 푸시 알림은 발송 큐에 등록만 하고 바로 반환
+    for message in saved:
+        if message["user_id"]:
+            push_dispatcher.enqueue(room_id, message["user_id"], message["username"], message["message"])
+
+
+async def broadcast_unread_counts(room_id):
+    """방의 모든 멤버에게 각자의 안읽은 메시지 수 전송"""
+    channel_layer = get_channel_layer()
+    for user_data in await get_room_unread_counts(room_id):
+        await channel_layer.group_send(
+            f"user_{user_data['user_id']}_global",
+            {
+                "type": "unread_count_update",
+                "room_id": room_id,
+                "unread_count": user_data["unread_count"],
+            }
+        )
+
+
+async def get_room_unread_counts(room_id):
+    """방의 모든 멤버들의 안읽은 메시지 수 계산 (비동기 ORM, 쿼리 1회)"""
+    members = RoomMember.objects.filter(room_id=room_id).values_list("user_id", "room__last_seq", "last_read_seq")
+    return [
+        {"user_id": user_id, "unread_count": max(0, last_seq - last_read_seq)}
+        async for user_id, last_seq, last_read_seq in members
+    ]
+
+
+message_ingestor = MessageIngestor()
@@ -0,0 +1,61 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from chat.models import ChatMessage, ChatRoom, RoomMember
+from chat.sequences import resequence_room
+
+
+class Command(BaseCommand):
+    """
+    메시지 순번(seq) 백필 명령
+    방별로 메시지 순번을 배치 단위로 다시 매기고, 멤버가 마지막으로 읽은 메시지가 그대로 유지되도록 읽은 순번을 보정
+    """
+    help = "방별 메시지 순번(seq)과 멤버 읽은 순번(last_read_seq)을 배치 단위로 재계산합니다."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--room", type=int, action="append", dest="room_ids", help="대상 방 ID (여러 번 지정 가능)")
+        parser.add_argument("--batch-size", type=int, default=1000, help="한 번에 갱신할 메시지 수")
+        parser.add_argument("--missing-only", action="store_true", help="순번이 없는 메시지가 있는 방만 처리")
+
+    def handle(self, *args, **options):
+        rooms = ChatRoom.objects.order_by("id")
+        if options["room_ids"]:
+            rooms = rooms.filter(id__in=options["room_ids"])
+        if options["missing_only"]:
+            rooms = rooms.filter(messages__seq=0).distinct()
+
+        processed = 0
+        for room_id in rooms.values_list("id", flat=True):
+            last_seq = self.backfill_room(room_id, options["batch_size"])
+            processed += 1
+            self.stdout.write(f"room {room_id}: last_seq={last_seq}")
+
+        self.stdout.write(self.style.SUCCESS(f"{processed}개 방의 메시지 순번을 재계산했습니다."))
+
+    def backfill_room(self, room_id, batch_size):
+        """방 하나 재계산 (방 행을 잠가 새 메시지의 순번 발급과 겹치지 않게 처리)"""
+        with transaction.atomic():
+            room = ChatRoom.objects.select_for_update().get(id=room_id)
+
+            # 멤버마다 마지막으로 읽은 메시지를 기억해 두고, 새 순번에서 그 메시지의 순번으로 읽은 위치 이동
+            members = list(RoomMember.objects.filter(room_id=room_id).only("id", "last_read_seq"))
+            read_upto = {
+                member.id: ChatMessage.objects.filter(
+                    room_id=room_id, seq__gt=0, seq__lte=member.last_read_seq
+                ).order_by("-seq", "-id").values_list("id", flat=True).first()
+                for member in members
+            }
+
+            last_seq = resequence_room(ChatMessage, room_id, batch_size)
+            room.last_seq = last_seq
+            # 안읽은 수가 바뀔 수 있으므로 updated_at도 갱신해 방 목록 변경분(since)에 포함
+            room.save(update_fields=["last_seq", "updated_at"])
+
+            new_seqs = dict(ChatMessage.objects.filter(
+                id__in=[message_id for message_id in read_upto.values() if message_id]
+            ).values_list("id", "seq"))
+            for member in members:
+                member.last_read_seq = new_seqs.get(read_upto[member.id], 0)
+            RoomMember.objects.bulk_update(members, ["last_read_seq"], batch_size=batch_size)
+
+        return last_seq
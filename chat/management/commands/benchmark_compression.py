@@ -0,0 +1,138 @@
+import random
+import time
+from datetime import timedelta
+
+from autobahn.websocket.compress import PerMessageDeflate
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from chat import broadcast
+from chat.protocol import encode_json, encode_msgpack
+from chat.receipts import as_read_updates
+
+
+def frame_overhead(size):
+    """서버 → 클라이언트 WebSocket 프레임 헤더 크기 (마스킹 없음)"""
+    if size < 126:
+        return 2
+    if size < 65536:
+        return 4
+    return 10
+
+
+class Command(BaseCommand):
+    """
+    WebSocket permessage-deflate 압축 벤치마크 (config.server)
+    연결 하나가 받는 프레임 묶음(안읽은 수 맵, 히스토리, 채팅, 읽음 수 업데이트)을
+    압축 없음 / 전부 압축 / 기준 크기 이상만 압축으로 보내 전송 바이트와 CPU 시간을 비교
+    (DB/Redis 없이 실제 이벤트 형식의 합성 데이터 사용)
+    """
+    help = "WebSocket 압축 설정별로 연결당 전송 바이트와 CPU 비용을 비교합니다."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--connections", type=int, default=200, help="측정할 연결 수")
+        parser.add_argument("--chat-messages", type=int, default=200, help="연결당 채팅 프레임 수")
+        parser.add_argument("--read-updates", type=int, default=20, help="연결당 읽음 수 업데이트 프레임 수 (각 50건)")
+        parser.add_argument("--rooms", type=int, default=100, help="안읽은 수 맵의 방 개수")
+        parser.add_argument("--min-size", type=int, default=128, help="압축 기준 크기(바이트)")
+        parser.add_argument("--window-bits", type=int, default=12)
+        parser.add_argument("--mem-level", type=int, default=5)
+        parser.add_argument("--msgpack", action="store_true", help="msgpack 바이너리 프레임으로 측정")
+
+    def handle(self, *args, **options):
+        encode = encode_msgpack if options["msgpack"] else (lambda payload: encode_json(payload).encode("utf8"))
+        frames = [encode(payload) for payload in self.session_payloads(options)]
+        self.stdout.write(
+            f"연결당 프레임 {len(frames)}개, 원본 {sum(len(f) for f in frames):,} 바이트 "
+            f"({'msgpack' if options['msgpack'] else 'JSON'})"
+        )
+
+        window_bits, mem_level = options["window_bits"], options["mem_level"]
+        memory = (1 << (window_bits + 2)) + (1 << (mem_level + 9))
+        self.stdout.write(f"압축 상태 메모리(연결당 추정): {memory / 1024:.0f} KiB (window_bits={window_bits}, mem_level={mem_level})")
+
+        self.report("압축 없음", frames, options, min_size=None)
+        self.report("전부 압축", frames, options, min_size=0)
+        self.report(f"{options['min_size']}바이트 이상 압축", frames, options, min_size=options["min_size"])
+
+    def session_payloads(self, options):
+        """한 연결이 받는 대표적인 이벤트 묶음"""
+        rng = random.Random(0)
+        now = timezone.now()
+        usernames = [f"user{i:03d}" for i in range(20)]
+
+        payloads = [{
+            "type": "all_unread_counts",
+            "unread_counts": {str(1000 + i): rng.randint(0, 40) for i in range(options["rooms"])},
+        }]
+
+        # 입장 시 히스토리 한 페이지 (REST 응답과 같은 메시지 형식)
+        payloads.append({
+            "type": "history",
+            "results": [
+                {
+                    "id": 50000 + i,
+                    "room_name": "general",
+                    "user_id": 10 + i % 20,
+                    "username": usernames[i % 20],
+                    "content": f"메시지 본문 {i} " + "확인 부탁드립니다. " * rng.randint(0, 3),
+                    "file": None,
+                    "file_name": None,
+                    "file_size": None,
+                    "message_type": "text",
+                    "created_at": (now - timedelta(minutes=30 - i)).isoformat(),
+                    "edited_at": None,
+                    "reactions": {"like": rng.randint(0, 3), "good": 0, "check": 0},
+                    "user_reaction": None,
+                    "unread_count": rng.randint(0, 5),
+                    "is_read_by_all": False,
+                }
+                for i in range(30)
+            ],
+        })
+
+        message_id = 60000
+        for i in range(options["chat_messages"]):
+            message_id += 1
+            payloads.append(broadcast.chat_frame({
+                "message": f"안녕하세요 {i}번째 메시지입니다",
+                "username": usernames[i % 20],
+                "message_id": message_id,
+                "unread_count": rng.randint(0, 10),
+                "is_read_by_all": False,
+                "user_id": 10 + i % 20,
+                "created_at": (now + timedelta(seconds=i)).isoformat(),
+            }))
+            if options["read_updates"] and i % max(1, options["chat_messages"] // options["read_updates"]) == 0:
+                payloads.append(broadcast.read_count_frame({
+                    "updated_messages": as_read_updates(
+                        (message_id - 50 + j, rng.randint(0, 3)) for j in range(50)
+                    ),
+                    "reader_username": usernames[rng.randrange(20)],
+                }))
+        return payloads
+
+    def report(self, label, frames, options, min_size):
+        wire = 0
+        compressed_frames = 0
+        started = time.process_time()
+        for _ in range(options["connections"]):
+            deflate = PerMessageDeflate(
+                True, False, False, options["window_bits"], options["window_bits"], options["mem_level"]
+            )
+            wire = 0
+            compressed_frames = 0
+            for frame in frames:
+                if min_size is None or len(frame) < min_size:
+                    size = len(frame)
+                else:
+                    deflate.start_compress_message()
+                    size = len(deflate.compress_message_data(frame)) + len(deflate.end_compress_message())
+                    compressed_frames += 1
+                wire += size + frame_overhead(size)
+        cpu = (time.process_time() - started) / options["connections"]
+
+        self.stdout.write(
+            f"{label}: 연결당 {wire:,} 바이트, 압축 프레임 {compressed_frames}/{len(frames)}개, "
+            f"CPU {cpu * 1000:.2f} ms/연결 ({cpu * 1e6 / len(frames):.1f} µs/프레임)"
+        )
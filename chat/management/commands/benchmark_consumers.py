@@ -0,0 +1,187 @@
+import asyncio
+import json
+import time
+
+from channels.db import database_sync_to_async
+from channels.routing import URLRouter
+from channels.testing import WebsocketCommunicator
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.test import override_settings
+from django.urls import re_path
+
+from chat import presence
+from chat.consumers import ChatConsumer, GlobalNotificationConsumer
+from chat.models import ChatMessage, ChatRoom, RoomMember
+from chat.receipts import as_read_updates, mark_read
+
+
+class ThreadedChatConsumer(ChatConsumer):
+    """비동기 ORM 전환 이전처럼 조회마다 database_sync_to_async 스레드로 실행하는 비교용 Consumer"""
+
+    @database_sync_to_async
+    def load_room(self):
+        return ChatRoom.objects.filter(id=self.room_id, is_active=True).first()
+
+    @database_sync_to_async
+    def load_user(self, username):
+        return User.objects.filter(username=username).first()
+
+    @database_sync_to_async
+    def ensure_membership(self):
+        last_seq = ChatRoom.objects.filter(id=self.room.id).values_list("last_seq", flat=True).first()
+        RoomMember.objects.get_or_create(
+            room_id=self.room.id, user_id=self.user.id, defaults={"last_read_seq": last_seq or 0}
+        )
+
+    @database_sync_to_async
+    def load_joined_at(self):
+        scope_user = self.scope.get("user")
+        if scope_user is None or not scope_user.is_authenticated:
+            return None
+        return RoomMember.objects.filter(
+            room_id=self.room.id, user_id=scope_user.id
+        ).values_list("joined_at", flat=True).first()
+
+    @database_sync_to_async
+    def update_existing_messages_read_count(self):
+        online_user_ids = presence.online_user_ids(self.room_id)
+        return as_read_updates(mark_read(self.room_id, online_user_ids))
+
+    @database_sync_to_async
+    def mark_message_read(self, message_id):
+        message = ChatMessage.objects.filter(id=message_id, room_id=self.room_id).only("id", "seq", "room_id").first()
+        if message is None:
+            return []
+        return mark_read(self.room_id, [self.user.id], up_to_seq=message.seq)
+
+
+class ThreadedGlobalNotificationConsumer(GlobalNotificationConsumer):
+    """전체 안읽은 수를 전환 이전처럼 스레드에서 멤버십 객체로 계산하는 비교용 Consumer"""
+
+    @database_sync_to_async
+    def get_all_unread_counts(self):
+        memberships = RoomMember.objects.filter(
+            user_id=self.user_id, room__is_active=True
+        ).select_related("room")
+        return {str(membership.room.id): membership.unread_messages_count for membership in memberships}
+
+
+def build_application(chat_consumer, global_consumer):
+    return URLRouter([
+        re_path(r"ws/chat/(?P<room_id>\d+)/$", chat_consumer.as_asgi()),
+        re_path(r"ws/global/(?P<user_id>\d+)/$", global_consumer.as_asgi()),
+    ])
+
+
+class Command(BaseCommand):
+    """
+    WebSocket Consumer 처리량 벤치마크 (워커 1개 기준)
+    같은 Consumer 경로를 비동기 ORM 조회(현재)와 database_sync_to_async 조회(전환 이전)로 각각 실행해 비교
+    - 채팅: 연결마다 입장 후 메시지 전송(message_ack까지) → 읽음 처리 → resume 완료까지를 한 번으로 측정
+    - 글로벌: 연결마다 refresh_unread_counts 요청 후 all_unread_counts 응답까지를 한 번으로 측정
+    (실제 DB/Redis/채널 레이어 사용, 측정 중에는 연결별 수신 속도 제한을 끔, 벤치마크용 방과 메시지는 끝나면 삭제)
+    """
+    help = "ChatConsumer/GlobalNotificationConsumer 처리량을 비동기 ORM과 스레드 조회 경로로 비교합니다."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--connections", type=int, default=20, help="동시 연결 수")
+        parser.add_argument("--messages", type=int, default=50, help="연결당 반복 횟수")
+        parser.add_argument("--rounds", type=int, default=3, help="경로별 측정 횟수 (가장 빠른 값 사용)")
+
+    def handle(self, *args, **options):
+        users = [
+            User.objects.get_or_create(username=f"bench_ws_{i}")[0]
+            for i in range(options["connections"])
+        ]
+        room = ChatRoom.objects.create(name=f"bench-ws-{time.time_ns()}", created_by=users[0])
+        RoomMember.objects.bulk_create([RoomMember(room=room, user=user) for user in users])
+
+        paths = (
+            ("database_sync_to_async", build_application(ThreadedChatConsumer, ThreadedGlobalNotificationConsumer)),
+            ("비동기 ORM", build_application(ChatConsumer, GlobalNotificationConsumer)),
+        )
+        unlimited = {"*": (10 ** 6, 10 ** 6)}
+        try:
+            total = len(users) * options["messages"]
+            # 경로 순서에 따른 캐시 효과를 줄이기 위해 라운드마다 번갈아 실행
+            results = {label: {"chat": [], "global": []} for label, _ in paths}
+            with override_settings(WS_RATE_LIMITS=unlimited):
+                for _ in range(options["rounds"]):
+                    for label, application in paths:
+                        results[label]["chat"].append(asyncio.run(self.run_chat(application, room, users, options["messages"])))
+                        results[label]["global"].append(asyncio.run(self.run_global(application, users, options["messages"])))
+
+            for label, _ in paths:
+                for kind in ("chat", "global"):
+                    elapsed = min(results[label][kind])
+                    self.stdout.write(f"{kind} ({label}): {total}회 / {elapsed:.2f}초 = {total / elapsed:.0f} ops/s")
+        finally:
+            ChatRoom.objects.filter(id=room.id).delete()
+
+    async def connect_all(self, application, paths):
+        communicators = []
+        for user, path in paths:
+            communicator = WebsocketCommunicator(application, path)
+            communicator.scope["user"] = user
+            connected, _ = await communicator.connect()
+            if not connected:
+                raise RuntimeError("WebSocket 연결 실패")
+            communicators.append((user, communicator))
+        return communicators
+
+    async def receive_until(self, communicator, predicate):
+        """다른 연결의 브로드캐스트는 버리고 조건에 맞는 프레임까지 대기"""
+        while True:
+            frame = json.loads(await communicator.receive_from(timeout=10))
+            if predicate(frame):
+                return frame
+
+    async def run_chat(self, application, room, users, count):
+        communicators = await self.connect_all(application, [(user, f"/ws/chat/{room.id}/") for user in users])
+
+        async def client(user, communicator):
+            await communicator.send_to(text_data=json.dumps({"type": "user_join", "username": user.username}))
+            for i in range(count):
+                await communicator.send_to(text_data=json.dumps({
+                    "type": "text", "username": user.username, "message": f"bench {i}", "client_id": i,
+                }))
+                ack = await self.receive_until(
+                    communicator, lambda frame: frame.get("type") == "message_ack" and frame.get("client_id") == i
+                )
+                await communicator.send_to(text_data=json.dumps({
+                    "type": "mark_read", "username": user.username, "message_id": ack["message_id"],
+                }))
+                # resume 응답을 받으면 앞서 보낸 읽음 처리도 끝난 상태
+                await communicator.send_to(text_data=json.dumps({"type": "resume", "last_message_id": ack["message_id"]}))
+                await self.receive_until(communicator, lambda frame: frame.get("type", "").startswith("resume_"))
+
+        started = time.perf_counter()
+        await asyncio.gather(*(client(user, communicator) for user, communicator in communicators))
+        elapsed = time.perf_counter() - started
+
+        for _, communicator in communicators:
+            await communicator.disconnect()
+        return elapsed
+
+    async def run_global(self, application, users, count):
+        communicators = await self.connect_all(application, [(user, f"/ws/global/{user.id}/") for user in users])
+
+        # 연결 직후 보내는 안읽은 수는 측정에서 제외
+        await asyncio.gather(*(
+            self.receive_until(communicator, lambda frame: frame.get("type") == "all_unread_counts")
+            for _, communicator in communicators
+        ))
+
+        async def client(communicator):
+            for _ in range(count):
+                await communicator.send_to(text_data=json.dumps({"type": "refresh_unread_counts"}))
+                await self.receive_until(communicator, lambda frame: frame.get("type") == "all_unread_counts")
+
+        started = time.perf_counter()
+        await asyncio.gather(*(client(communicator) for _, communicator in communicators))
+        elapsed = time.perf_counter() - started
+
+        for _, communicator in communicators:
+            await communicator.disconnect()
+        return elapsed
@@ -0,0 +1,71 @@
+import asyncio
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+
+from chat.ingest import MessageIngestor, broadcast_batch, persist_messages
+from chat.models import ChatRoom, RoomMember
+
+
+class Command(BaseCommand):
+    """
+    메시지 저장 처리량 벤치마크
+    같은 방에 여러 전송자가 동시에 메시지를 보낼 때 배치 저장기와 메시지별 저장을 비교
+    (실제 DB/Redis/채널 레이어 사용, 벤치마크용 방과 메시지는 끝나면 삭제)
+    """
+    help = "방별 마이크로 배치 메시지 저장의 처리량을 메시지별 저장과 비교합니다."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--senders", type=int, default=50, help="동시 전송자 수")
+        parser.add_argument("--messages", type=int, default=20, help="전송자당 메시지 수")
+        parser.add_argument("--window-ms", type=int, default=5, help="배치 대기 시간")
+        parser.add_argument("--max-batch", type=int, default=100, help="배치당 최대 메시지 수")
+        parser.add_argument("--skip-baseline", action="store_true", help="메시지별 저장 측정 생략")
+
+    def handle(self, *args, **options):
+        users = [
+            User.objects.get_or_create(username=f"bench_ingest_{i}")[0]
+            for i in range(options["senders"])
+        ]
+        room = ChatRoom.objects.create(name=f"bench-ingest-{time.time_ns()}", created_by=users[0])
+        RoomMember.objects.bulk_create([RoomMember(room=room, user=user) for user in users])
+
+        try:
+            ingestor = MessageIngestor()
+            ingestor.window = options["window_ms"] / 1000
+            ingestor.max_batch = options["max_batch"]
+
+            elapsed = asyncio.run(self.run_senders(users, options["messages"], self.batched(ingestor, room)))
+            self.report("배치 저장", len(users) * options["messages"], elapsed)
+            self.stdout.write(f"  배치 {ingestor.stats['batches']}회, 평균 {ingestor.stats['messages'] / max(1, ingestor.stats['batches']):.1f}건/배치")
+
+            if not options["skip_baseline"]:
+                elapsed = asyncio.run(self.run_senders(users, options["messages"], self.single(room)))
+                self.report("메시지별 저장", len(users) * options["messages"], elapsed)
+        finally:
+            ChatRoom.objects.filter(id=room.id).delete()
+
+    async def run_senders(self, users, count, send):
+        async def sender(user):
+            for i in range(count):
+                await send(user, f"bench {user.id}-{i}")
+
+        started = time.perf_counter()
+        await asyncio.gather(*(sender(user) for user in users))
+        return time.perf_counter() - started
+
+    def batched(self, ingestor, room):
+        async def send(user, content):
+            await ingestor.submit(room.id, user, content)
+        return send
+
+    def single(self, room):
+        # 기존 방식: 메시지마다 저장하고 바로 브로드캐스트 (배치 저장과 같은 저장/읽음 처리/전송/푸시 등록 작업)
+        async def send(user, content):
+            saved, updated_messages = await persist_messages(room.id, [(user, content, "text")])
+            await broadcast_batch(room.id, saved, updated_messages)
+        return send
+
+    def report(self, label, total, elapsed):
+        self.stdout.write(f"{label}: {total}건 / {elapsed:.2f}초 = {total / elapsed:.0f} msg/s")
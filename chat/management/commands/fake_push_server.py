@@ -0,0 +1,110 @@
+import base64
+import os
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec
+from django.core.management.base import BaseCommand
+
+
+def _b64(raw):
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def make_fake_subscription_keys():
+    """암호화에 사용할 수 있는 가짜 구독 키(p256dh, auth) 생성"""
+    public_key = ec.generate_private_key(ec.SECP256R1()).public_key()
+    p256dh = public_key.public_bytes(
+        serialization.Encoding.X962, serialization.PublicFormat.UncompressedPoint
+    )
+    return {"p256dh": _b64(p256dh), "auth": _b64(os.urandom(16))}
+
+
+def make_vapid_private_key():
+    """테스트용 VAPID 개인키 (settings.VAPID_PRIVATE_KEY 형식)"""
+    private_key = ec.generate_private_key(ec.SECP256R1())
+    return _b64(private_key.private_numbers().private_value.to_bytes(32, "big"))
+
+
+class FakePushHandler(BaseHTTPRequestHandler):
+    """
+    가짜 푸시 서비스 요청 처리
+    경로의 첫 부분으로 응답 코드를 고름: /gone/... → 410, /missing/... → 404,
+    /flaky/... → 503 (두 번째 요청부터 201), 그 외 → 201
+    """
+    counts = Counter()
+    seen = Counter()
+    latency = 0.0
+    lock = threading.Lock()
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        if self.latency:
+            time.sleep(self.latency)
+
+        kind = self.path.strip("/").split("/")[0]
+        with self.lock:
+            self.seen[self.path] += 1
+            attempts = self.seen[self.path]
+        if kind == "gone":
+            status_code = 410
+        elif kind == "missing":
+            status_code = 404
+        elif kind == "flaky" and attempts == 1:
+            status_code = 503
+        else:
+            status_code = 201
+
+        with self.lock:
+            self.counts[status_code] += 1
+        self.send_response(status_code)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_fake_push_server(host="127.0.0.1", port=0, latency_ms=0):
+    """백그라운드 스레드로 가짜 푸시 서버 실행 후 (server, base_url) 반환"""
+    handler = type("Handler", (FakePushHandler,), {
+        "counts": Counter(),
+        "seen": Counter(),
+        "latency": latency_ms / 1000,
+        "lock": threading.Lock(),
+    })
+    server = ThreadingHTTPServer((host, port), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+
+class Command(BaseCommand):
+    """
+    로컬 가짜 웹 푸시 엔드포인트
+    푸시 발송기 테스트와 벤치마크에서 실제 푸시 서비스 대신 사용
+    """
+    help = "테스트/벤치마크용 로컬 가짜 웹 푸시 서버를 실행합니다."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--host", default="127.0.0.1")
+        parser.add_argument("--port", type=int, default=8089)
+        parser.add_argument("--latency-ms", type=int, default=0, help="응답 전 지연 시간")
+
+    def handle(self, *args, **options):
+        server, base_url = start_fake_push_server(
+            options["host"], options["port"], options["latency_ms"]
+        )
+        keys = make_fake_subscription_keys()
+        self.stdout.write(f"가짜 푸시 서버: {base_url}/<ok|gone|missing|flaky>/<id>")
+        self.stdout.write(f"구독 키 예시: p256dh={keys['p256dh']} auth={keys['auth']}")
+        self.stdout.write(f"VAPID 개인키 예시: {make_vapid_private_key()}")
+
+        try:
+            while True:
+                time.sleep(5)
+                self.stdout.write(f"응답 코드별 요청 수: {dict(server.RequestHandlerClass.counts)}")
+        except KeyboardInterrupt:
+            server.shutdown()
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from chat.models import ChatMessage, MessageReaction
+from chat.reactions import recount_reactions
+
+
+class Command(BaseCommand):
+    """
+    메시지 반응 카운터 복구 명령
+    MessageReaction 행을 기준으로 like/good/check 카운터를 배치 단위로 다시 계산
+    """
+    help = "MessageReaction 기준으로 메시지 반응 카운터(like_count 등)를 배치 단위로 재계산합니다."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--room", type=int, action="append", dest="room_ids", help="대상 방 ID (여러 번 지정 가능)")
+        parser.add_argument("--batch-size", type=int, default=1000, help="한 번에 갱신할 메시지 수")
+
+    def handle(self, *args, **options):
+        message_ids = None
+        if options["room_ids"]:
+            message_ids = ChatMessage.objects.filter(room_id__in=options["room_ids"]).values("id")
+
+        processed = recount_reactions(ChatMessage, MessageReaction, options["batch_size"], message_ids)
+        self.stdout.write(self.style.SUCCESS(f"{processed}개 메시지의 반응 카운터를 재계산했습니다."))
@@ -0,0 +1,86 @@
+from django.db import connection
+from django.utils import timezone
+
+from chat import history, stats
+from chat.models import ChatMessage, ChatRoom, RoomMember
+from chat.sequences import advances_seq
+
+# 메시지 ID 선점 → 방 순번 발급(+마지막 메시지 갱신) → 메시지 INSERT → 작성자 읽은 순번 이동을 한 문장으로 처리
+# 멤버 수는 방의 비정규화 카운터(member_count)를 사용
+# 시스템 메시지는 순번을 올리지 않고 직전 순번을 함께 사용 (chat.sequences.advances_seq)
+CREATE_MESSAGE_SQL = f"""
+WITH new_message AS (
+    SELECT nextval(pg_get_serial_sequence('{ChatMessage._meta.db_table}', 'id')) AS id
+),
+room AS (
+    UPDATE {ChatRoom._meta.db_table} r
+    SET last_seq = r.last_seq + CASE WHEN %(advances_seq)s THEN 1 ELSE 0 END,
+        last_message_id = CASE WHEN %(user_id)s::bigint IS NULL THEN r.last_message_id ELSE n.id END,
+        last_message_at = CASE WHEN %(user_id)s::bigint IS NULL THEN r.last_message_at ELSE %(now)s END,
+        updated_at = CASE WHEN %(user_id)s::bigint IS NULL THEN r.updated_at ELSE %(now)s END
+    FROM new_message n
+    WHERE r.id = %(room_id)s
+    RETURNING r.last_seq, r.member_count
+),
+inserted AS (
+    INSERT INTO {ChatMessage._meta.db_table} (
+        id, room_id, user_id, content, message_type, created_at, is_deleted, file,
+        seq, unread_count, total_members_at_time, like_count, good_count, check_count
+    )
+    SELECT
+        n.id, %(room_id)s, %(user_id)s, %(content)s, %(message_type)s, %(now)s, false, '',
+        room.last_seq,
+        CASE WHEN %(user_id)s::bigint IS NULL THEN room.member_count ELSE GREATEST(room.member_count - 1, 0) END,
+        room.member_count, 0, 0, 0
+    FROM new_message n, room
+    RETURNING id, seq, unread_count, total_members_at_time
+),
+author AS (
+    UPDATE {RoomMember._meta.db_table} m
+    SET last_read_seq = GREATEST(m.last_read_seq, i.seq)
+    FROM inserted i
+    WHERE m.room_id = %(room_id)s AND m.user_id = %(user_id)s::bigint
+)
+SELECT id, seq, unread_count, total_members_at_time FROM inserted
+"""
+
+
+def create_message(room_id, user, content, message_type="text"):
+    """
+    메시지 저장 빠른 경로 (DB 왕복 1회)
+    ChatMessage.save()와 같은 결과(순번, 안읽은 수, 전송 당시 멤버 수, 작성자 읽음 처리)를 CTE 한 문장으로 처리
+    관리자 화면 등 일반 저장은 ChatMessage.save()를 그대로 사용
+    """
+    now = timezone.now()
+    with connection.cursor() as cursor:
+        cursor.execute(CREATE_MESSAGE_SQL, {
+            "room_id": room_id,
+            "user_id": user.id if user else None,
+            "content": content,
+            "message_type": message_type,
+            "advances_seq": advances_seq(user.id if user else None, message_type),
+            "now": now,
+        })
+        row = cursor.fetchone()
+    if row is None:
+        raise ChatRoom.DoesNotExist(f"존재하지 않는 채팅방입니다. (room={room_id})")
+
+    message_id, seq, unread_count, total_members = row
+    message = ChatMessage(
+        id=message_id,
+        room_id=room_id,
+        user=user,
+        content=content,
+        message_type=message_type,
+        created_at=now,
+        seq=seq,
+        unread_count=unread_count,
+        total_members_at_time=total_members,
+    )
+    message._state.adding = False
+    message._state.db = connection.alias
+
+    # post_save가 호출되지 않으므로 통계 카운터와 첫 페이지 캐시는 직접 반영
+    stats.message_created(message)
+    history.messages_created(room_id, [message])
+    return message
@@ -0,0 +1,134 @@
+import asyncio
+import logging
+import threading
+from collections import defaultdict
+
+from channels.db import database_sync_to_async
+from channels.layers import get_channel_layer
+from django.conf import settings
+from django.core.cache import cache
+
+from chat import stats, topics
+from chat.models import ChatRoom
+
+logger = logging.getLogger(__name__)
+
+# 이번 간격에 이미 전송한 지표 (여러 프로세스 중 한 곳만 전송)
+WINDOW_KEY = "metrics:window:{key}"
+
+
+class MetricBroadcaster:
+    """
+    지표 브로드캐스트 합치기 (online_stats, room_member_update)
+    변경 알림만 받아 두고 키별로 간격(METRIC_BROADCAST_INTERVAL초)마다 최대 한 번, 전송 시점의 최신 값을 보냄
+    - 조용할 때는 바로 전송하고, 간격 안에 들어온 변경은 간격이 끝날 때 한 번만 전송
+    - 값은 보내는 시점에 저렴한 카운터(캐시 온라인 수, 방 member_count)에서 읽음
+    - 동기 코드(뷰)에서는 run_sync로 프로세스 전용 루프에서 실행 (async_to_sync의 임시 루프는 요청이 끝나면 닫혀 간격 끝 전송이 사라짐)
+    """
+
+    def __init__(self):
+        self.interval = getattr(settings, "METRIC_BROADCAST_INTERVAL", 1)
+
+        self._thread_loop = None
+        self._thread_lock = threading.Lock()
+        self._loop = None
+        self._pending = {}
+        self._flushers = {}
+        self.stats = defaultdict(int)
+
+    def _ensure_loop(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._pending = {}
+            self._flushers = {}
+        return loop
+
+    def _background_loop(self):
+        """간격 끝 전송 태스크가 요청보다 오래 살 수 있도록 프로세스당 하나 띄우는 이벤트 루프"""
+        with self._thread_lock:
+            if self._thread_loop is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name="metric-broadcaster", daemon=True).start()
+                self._thread_loop = loop
+        return self._thread_loop
+
+    def run_sync(self, changed, *args):
+        """동기 코드에서 지표 변경 알림 실행 (첫 전송까지 기다리고 오류는 호출한 쪽으로 전달)"""
+        asyncio.run_coroutine_threadsafe(changed(*args), self._background_loop()).result()
+
+    async def publish(self, key, group, read_event):
+        """key 지표가 바뀌었음을 알림 (read_event: 최신 값으로 이벤트를 만드는 코루틴 함수)"""
+        loop = self._ensure_loop()
+        self._pending[key] = (group, read_event)
+        if key in self._flushers:
+            self.stats["coalesced"] += 1
+            return
+
+        self._flushers[key] = loop.create_task(self._flush_loop(key))
+        await self._send(key)
+
+    async def _send(self, key):
+        """이번 간격에 아직 아무도 보내지 않았으면 최신 값 전송"""
+        if not await cache.aadd(WINDOW_KEY.format(key=key), 1, timeout=self.interval):
+            return False
+
+        group, read_event = self._pending.pop(key)
+        event = await read_event()
+        if event is not None:
+            await get_channel_layer().group_send(group, event)
+            self.stats["sent"] += 1
+        return True
+
+    async def _flush_loop(self, key):
+        """간격마다 밀린 변경이 있으면 전송, 없으면 종료"""
+        try:
+            while True:
+                await asyncio.sleep(self.interval)
+                if key not in self._pending:
+                    return
+                await self._send(key)
+        except Exception:
+            logger.exception("지표 브로드캐스트 오류 (%s)", key)
+        finally:
+            self._flushers.pop(key, None)
+
+
+async def read_online_stats():
+    return {"type": "online_stats", "online_users": await database_sync_to_async(stats.online_users)()}
+
+
+def read_room_members(room_id):
+    # 전용 루프의 스레드에는 요청 종료 시 연결 정리가 없으므로 database_sync_to_async로 조회
+    @database_sync_to_async
+    def read_member_count():
+        return ChatRoom.objects.filter(id=room_id).values_list("member_count", flat=True).first()
+
+    async def read():
+        member_count = await read_member_count()
+        if member_count is None:
+            return None
+        return {"type": "room_member_update", "room_id": room_id, "member_count": member_count}
+    return read
+
+
+async def online_users_changed():
+    """온라인 사용자 수 변경 (로그인/로그아웃)"""
+    await metric_broadcaster.publish("online_stats", topics.group_name(topics.STATS), read_online_stats)
+
+
+async def room_members_changed(room_id):
+    """방 인원수 변경 (입장/퇴장)"""
+    await metric_broadcaster.publish(
+        f"room_members:{room_id}",
+        topics.group_name(topics.room_members(room_id)),
+        read_room_members(room_id),
+    )
+
+
+metric_broadcaster = MetricBroadcaster()
+
+
+def notify(changed, *args):
+    """동기 코드(뷰)에서 지표 변경 알림 (예: metrics.notify(metrics.room_members_changed, room_id))"""
+    metric_broadcaster.run_sync(changed, *args)
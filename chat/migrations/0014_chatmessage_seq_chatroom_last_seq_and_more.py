@@ -0,0 +1,49 @@
+# Generated by Django 5.2.6 on 2026-10-17 06:30
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def backfill_sequences(apps, schema_editor):
+    """기존 메시지에 방별 순번을 매기고, 마지막 읽은 메시지를 순번으로 변환"""
+    from chat.sequences import resequence_room
+
+    ChatRoom = apps.get_model('chat', 'ChatRoom')
+    ChatMessage = apps.get_model('chat', 'ChatMessage')
+    RoomMember = apps.get_model('chat', 'RoomMember')
+
+    for room_id in ChatRoom.objects.values_list('id', flat=True).iterator():
+        last_seq = resequence_room(ChatMessage, room_id)
+        ChatRoom.objects.filter(id=room_id).update(last_seq=last_seq)
+
+    RoomMember.objects.filter(last_read_message__isnull=False).update(
+        last_read_seq=Subquery(
+            ChatMessage.objects.filter(id=OuterRef('last_read_message_id')).values('seq')[:1]
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chat', '0013_pushsubscription'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='chatmessage',
+            name='seq',
+            field=models.PositiveBigIntegerField(default=0, verbose_name='방 내 메시지 순번'),
+        ),
+        migrations.AddField(
+            model_name='chatroom',
+            name='last_seq',
+            field=models.PositiveBigIntegerField(default=0, verbose_name='마지막 메시지 순번'),
+        ),
+        migrations.AddField(
+            model_name='roommember',
+            name='last_read_seq',
+            field=models.PositiveBigIntegerField(default=0, verbose_name='마지막으로 읽은 메시지 순번'),
+        ),
+        migrations.RunPython(backfill_sequences, migrations.RunPython.noop),
+    ]
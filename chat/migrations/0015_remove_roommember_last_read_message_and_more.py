@@ -0,0 +1,21 @@
+# Generated by Django 5.2.6 on 2026-10-17 06:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chat', '0014_chatmessage_seq_chatroom_last_seq_and_more'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='roommember',
+            name='last_read_message',
+        ),
+        migrations.AddIndex(
+            model_name='chatmessage',
+            index=models.Index(fields=['room', 'seq'], name='chat_chatme_room_id_8e61cb_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.6 on 2026-10-17 06:35
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chat', '0015_remove_roommember_last_read_message_and_more'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='roommember',
+            name='is_currently_in_room',
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.6 on 2026-10-17 06:37
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chat', '0016_remove_roommember_is_currently_in_room'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='chatmessage',
+            index=models.Index(fields=['room', 'created_at', 'id'], name='chat_chatme_room_id_f48f41_idx'),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.6 on 2026-10-17 06:38
+
+from django.db import migrations, models
+
+
+def backfill_reaction_counts(apps, schema_editor):
+    """기존 반응으로 메시지별 반응 카운터 채우기"""
+    from chat.reactions import recount_reactions
+
+    recount_reactions(apps.get_model('chat', 'ChatMessage'), apps.get_model('chat', 'MessageReaction'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chat', '0017_chatmessage_room_created_at_id_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='chatmessage',
+            name='check_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='check 수'),
+        ),
+        migrations.AddField(
+            model_name='chatmessage',
+            name='good_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='good 수'),
+        ),
+        migrations.AddField(
+            model_name='chatmessage',
+            name='like_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='like 수'),
+        ),
+        migrations.RunPython(backfill_reaction_counts, migrations.RunPython.noop),
+    ]
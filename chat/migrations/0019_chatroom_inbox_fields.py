@@ -0,0 +1,49 @@
+# Generated by Django 5.2.6 on 2026-10-17 06:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_inbox_fields(apps, schema_editor):
+    """방별 멤버 수와 마지막 사용자 메시지 채우기"""
+    ChatRoom = apps.get_model('chat', 'ChatRoom')
+    ChatMessage = apps.get_model('chat', 'ChatMessage')
+    RoomMember = apps.get_model('chat', 'RoomMember')
+
+    members = RoomMember.objects.filter(room=OuterRef('pk')).order_by().values('room').annotate(total=Count('id')).values('total')
+    last_message = ChatMessage.objects.filter(
+        room=OuterRef('pk'), is_deleted=False, user__isnull=False
+    ).order_by('-created_at', '-id')
+    ChatRoom.objects.update(
+        member_count=Coalesce(Subquery(members, output_field=IntegerField()), 0),
+        last_message=Subquery(last_message.values('id')[:1]),
+        last_message_at=Subquery(last_message.values('created_at')[:1]),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chat', '0018_chatmessage_reaction_counts'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='chatroom',
+            name='last_message',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='chat.chatmessage', verbose_name='마지막 메시지'),
+        ),
+        migrations.AddField(
+            model_name='chatroom',
+            name='last_message_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='마지막 메시지 일시'),
+        ),
+        migrations.AddField(
+            model_name='chatroom',
+            name='member_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='멤버 수'),
+        ),
+        migrations.RunPython(backfill_inbox_fields, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.6 on 2026-10-17 07:09
+
+import django.contrib.postgres.indexes
+from django.contrib.postgres.operations import TrigramExtension
+import django.contrib.postgres.search
+import django.db.models.functions.text
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chat', '0019_chatroom_inbox_fields'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddField(
+            model_name='chatmessage',
+            name='search_vector',
+            field=models.GeneratedField(db_persist=True, expression=django.contrib.postgres.search.SearchVector('content', 'file_name', config='simple'), output_field=django.contrib.postgres.search.SearchVectorField()),
+        ),
+        migrations.AddIndex(
+            model_name='chatmessage',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='chat_message_search_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='chatmessage',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('content'), name='gin_trgm_ops'), name='chat_message_content_trgm_idx'),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.6 on 2026-10-17 07:15
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chat', '0020_chatmessage_search'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='chatmessage',
+            index=models.Index(condition=models.Q(('unread_count__gt', 0)), fields=['room', 'seq'], name='chat_message_unread_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='chatmessage',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['room', 'created_at', 'id'], name='chat_message_room_page_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='roommember',
+            index=models.Index(fields=['user', '-last_seen'], name='chat_member_user_seen_idx'),
+        ),
+        # 새 부분 인덱스를 만든 뒤 대체된 전체 인덱스 제거
+        migrations.RemoveIndex(
+            model_name='chatmessage',
+            name='chat_chatme_room_id_8e61cb_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='chatmessage',
+            name='chat_chatme_room_id_f48f41_idx',
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.6 on 2026-10-17 08:12
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chat', '0021_hot_query_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='roommember',
+            name='last_read_at',
+            field=models.DateTimeField(default=django.utils.timezone.now, verbose_name='마지막 읽음 처리 일시'),
+        ),
+        migrations.CreateModel(
+            name='RoomDeparture',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('left_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='퇴장일시')),
+                ('room', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='departures', to='chat.chatroom', verbose_name='채팅방')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='left_rooms', to=settings.AUTH_USER_MODEL, verbose_name='사용자')),
+            ],
+            options={
+                'verbose_name': '방 나가기 기록',
+                'verbose_name_plural': '방 나가기 기록들',
+                'indexes': [models.Index(fields=['user', 'left_at'], name='chat_departure_user_idx')],
+                'unique_together': {('room', 'user')},
+            },
+        ),
+    ]
@@ -1,8 +1,14 @@
-from django.db import models
+from django.contrib.postgres.indexes import GinIndex, OpClass
+from django.contrib.postgres.search import SearchVector, SearchVectorField
+from django.db import connection, models, transaction
+from django.db.models import F, Q, Subquery
+from django.db.models.functions import Greatest, Upper
 from django.contrib.auth.models import User
 from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 
+from chat.sequences import advances_seq
+
 class UserProfile(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name="profile", verbose_name="사용자")
     avatar = models.ImageField(upload_to="avatars/", blank=True, null=True, verbose_name="프로필 사진")
@@ -28,6 +34,11 @@ class ChatRoom(models.Model):
     max_members = models.PositiveIntegerField(default=100, verbose_name="최대 인원")
     is_private = models.BooleanField(default=False, verbose_name="비공개 방")
     password = models.CharField(max_length=20, blank=True, verbose_name="방 비밀번호")
+    last_seq = models.PositiveBigIntegerField(default=0, verbose_name="마지막 메시지 순번")
+    # 내 채팅방 목록용 비정규화 필드 (메시지 저장, 멤버 입장/퇴장 시 갱신)
+    last_message = models.ForeignKey("ChatMessage", on_delete=models.SET_NULL, null=True, blank=True, related_name="+", verbose_name="마지막 메시지")
+    last_message_at = models.DateTimeField(null=True, blank=True, verbose_name="마지막 메시지 일시")
+    member_count = models.PositiveIntegerField(default=0, verbose_name="멤버 수")
 
     class Meta:
         verbose_name = "채팅방"
@@ -42,6 +53,17 @@ class ChatRoom(models.Model):
         """총 메시지 수"""
         return self.messages.count()
 
+    def allocate_seq(self, count=1):
+        """메시지 순번 발급 (방 행을 원자적으로 증가시키고 마지막 순번 반환, 같은 행의 멤버 수도 함께 갱신)"""
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"UPDATE {ChatRoom._meta.db_table} SET last_seq = last_seq + %s "
+                "WHERE id = %s RETURNING last_seq, member_count",
+                [count, self.pk],
+            )
+            self.last_seq, self.member_count = cursor.fetchone()
+        return self.last_seq
+
 
 class RoomMember(models.Model):
     """채팅방 멤버 관리"""
@@ -52,17 +74,42 @@ class RoomMember(models.Model):
     nickname = models.CharField(max_length=30, blank=True, verbose_name="방 내 닉네임")
     joined_at = models.DateTimeField(auto_now_add=True, verbose_name="입장일시")
     last_seen = models.DateTimeField(default=timezone.now, verbose_name="방 마지막 접속")
-    is_currently_in_room = models.BooleanField(default=False, verbose_name="현재 방에 접속 중")
-    last_read_message = models.ForeignKey("ChatMessage", on_delete=models.SET_NULL, null=True, blank=True, verbose_name="마지막으로 읽은 메시지")
+    last_read_seq = models.PositiveBigIntegerField(default=0, verbose_name="마지막으로 읽은 메시지 순번")
+    last_read_at = models.DateTimeField(default=timezone.now, verbose_name="마지막 읽음 처리 일시")
     class Meta:
         verbose_name = "방 멤버"
         verbose_name_plural = "방 멤버들"
         unique_together = ["room", "user"]  # 한 방에 같은 유저는 한 번만
         ordering = ["-joined_at"]
+        indexes = [
+            # 내 방 목록 (user로 찾고 최근 접속순 정렬), 안읽은 수 맵도 user 접두사로 사용
+            models.Index(fields=["user", "-last_seen"], name="chat_member_user_seen_idx"),
+        ]
 
     def __str__(self):
         return f"{self.user.username} in {self.room.name}"
 
+    @property
+    def unread_messages_count(self):
+        """안읽은 메시지 수 (방의 마지막 순번 - 마지막으로 읽은 순번, 시스템 메시지는 순번을 올리지 않으므로 제외, 삭제된 메시지는 읽을 때까지 포함)"""
+        return max(0, self.room.last_seq - self.last_read_seq)
+
+
+class RoomDeparture(models.Model):
+    """방 나가기 기록 (내 방 목록 변경분 조회에서 나간 방을 알려주기 위해 사용자/방별 마지막 시각만 유지)"""
+
+    room = models.ForeignKey(ChatRoom, on_delete=models.CASCADE, related_name="departures", verbose_name="채팅방")
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="left_rooms", verbose_name="사용자")
+    left_at = models.DateTimeField(default=timezone.now, verbose_name="퇴장일시")
+
+    class Meta:
+        verbose_name = "방 나가기 기록"
+        verbose_name_plural = "방 나가기 기록들"
+        unique_together = ["room", "user"]
+        indexes = [
+            models.Index(fields=["user", "left_at"], name="chat_departure_user_idx"),
+        ]
+
 def upload_to(instance, filename):
     # media/chat_files/YYYY/MM/DD/filename
     return f'media/chatting/{timezone.now().strftime("%Y/%m/%d")}/{filename}'
@@ -90,10 +137,31 @@ class ChatMessage(models.Model):
     reply_to = models.ForeignKey("self", on_delete=models.CASCADE, null=True, blank=True, related_name="replies", verbose_name="답장 대상")
     unread_count = models.PositiveIntegerField(default=0, verbose_name="안 읽은 수")
     total_members_at_time = models.PositiveIntegerField(default=0, verbose_name="메시지 전송 당시 총 멤버 수")
+    seq = models.PositiveBigIntegerField(default=0, verbose_name="방 내 메시지 순번")
+    # 반응 유형별 개수 (chat.reactions.toggle_reaction이 반응 변경과 같은 트랜잭션에서 갱신)
+    like_count = models.PositiveIntegerField(default=0, verbose_name="like 수")
+    good_count = models.PositiveIntegerField(default=0, verbose_name="good 수")
+    check_count = models.PositiveIntegerField(default=0, verbose_name="check 수")
+    # 검색용 tsvector (내용 + 파일 이름), 저장/수정 시 DB가 계산
+    # 한국어 형태소 사전이 없으므로 공백 단위 simple 설정, 조사가 붙은 부분 일치는 trigram 인덱스로 검색
+    search_vector = models.GeneratedField(
+        expression=SearchVector("content", "file_name", config="simple"),
+        output_field=SearchVectorField(),
+        db_persist=True,
+    )
     class Meta:
         verbose_name = "채팅 메시지"
         verbose_name_plural = "채팅 메시지들"
         ordering = ["created_at"]
+        indexes = [
+            # 읽음 처리(mark_read)는 순번 구간에서 아직 안 읽은 메시지만 차감하므로 안읽은 메시지만 색인
+            models.Index(fields=["room", "seq"], condition=Q(unread_count__gt=0), name="chat_message_unread_idx"),
+            # 메시지 목록/첫 페이지 캐시/재전송 조회는 모두 삭제되지 않은 메시지만 (created_at, id) 순으로 읽음
+            models.Index(fields=["room", "created_at", "id"], condition=Q(is_deleted=False), name="chat_message_room_page_idx"),
+            GinIndex(fields=["search_vector"], name="chat_message_search_idx"),
+            # content__icontains(UPPER(content) LIKE) 검색용
+            GinIndex(OpClass(Upper("content"), name="gin_trgm_ops"), name="chat_message_content_trgm_idx"),
+        ]
 
     def __str__(self):
         if self.message_type == 'text':
@@ -126,29 +194,25 @@ class ChatMessage(models.Model):
             self.file_size /= 1024.0
         return f"{self.file_size:.1f}TB"
 
+    @property
+    def reaction_counts(self):
+        """반응 유형별 개수 (집계 쿼리 없이 카운터 필드에서 읽음)"""
+        return {"like": self.like_count, "good": self.good_count, "check": self.check_count}
+
     @property
     def is_read_by_all(self):
         """메시지 전송 당시 방에 있던 모든 멤버가 읽었는지 여부"""
         return self.unread_count == 0
 
     def mark_as_read_by(self, user):
-        """특정 사용자가 읽음 처리"""
-        if self.unread_count > 0:
-            # 이 사용자가 메시지 생성 당시 방에 있었는지 확인
-            try:
-                member = RoomMember.objects.get(
-                    room=self.room, 
-                    user=user,
-                    joined_at__lte=self.created_at
-                )
-                # 아직 이 메시지를 읽지 않았다면 읽음 처리
-                if not member.last_read_message or member.last_read_message.created_at < self.created_at:
-                    member.last_read_message = self
-                    member.save()
-                    self.unread_count = max(0, self.unread_count - 1)
-                    self.save(update_fields=['unread_count'])
-            except RoomMember.DoesNotExist:
-                pass
+        """특정 사용자가 이 메시지까지 읽음 처리 (변경된 (id, unread_count) 목록 반환)"""
+        from chat.receipts import mark_read
+
+        changed = mark_read(self.room_id, [user.id], up_to_seq=self.seq)
+        for message_id, unread_count in changed:
+            if message_id == self.pk:
+                self.unread_count = unread_count
+        return changed
     
     def save(self, *args, **kwargs):
         """메시지 저장 시 초기 읽음 수 설정"""
@@ -162,17 +226,39 @@ class ChatMessage(models.Model):
             self.total_members_at_time = current_members
             # 작성자 제외한 모든 멤버가 안 읽은 상태로 시작
             self.unread_count = max(0, current_members - 1) if self.user else current_members
-            
-        super().save(*args, **kwargs)
-        
+
+            # 순번 발급과 저장을 한 트랜잭션으로 묶어 순번 누락 방지
+            with transaction.atomic():
+                # 안읽은 수에 포함되지 않는 메시지는 순번을 올리지 않고 직전 순번을 함께 사용
+                self.seq = self.room.allocate_seq(1 if advances_seq(self.user_id, self.message_type) else 0)
+                super().save(*args, **kwargs)
+                # 사용자 메시지면 방 목록에 보일 마지막 메시지 갱신
+                if self.user_id:
+                    ChatRoom.objects.filter(id=self.room_id).update(
+                        last_message=self, last_message_at=self.created_at, updated_at=timezone.now()
+                    )
+        else:
+            with transaction.atomic():
+                super().save(*args, **kwargs)
+                # 방 목록에 보이는 마지막 메시지가 수정/삭제되면 방을 갱신해 목록 변경분(since)에 포함
+                rooms = ChatRoom.objects.filter(id=self.room_id, last_message_id=self.pk)
+                if self.is_deleted:
+                    latest = ChatMessage.objects.filter(
+                        room_id=self.room_id, user__isnull=False, is_deleted=False
+                    ).order_by("-created_at", "-id")
+                    rooms.update(
+                        last_message=Subquery(latest.values("id")[:1]),
+                        last_message_at=Subquery(latest.values("created_at")[:1]),
+                        updated_at=timezone.now(),
+                    )
+                else:
+                    rooms.update(updated_at=timezone.now())
+
         # 저장 후 작성자는 자동으로 읽음 처리
         if self.user and self.pk:
-            try:
-                member = RoomMember.objects.get(room=self.room, user=self.user)
-                member.last_read_message = self
-                member.save(update_fields=['last_read_message'])
-            except RoomMember.DoesNotExist:
-                pass
+            RoomMember.objects.filter(room=self.room, user=self.user).update(
+                last_read_seq=Greatest(F('last_read_seq'), self.seq)
+            )
 
 class MessageReaction(models.Model):
     """메세지 이모지 반응 모델"""
@@ -0,0 +1,161 @@
+import base64
+from datetime import datetime
+
+from django.db.models import Q
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+def encode_cursor(created_at, message_id):
+    """(created_at, id) 위치를 URL에 넣을 수 있는 커서 문자열로 변환"""
+    raw = f"{created_at.isoformat()}|{message_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    """커서 문자열을 (created_at, id)로 복원"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        created_at, message_id = raw.split("|")
+        return datetime.fromisoformat(created_at), int(message_id)
+    except (ValueError, UnicodeDecodeError):
+        raise ValidationError({"detail": "잘못된 커서입니다."})
+
+
+class MessageCursorPagination(BasePagination):
+    """
+    채팅 메시지 키셋(커서) 페이지네이션
+    (created_at, id) 기준으로 이어서 조회하므로 COUNT/OFFSET 없이 어느 위치든 같은 비용
+    - 기본: 최신 메시지부터
+    - before=<커서>: 커서보다 오래된 메시지 (스크롤백)
+    - after=<커서> / after_id=<메시지 ID>: 커서보다 새로운 메시지 (재연결 시 빠진 메시지)
+    결과는 항상 최신순, next는 더 오래된 페이지, previous는 더 새로운 페이지
+    """
+    page_size = 30
+    max_page_size = 100
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+
+        before = request.query_params.get("before")
+        after = request.query_params.get("after")
+        after_id = request.query_params.get("after_id")
+
+        if after_id:
+            try:
+                after_id = int(after_id)
+            except ValueError:
+                raise ValidationError({"detail": "after_id는 정수여야 합니다."})
+            position = queryset.filter(id=after_id).values_list("created_at", "id").first()
+            if position is None:
+                raise NotFound({"detail": "존재하지 않는 메시지입니다."})
+            after = encode_cursor(*position)
+
+        if after:
+            # 커서 바로 다음부터 오래된 순으로 읽은 뒤 최신순으로 뒤집음
+            created_at, message_id = decode_cursor(after)
+            queryset = queryset.filter(created_at__gte=created_at).exclude(
+                created_at=created_at, id__lte=message_id
+            ).order_by("created_at", "id")
+            rows = list(queryset[:self.page_size + 1])
+            self.has_newer = len(rows) > self.page_size
+            self.has_older = True
+            page = rows[:self.page_size][::-1]
+        else:
+            queryset = queryset.order_by("-created_at", "-id")
+            if before:
+                created_at, message_id = decode_cursor(before)
+                queryset = queryset.filter(created_at__lte=created_at).exclude(
+                    created_at=created_at, id__gte=message_id
+                )
+            rows = list(queryset[:self.page_size + 1])
+            self.has_older = len(rows) > self.page_size
+            self.has_newer = bool(before)
+            page = rows[:self.page_size]
+
+        self.page = page
+        return page
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params.get("page_size", self.page_size))
+        except ValueError:
+            return self.page_size
+        return max(1, min(page_size, self.max_page_size))
+
+    def get_next_link(self):
+        if not self.page or not self.has_older:
+            return None
+        oldest = self.page[-1]
+        url = self.request.build_absolute_uri()
+        for param in ("after", "after_id"):
+            url = remove_query_param(url, param)
+        return replace_query_param(url, "before", encode_cursor(oldest.created_at, oldest.id))
+
+    def get_previous_link(self):
+        if not self.page or not self.has_newer:
+            return None
+        newest = self.page[0]
+        url = self.request.build_absolute_uri()
+        for param in ("before", "after_id"):
+            url = remove_query_param(url, param)
+        return replace_query_param(url, "after", encode_cursor(newest.created_at, newest.id))
+
+    def get_paginated_response(self, data):
+        return Response({
+            "next": self.get_next_link(),
+            "previous": self.get_previous_link(),
+            "results": data,
+        })
+
+
+def encode_rank_cursor(rank, message_id):
+    """(관련도, id) 위치를 커서 문자열로 변환 (repr로 float를 손실 없이 보존)"""
+    raw = f"{rank!r}|{message_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_rank_cursor(cursor):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        rank, message_id = raw.split("|")
+        return float(rank), int(message_id)
+    except (ValueError, UnicodeDecodeError):
+        raise ValidationError({"detail": "잘못된 커서입니다."})
+
+
+class SearchCursorPagination(MessageCursorPagination):
+    """
+    검색 결과 키셋 페이지네이션
+    rank로 주석된 쿼리셋을 (rank, id) 내림차순으로 읽고, cursor=<커서>면 그보다 관련도가 낮은 결과부터
+    next만 있음 (더 관련도가 낮은 페이지)
+    """
+    page_size = 20
+    max_page_size = 50
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+
+        queryset = queryset.order_by("-rank", "-id")
+        cursor = request.query_params.get("cursor")
+        if cursor:
+            rank, message_id = decode_rank_cursor(cursor)
+            queryset = queryset.filter(Q(rank__lt=rank) | Q(rank=rank, id__lt=message_id))
+
+        rows = list(queryset[:self.page_size + 1])
+        self.has_older = len(rows) > self.page_size
+        self.page = rows[:self.page_size]
+        return self.page
+
+    def get_next_link(self):
+        if not self.page or not self.has_older:
+            return None
+        last = self.page[-1]
+        return replace_query_param(self.request.build_absolute_uri(), "cursor", encode_rank_cursor(last.rank, last.id))
+
+    def get_previous_link(self):
+        return None
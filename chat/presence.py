@@ -0,0 +1,226 @@
+import asyncio
+import time
+from datetime import datetime, timezone
+
+import redis
+import redis.asyncio as aioredis
+from django.conf import settings
+from django.db import connection, transaction
+
+from chat.models import RoomMember
+
+# 방별 접속 사용자: ZSET(user_id → 만료 시각), 같은 사용자의 연결 수: HASH(user_id → 연결 수)
+ROOM_KEY = "presence:room:{room_id}"
+CONN_KEY = "presence:room:{room_id}:conns"
+# 아직 DB에 반영하지 않은 방 마지막 접속 시각: HASH("room_id:user_id" → unix time)
+LAST_SEEN_KEY = "presence:last_seen"
+# 전체 접속의 만료 시각: ZSET("room_id:user_id" → 만료 시각), 정리 작업이 만료된 것만 범위 조회
+DEADLINES_KEY = "presence:deadlines"
+
+# 연결 수를 하나 줄이고 마지막 연결이었으면 방 접속자에서 제거
+LEAVE_SCRIPT = """
+local remaining = redis.call('HINCRBY', KEYS[2], ARGV[1], -1)
+if remaining <= 0 then
+    redis.call('HDEL', KEYS[2], ARGV[1])
+    redis.call('ZREM', KEYS[1], ARGV[1])
+    redis.call('ZREM', KEYS[3], ARGV[2])
+end
+return remaining
+"""
+
+# 만료 시각이 지난 접속을 최대 ARGV[2]개 정리 (하트비트 없이 끊긴 연결, 워커 비정상 종료)
+# 방 ZSET에서 그 사이 다시 연장된 접속은 남겨 두고 만료 목록에서만 제거
+REAP_SCRIPT = """
+local expired = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1], 'LIMIT', 0, ARGV[2])
+local reaped = 0
+for _, member in ipairs(expired) do
+    local sep = string.find(member, ':', 1, true)
+    local room_key = ARGV[3] .. string.sub(member, 1, sep - 1)
+    local user_id = string.sub(member, sep + 1)
+    local score = redis.call('ZSCORE', room_key, user_id)
+    if score and tonumber(score) <= tonumber(ARGV[1]) then
+        redis.call('ZREM', room_key, user_id)
+        redis.call('HDEL', room_key .. ':conns', user_id)
+        reaped = reaped + 1
+    end
+end
+if #expired > 0 then
+    redis.call('ZREM', KEYS[1], unpack(expired))
+end
+return {#expired, reaped}
+"""
+
+# 새로 쌓인 마지막 접속 시각을 반영 대기 키(이전 반영이 실패해 남은 기록 포함)에 더 늦은 값으로 합친 뒤
+# 원래 키를 비우고 반영할 항목 수 반환
+MERGE_LAST_SEEN_SCRIPT = """
+local entries = redis.call('HGETALL', KEYS[1])
+for i = 1, #entries, 2 do
+    local pending = redis.call('HGET', KEYS[2], entries[i])
+    if not pending or tonumber(pending) < tonumber(entries[i + 1]) then
+        redis.call('HSET', KEYS[2], entries[i], entries[i + 1])
+    end
+end
+redis.call('DEL', KEYS[1])
+return redis.call('HLEN', KEYS[2])
+"""
+
+# 만료된 접속자를 정리한 뒤 남은 접속자 수 반환
+PRUNE_SCRIPT = """
+local expired = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1])
+if #expired > 0 then
+    redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', ARGV[1])
+    redis.call('HDEL', KEYS[2], unpack(expired))
+end
+return redis.call('ZCARD', KEYS[1])
+"""
+
+_client = None
+_async_clients = {}
+
+
+def get_redis_url():
+    """PRESENCE_REDIS_URL 설정, 없으면 채널 레이어와 같은 Redis 사용"""
+    url = getattr(settings, "PRESENCE_REDIS_URL", None)
+    if url:
+        return url
+    host = settings.CHANNEL_LAYERS["default"]["CONFIG"]["hosts"][0]
+    if isinstance(host, str):
+        return host
+    return f"redis://{host[0]}:{host[1]}/0"
+
+
+def get_client():
+    """동기 Redis 클라이언트 (뷰, DB 스레드용)"""
+    global _client
+    if _client is None:
+        _client = redis.Redis.from_url(get_redis_url(), decode_responses=True)
+    return _client
+
+
+def get_async_client():
+    """이벤트 루프별 비동기 Redis 클라이언트 (Consumer용)"""
+    loop = asyncio.get_running_loop()
+    if loop not in _async_clients:
+        _async_clients[loop] = aioredis.Redis.from_url(get_redis_url(), decode_responses=True)
+    return _async_clients[loop]
+
+
+def presence_ttl():
+    return getattr(settings, "PRESENCE_TTL", 90)
+
+
+def _keys(room_id):
+    return ROOM_KEY.format(room_id=room_id), CONN_KEY.format(room_id=room_id)
+
+
+def _member(room_id, user_id):
+    return f"{room_id}:{user_id}"
+
+
+# Consumer 연결 수명주기 (비동기)
+async def join(room_id, user_id):
+    """방 접속 등록 (연결 수 증가, 만료 시각 갱신, 마지막 접속 기록)"""
+    room_key, conn_key = _keys(room_id)
+    now = time.time()
+    async with get_async_client().pipeline(transaction=True) as pipe:
+        pipe.hincrby(conn_key, user_id, 1)
+        pipe.zadd(room_key, {user_id: now + presence_ttl()})
+        pipe.zadd(DEADLINES_KEY, {_member(room_id, user_id): now + presence_ttl()})
+        pipe.hset(LAST_SEEN_KEY, _member(room_id, user_id), now)
+        await pipe.execute()
+
+
+async def heartbeat(room_id, user_id):
+    """접속 유지 신호 (클라이언트 응답을 확인한 연결만 호출, 만료 시각 연장)"""
+    room_key, conn_key = _keys(room_id)
+    now = time.time()
+    async with get_async_client().pipeline(transaction=True) as pipe:
+        pipe.zadd(room_key, {user_id: now + presence_ttl()})
+        pipe.zadd(DEADLINES_KEY, {_member(room_id, user_id): now + presence_ttl()})
+        pipe.hset(LAST_SEEN_KEY, _member(room_id, user_id), now)
+        await pipe.execute()
+
+
+async def leave(room_id, user_id):
+    """방 접속 해제 (마지막 연결이면 접속자에서 제거)"""
+    room_key, conn_key = _keys(room_id)
+    client = get_async_client()
+    await client.eval(LEAVE_SCRIPT, 3, room_key, conn_key, DEADLINES_KEY, user_id, _member(room_id, user_id))
+    await client.hset(LAST_SEEN_KEY, _member(room_id, user_id), time.time())
+
+
+async def aonline_user_ids(room_id):
+    """방에 현재 접속 중인 사용자 ID 목록 (Consumer용)"""
+    room_key, _ = _keys(room_id)
+    user_ids = await get_async_client().zrangebyscore(room_key, time.time(), "+inf")
+    return [int(user_id) for user_id in user_ids]
+
+
+# 조회 (동기)
+def online_count(room_id):
+    """방의 현재 접속자 수"""
+    room_key, conn_key = _keys(room_id)
+    return get_client().eval(PRUNE_SCRIPT, 2, room_key, conn_key, time.time())
+
+
+def online_user_ids(room_id):
+    """방에 현재 접속 중인 사용자 ID 목록"""
+    room_key, _ = _keys(room_id)
+    return [int(user_id) for user_id in get_client().zrangebyscore(room_key, time.time(), "+inf")]
+
+
+def touch(room_id, user_id):
+    """HTTP 요청에서 방 마지막 접속 시각만 기록 (DB 반영은 flush_last_seen)"""
+    get_client().hset(LAST_SEEN_KEY, _member(room_id, user_id), time.time())
+
+
+def reap_expired(batch_size=1000):
+    """
+    만료 시각이 지난 접속을 일괄 정리 (django_crontab)
+    전체 만료 ZSET에서 지난 것만 범위 조회하므로 추적 중인 접속 수와 무관하게 정리할 양에 비례
+    (검사한 수, 정리한 접속 수) 반환
+    """
+    client = get_client()
+    room_prefix = ROOM_KEY.format(room_id="")
+    now = time.time()
+    scanned = reaped = 0
+    while True:
+        batch_scanned, batch_reaped = client.eval(REAP_SCRIPT, 1, DEADLINES_KEY, now, batch_size, room_prefix)
+        scanned += batch_scanned
+        reaped += batch_reaped
+        if batch_scanned < batch_size:
+            return scanned, reaped
+
+
+def flush_last_seen(batch_size=500):
+    """
+    쌓인 마지막 접속 시각을 RoomMember.last_seen에 일괄 반영 (write-behind)
+    기록을 반영 대기 키로 원자적으로 옮겨 가져오므로 반영 중 새로 들어온 기록은 다음 주기에 처리
+    반영 대기 키는 DB 커밋 후에만 지우고, 실패하면 남겨 두었다가 다음 주기에 새 기록과 합쳐 다시 반영
+    """
+    client = get_client()
+    pending_key = f"{LAST_SEEN_KEY}:flushing"
+    if not client.eval(MERGE_LAST_SEEN_SCRIPT, 2, LAST_SEEN_KEY, pending_key):
+        # 반영할 기록 없음
+        return 0
+    entries = client.hgetall(pending_key)
+
+    rows = []
+    for key, ts in entries.items():
+        room_id, user_id = key.split(":")
+        rows.append((int(room_id), int(user_id), datetime.fromtimestamp(float(ts), tz=timezone.utc)))
+
+    table = RoomMember._meta.db_table
+    with transaction.atomic():
+        for start in range(0, len(rows), batch_size):
+            batch = rows[start:start + batch_size]
+            values = ", ".join(["(%s, %s, %s::timestamptz)"] * len(batch))
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f"UPDATE {table} m SET last_seen = v.last_seen "
+                    f"FROM (VALUES {values}) AS v(room_id, user_id, last_seen) "
+                    "WHERE m.room_id = v.room_id AND m.user_id = v.user_id AND m.last_seen < v.last_seen",
+                    [value for row in batch for value in row],
+                )
+        transaction.on_commit(lambda: client.delete(pending_key))
+    return len(rows)
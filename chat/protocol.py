@@ -0,0 +1,221 @@
+import asyncio
+import json
+import logging
+import time
+
+import msgpack
+from django.conf import settings
+
+from chat.flowcontrol import InboundLimiter, arecord_connection
+
+logger = logging.getLogger(__name__)
+
+# 클라이언트가 연결 시 Sec-WebSocket-Protocol로 요청하면 바이너리(MessagePack) 프레임 사용, 기본은 JSON 텍스트
+MSGPACK_SUBPROTOCOL = "msgpack"
+
+
+class FrameDecodeError(ValueError):
+    """수신 프레임을 해석할 수 없음"""
+
+
+def encode_json(payload):
+    return json.dumps(payload)
+
+
+def encode_msgpack(payload):
+    return msgpack.packb(payload, use_bin_type=True)
+
+
+class FrameProtocolMixin:
+    """
+    WebSocket 프레임 인코딩 협상과 연결별 흐름 제어 (AsyncWebsocketConsumer용)
+    - 연결 시 msgpack 서브프로토콜을 요청한 클라이언트는 바이너리 프레임으로 송수신
+    - 그 외에는 기존과 같은 JSON 텍스트 프레임
+    - 수신: 프레임 크기 제한, 메시지 타입별 토큰 버킷 (초과 프레임은 버리고, 계속 넘치면 연결 종료)
+      해석할 수 없는 프레임도 공용 버킷에서 차감하고 집계, WS_MALFORMED_EVICT_AFTER개가 되면 연결 종료
+    - 송신: 연결별 크기 제한 큐를 전송 작업 하나가 비움 (느린 연결은 WS_OUTBOUND_POLICY에 따라 버리거나 종료)
+    - 하트비트: WS_PING_INTERVAL마다 ping 전송, 클라이언트 프레임이 WS_PING_TIMEOUT 동안 없으면 종료
+    - 지표: 흐름 제어 집계는 ping 주기마다, 연결 종료 시 늘어난 만큼 공유 카운터에 반영
+    이벤트 스키마(dict 구조)는 두 방식이 동일
+    """
+    use_msgpack = False
+    outbound = None
+
+    async def accept_frames(self):
+        """요청된 서브프로토콜에 맞춰 연결 수락 후 송신 작업 시작"""
+        self.use_msgpack = MSGPACK_SUBPROTOCOL in self.scope.get("subprotocols", [])
+        self.limiter = InboundLimiter()
+        self.flow_counters = {
+            "throttled_frames": 0,
+            "throttled_connections": 0,
+            "dropped_frames": 0,
+            "evicted_connections": 0,
+            "oversized_frames": 0,
+            "malformed_frames": 0,
+        }
+        self.flow_reported = dict(self.flow_counters)
+        self.outbound = asyncio.Queue(maxsize=getattr(settings, "WS_OUTBOUND_QUEUE_SIZE", 256))
+        await self.accept(subprotocol=MSGPACK_SUBPROTOCOL if self.use_msgpack else None)
+        self.last_client_frame = self.last_ping = time.monotonic()
+        self.writer_task = asyncio.create_task(self._write_frames())
+        self.ping_task = asyncio.create_task(self._ping_loop())
+
+    async def stop_frames(self):
+        """송신/ping 작업 종료 후 남은 흐름 제어 집계를 공유 지표에 반영 (disconnect에서 호출)"""
+        if self.outbound is None:
+            return
+        self.writer_task.cancel()
+        self.ping_task.cancel()
+        self.outbound = None
+        await self.flush_flow_counters()
+
+    async def flush_flow_counters(self):
+        """직전 반영 이후 늘어난 연결별 흐름 제어 집계만 공유 지표에 반영 (ping 주기마다, 연결 종료 시)"""
+        snapshot = dict(self.flow_counters)
+        deltas = {name: value - self.flow_reported[name] for name, value in snapshot.items()}
+        if not any(deltas.values()):
+            return
+        try:
+            await arecord_connection(deltas)
+        except Exception:
+            # 반영하지 못한 만큼은 다음 주기에 다시 시도
+            logger.exception("연결 제어 지표 반영 오류")
+            return
+        self.flow_reported = snapshot
+
+    async def admit_frame(self, text_data=None, bytes_data=None):
+        """
+        수신 프레임 크기/속도 제한 확인 후 dict로 변환 (거부된 프레임이면 None)
+        해석 전에 공용("*") 버킷에서 먼저 차감해 해석할 수 없는 프레임도 속도 제한에 걸리게 하고,
+        타입별 버킷이 있는 프레임은 해석 후 공용 토큰을 돌려주고 그 타입 버킷에서 차감
+        """
+        size = len(bytes_data) if bytes_data is not None else len(text_data or "")
+        if size > getattr(settings, "WS_MAX_FRAME_BYTES", 65536):
+            self.flow_counters["oversized_frames"] += 1
+            await self.close(code=1009)
+            return None
+
+        self.last_client_frame = time.monotonic()
+        shared = self.limiter.bucket("*")
+        if not shared.take():
+            await self.throttle(shared)
+            return None
+
+        try:
+            data = self.decode_frame(text_data, bytes_data)
+        except FrameDecodeError:
+            self.flow_counters["malformed_frames"] += 1
+            if self.flow_counters["malformed_frames"] >= getattr(settings, "WS_MALFORMED_EVICT_AFTER", 20):
+                await self.evict(1008)
+            return None
+
+        message_type = data.get("type")
+        bucket = self.limiter.bucket(message_type)
+        if message_type == "pong" or bucket is not shared:
+            shared.refund()
+        if message_type == "pong":
+            return None
+        if bucket is shared or bucket.take():
+            return data
+        await self.throttle(bucket, data)
+        return None
+
+    async def throttle(self, bucket, data=None):
+        """제한을 넘은 프레임 집계 후 rate_limited 응답 (계속 넘치면 1008로 종료, 해석 전이면 data는 None)"""
+        if not self.flow_counters["throttled_frames"]:
+            self.flow_counters["throttled_connections"] = 1
+        self.flow_counters["throttled_frames"] += 1
+        if self.flow_counters["throttled_frames"] >= getattr(settings, "WS_RATE_LIMIT_EVICT_AFTER", 200):
+            await self.evict(1008)
+            return
+
+        data = data or {}
+        await self.send_frame({
+            "type": "rate_limited",
+            "message_type": data.get("type"),
+            "client_id": data.get("client_id"),
+            "retry_after": round(bucket.retry_after(), 3),
+        })
+
+    def decode_frame(self, text_data=None, bytes_data=None):
+        """수신 프레임을 dict로 변환"""
+        try:
+            if bytes_data is not None:
+                data = msgpack.unpackb(bytes_data, raw=False)
+            else:
+                data = json.loads(text_data)
+        except (ValueError, msgpack.UnpackException) as e:
+            raise FrameDecodeError(str(e)) from e
+        if not isinstance(data, dict):
+            raise FrameDecodeError("프레임은 객체여야 합니다.")
+        return data
+
+    async def send_frame(self, payload):
+        """협상된 방식으로 이벤트 전송"""
+        if self.use_msgpack:
+            await self.enqueue_frame(bytes_data=encode_msgpack(payload))
+        else:
+            await self.enqueue_frame(text_data=encode_json(payload))
+
+    async def encoded_frame(self, event):
+        """보내는 쪽에서 미리 인코딩한 두 형식 중 협상한 형식의 프레임을 그대로 전달 (chat.broadcast.group_send)"""
+        if self.use_msgpack:
+            await self.enqueue_frame(bytes_data=event["bytes"])
+        else:
+            await self.enqueue_frame(text_data=event["text"])
+
+    async def send_frame_waiting(self, payload):
+        """송신 큐에 자리가 날 때까지 기다렸다가 전송 (재전송처럼 한 번에 많은 프레임을 보낼 때)"""
+        if self.outbound is None:
+            return
+        if self.use_msgpack:
+            await self.outbound.put((None, encode_msgpack(payload)))
+        else:
+            await self.outbound.put((encode_json(payload), None))
+
+    async def enqueue_frame(self, text_data=None, bytes_data=None):
+        """송신 큐에 프레임 추가 (큐가 가득 차면 WS_OUTBOUND_POLICY: drop은 버림, disconnect는 연결 종료)"""
+        # 종료 처리 중인 연결의 프레임은 버린 것으로 세지 않음
+        if self.outbound is None or self.flow_counters["evicted_connections"]:
+            return
+        try:
+            self.outbound.put_nowait((text_data, bytes_data))
+        except asyncio.QueueFull:
+            self.flow_counters["dropped_frames"] += 1
+            if getattr(settings, "WS_OUTBOUND_POLICY", "disconnect") == "disconnect":
+                await self.evict(1013)
+
+    async def evict(self, code):
+        """흐름 제어 위반 연결 종료 (1008: 수신 속도 초과, 1013: 송신이 밀림)"""
+        if self.outbound is None or self.flow_counters["evicted_connections"]:
+            return
+        self.flow_counters["evicted_connections"] = 1
+        self.writer_task.cancel()
+        await self.close(code=code)
+
+    async def on_heartbeat(self):
+        """직전 ping 이후 클라이언트 프레임이 도착한 연결에서 ping 주기마다 호출 (접속 유지 처리용)"""
+
+    async def _ping_loop(self):
+        interval = getattr(settings, "WS_PING_INTERVAL", 25)
+        timeout = getattr(settings, "WS_PING_TIMEOUT", 60)
+        while True:
+            await asyncio.sleep(interval)
+            # 연결 중인 제한/종료 대상도 지표에 보이도록 주기마다 반영
+            await self.flush_flow_counters()
+            if time.monotonic() - self.last_client_frame > timeout:
+                # 응답 없는 연결 (네트워크 단절 등) 종료
+                await self.close(code=4000)
+                return
+            if self.last_client_frame >= self.last_ping:
+                try:
+                    await self.on_heartbeat()
+                except Exception:
+                    logger.exception("하트비트 처리 오류")
+            self.last_ping = time.monotonic()
+            await self.send_frame({"type": "ping"})
+
+    async def _write_frames(self):
+        while True:
+            text_data, bytes_data = await self.outbound.get()
+            await self.send(text_data=text_data, bytes_data=bytes_data)
@@ -0,0 +1,175 @@
+import asyncio
+import json
+import logging
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+from channels.db import database_sync_to_async
+from django.conf import settings
+
+from chat import presence
+from chat.models import ChatRoom, PushSubscription, RoomMember
+from chat.utils import deliver_web_push
+
+logger = logging.getLogger(__name__)
+
+# 구독이 더 이상 유효하지 않음을 뜻하는 푸시 서비스 응답 코드
+GONE_STATUS_CODES = (404, 410)
+# 잠시 후 다시 시도할 만한 응답 코드
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+
+
+class PushDispatcher:
+    """
+    웹 푸시 비동기 발송기
+    메시지 경로에서는 enqueue만 하고, 대상 조회와 HTTP 발송은 백그라운드 작업이 담당
+    - 작업 큐 → 대상 조회 태스크 → 발송 큐 → 고정 개수의 발송 워커
+    - 푸시 서비스(엔드포인트 origin)별 동시 발송 수 제한
+    - 일시적 실패는 지수 백오프로 재시도, 404/410 응답 구독은 자동 삭제
+    """
+
+    def __init__(self):
+        self.workers = getattr(settings, "PUSH_WORKERS", 8)
+        self.queue_size = getattr(settings, "PUSH_QUEUE_SIZE", 1000)
+        self.per_endpoint_limit = getattr(settings, "PUSH_PER_ENDPOINT_CONCURRENCY", 4)
+        self.max_retries = getattr(settings, "PUSH_MAX_RETRIES", 3)
+        self.retry_backoff = getattr(settings, "PUSH_RETRY_BACKOFF", 0.5)
+        self.timeout = getattr(settings, "PUSH_TIMEOUT", 10)
+
+        self._loop = None
+        self._jobs = None
+        self._deliveries = None
+        self._tasks = []
+        self._limits = {}
+        self._executor = None
+        self.stats = defaultdict(int)
+
+    def _ensure_started(self):
+        """현재 이벤트 루프에서 워커가 돌고 있지 않으면 시작"""
+        loop = asyncio.get_running_loop()
+        if self._loop is loop:
+            return
+
+        self._loop = loop
+        self._jobs = asyncio.Queue(maxsize=self.queue_size)
+        self._deliveries = asyncio.Queue(maxsize=self.queue_size)
+        self._limits = {}
+        if self._executor is None:
+            # DB 스레드와 분리된 HTTP 전용 스레드 풀
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="webpush")
+
+        self._tasks = [loop.create_task(self._resolve_loop())]
+        self._tasks += [loop.create_task(self._deliver_loop()) for _ in range(self.workers)]
+
+    def enqueue(self, room_id, sender_id, sender_name, message):
+        """새 메시지 푸시 작업 등록 (대기 없이 즉시 반환, 큐가 가득 차면 버림)"""
+        self._ensure_started()
+        try:
+            self._jobs.put_nowait((room_id, sender_id, sender_name, message))
+            self.stats["enqueued"] += 1
+            return True
+        except asyncio.QueueFull:
+            self.stats["dropped"] += 1
+            logger.warning("푸시 작업 큐가 가득 차 알림을 버렸습니다 (room=%s)", room_id)
+            return False
+
+    async def join(self):
+        """대기 중인 작업과 발송이 모두 끝날 때까지 대기 (테스트/벤치마크용)"""
+        if self._jobs is not None:
+            await self._jobs.join()
+            await self._deliveries.join()
+
+    async def _resolve_loop(self):
+        while True:
+            job = await self._jobs.get()
+            try:
+                for delivery in await get_push_targets(*job):
+                    await self._deliveries.put(delivery)
+            except Exception:
+                logger.exception("푸시 대상 조회 오류")
+            finally:
+                self._jobs.task_done()
+
+    async def _deliver_loop(self):
+        while True:
+            subscription_id, subscription_info, payload = await self._deliveries.get()
+            try:
+                await self._deliver(subscription_id, subscription_info, payload)
+            except Exception:
+                logger.exception("푸시 발송 오류")
+            finally:
+                self._deliveries.task_done()
+
+    def _limit_for(self, endpoint):
+        origin = "{0.scheme}://{0.netloc}".format(urlsplit(endpoint))
+        if origin not in self._limits:
+            self._limits[origin] = asyncio.Semaphore(self.per_endpoint_limit)
+        return self._limits[origin]
+
+    async def _deliver(self, subscription_id, subscription_info, payload):
+        """한 구독에 발송 (재시도 포함)"""
+        limit = self._limit_for(subscription_info["endpoint"])
+
+        for attempt in range(self.max_retries + 1):
+            async with limit:
+                try:
+                    status_code = await self._loop.run_in_executor(
+                        self._executor, deliver_web_push, subscription_info, payload, self.timeout
+                    )
+                except Exception as e:
+                    # 연결 실패 등 네트워크 오류는 재시도 대상
+                    logger.warning("푸시 전송 실패 (%s): %r", subscription_info["endpoint"][:50], e)
+                    status_code = None
+
+            if status_code is not None and 200 <= status_code < 300:
+                self.stats["sent"] += 1
+                return
+            if status_code in GONE_STATUS_CODES:
+                await delete_subscription(subscription_id)
+                self.stats["pruned"] += 1
+                return
+            if status_code is not None and status_code not in RETRY_STATUS_CODES:
+                self.stats["failed"] += 1
+                return
+            if attempt < self.max_retries:
+                self.stats["retried"] += 1
+                await asyncio.sleep(self.retry_backoff * (2 ** attempt))
+
+        self.stats["failed"] += 1
+
+
+@database_sync_to_async
+def get_push_targets(room_id, sender_id, sender_name, message):
+    """방에 접속 중이 아닌 멤버들의 푸시 구독 목록 조회 (쿼리 2회)"""
+    room_name = ChatRoom.objects.filter(id=room_id).values_list("name", flat=True).first()
+    if room_name is None:
+        return []
+
+    online_user_ids = presence.online_user_ids(room_id)
+    offline_user_ids = RoomMember.objects.filter(room_id=room_id).exclude(
+        user_id__in=[sender_id, *online_user_ids]
+    ).values("user_id")
+    subscriptions = PushSubscription.objects.filter(user_id__in=offline_user_ids)
+
+    payload = json.dumps({
+        "title": f"{room_name} 새 메세지 알림",
+        "body": f"{sender_name}: {message}",
+    })
+    return [
+        (
+            sub.id,
+            {"endpoint": sub.endpoint, "keys": {"p256dh": sub.p256dh, "auth": sub.auth}},
+            payload,
+        )
+        for sub in subscriptions
+    ]
+
+
+@database_sync_to_async
+def delete_subscription(subscription_id):
+    """만료된 구독 삭제"""
+    PushSubscription.objects.filter(id=subscription_id).delete()
+
+
+push_dispatcher = PushDispatcher()
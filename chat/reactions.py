@@ -0,0 +1,92 @@
+from django.db import transaction
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, Greatest
+
+from chat import history
+from chat.models import ChatMessage, MessageReaction
+
+REACTION_TYPES = [reaction_type for reaction_type, _ in MessageReaction.REACTION_CHOICES]
+
+
+def count_field(reaction_type):
+    """반응 유형별 ChatMessage 카운터 필드 이름"""
+    return f"{reaction_type}_count"
+
+
+def _increment(reaction_type):
+    field = count_field(reaction_type)
+    return {field: F(field) + 1}
+
+
+def _decrement(reaction_type):
+    # 카운터가 어긋나 있어도 음수가 되지 않도록 0에서 멈춤
+    field = count_field(reaction_type)
+    return {field: Greatest(F(field) - 1, Value(0))}
+
+
+def toggle_reaction(message, user, reaction_type):
+    """
+    반응 추가/변경/제거 후 (action, reaction_counts) 반환
+    반응 행 변경과 메시지 카운터 갱신(F 식)을 한 트랜잭션에서 처리
+    실제로 바뀐 행이 있을 때만 카운터를 움직여 동시 요청에도 중복 증감하지 않음
+    """
+    messages = ChatMessage.objects.filter(id=message.id)
+
+    with transaction.atomic():
+        existing = MessageReaction.objects.filter(message=message, user=user).only("id", "reaction_type").first()
+
+        if existing and existing.reaction_type == reaction_type:
+            # 동일한 리액션이면 제거
+            deleted, _ = MessageReaction.objects.filter(id=existing.id).delete()
+            if deleted:
+                messages.update(**_decrement(reaction_type))
+            action = "removed"
+        elif existing:
+            # 다른 리액션이면 변경
+            updated = MessageReaction.objects.filter(
+                id=existing.id, reaction_type=existing.reaction_type
+            ).update(reaction_type=reaction_type)
+            if updated:
+                messages.update(**_decrement(existing.reaction_type), **_increment(reaction_type))
+            action = "updated"
+        else:
+            # 새로운 리액션 추가
+            MessageReaction.objects.create(message=message, user=user, reaction_type=reaction_type)
+            messages.update(**_increment(reaction_type))
+            action = "added"
+
+        counts = messages.values(*[count_field(t) for t in REACTION_TYPES]).get()
+        reaction_counts = {t: counts[count_field(t)] for t in REACTION_TYPES}
+        history.reaction_changed(message, user, None if action == "removed" else reaction_type, reaction_counts)
+
+    return action, reaction_counts
+
+
+def recount_reactions(message_model, reaction_model, batch_size=1000, message_ids=None):
+    """
+    MessageReaction 기준으로 메시지 반응 카운터를 다시 계산
+    메시지 ID 순으로 배치를 나눠 배치마다 UPDATE 한 번, 처리한 메시지 수 반환
+    마이그레이션(과거 모델)과 관리 명령(현재 모델)에서 함께 사용
+    """
+    counts = {}
+    for reaction_type in REACTION_TYPES:
+        per_type = reaction_model.objects.filter(
+            message=OuterRef("pk"), reaction_type=reaction_type
+        ).order_by().values("message").annotate(total=Count("id")).values("total")
+        counts[count_field(reaction_type)] = Coalesce(Subquery(per_type, output_field=IntegerField()), 0)
+
+    messages = message_model.objects.order_by("id")
+    if message_ids is not None:
+        messages = messages.filter(id__in=message_ids)
+
+    processed = 0
+    last_id = 0
+    while True:
+        batch = list(messages.filter(id__gt=last_id).values_list("id", flat=True)[:batch_size])
+        if not batch:
+            break
+        message_model.objects.filter(id__in=batch).update(**counts)
+        processed += len(batch)
+        last_id = batch[-1]
+
+    return processed
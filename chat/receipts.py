@@ -0,0 +1,80 @@
+from django.db import connection
+from django.utils import timezone
+
+from chat import history
+from chat.models import ChatMessage, ChatRoom, RoomMember
+
+
+MARK_READ_SQL = f"""
+WITH target AS (
+    SELECT LEAST(COALESCE(%(up_to_seq)s::bigint, last_seq), last_seq) AS seq
+    FROM {ChatRoom._meta.db_table}
+    WHERE id = %(room_id)s
+),
+prev AS (
+    SELECT m.id, m.user_id, m.joined_at, m.last_read_seq
+    FROM {RoomMember._meta.db_table} m, target
+    WHERE m.room_id = %(room_id)s
+      AND m.user_id = ANY(%(user_ids)s)
+      AND m.last_read_seq < target.seq
+    FOR UPDATE OF m
+),
+advanced AS (
+    UPDATE {RoomMember._meta.db_table} m
+    SET last_read_seq = target.seq, last_read_at = %(read_at)s
+    FROM prev, target
+    WHERE m.id = prev.id
+    RETURNING prev.user_id, prev.joined_at, prev.last_read_seq AS old_seq, target.seq AS new_seq
+),
+decrements AS (
+    SELECT c.id, COUNT(*) AS readers
+    FROM {ChatMessage._meta.db_table} c
+    JOIN advanced a
+      ON c.seq > a.old_seq
+     AND c.seq <= a.new_seq
+     AND c.created_at >= a.joined_at
+     AND c.user_id IS DISTINCT FROM a.user_id
+    WHERE c.room_id = %(room_id)s
+      AND c.unread_count > 0
+    GROUP BY c.id
+)
+UPDATE {ChatMessage._meta.db_table} c
+SET unread_count = GREATEST(c.unread_count - d.readers, 0)
+FROM decrements d
+WHERE c.id = d.id
+RETURNING c.id, c.unread_count
+"""
+
+
+def mark_read(room_id, user_ids, up_to_seq=None):
+    """
+    여러 멤버의 읽은 순번을 up_to_seq(기본값: 방의 마지막 순번)까지 한 번에 이동
+    이동한 구간에 속한 메시지의 unread_count를 단일 UPDATE ... RETURNING으로 차감하고
+    변경된 (message_id, unread_count) 목록을 반환
+    """
+    user_ids = list(user_ids)
+    if not user_ids:
+        return []
+
+    with connection.cursor() as cursor:
+        cursor.execute(MARK_READ_SQL, {
+            "room_id": room_id,
+            "user_ids": user_ids,
+            "up_to_seq": up_to_seq,
+            "read_at": timezone.now(),
+        })
+        changed = sorted(cursor.fetchall())
+    history.unread_changed(room_id, changed)
+    return changed
+
+
+def as_read_updates(changed):
+    """(id, unread_count) 목록을 messages_read_count_update 페이로드 형태로 변환"""
+    return [
+        {
+            'id': message_id,
+            'unread_count': unread_count,
+            'is_read_by_all': unread_count == 0,
+        }
+        for message_id, unread_count in changed
+    ]
@@ -0,0 +1,120 @@
+import json
+from datetime import datetime
+
+from django.conf import settings
+
+from chat import broadcast
+from chat.presence import get_async_client, get_client
+
+# 방별 최근 메시지 이벤트 링 버퍼: ZSET(클라이언트 프레임 JSON, 점수 = 메시지 ID)
+BUFFER_KEY = "replay:room:{room_id}"
+# 버퍼 하한: 이 ID보다 큰 방 메시지는 모두 버퍼에 있음 (잘려 나간 가장 큰 ID, 새 버퍼면 첫 ID - 1)
+FLOOR_KEY = "replay:room:{room_id}:floor"
+
+# ARGV: 최대 개수, TTL(초), (메시지 ID, 프레임 JSON) 쌍...
+APPEND_SCRIPT = """
+local fresh = redis.call('EXISTS', KEYS[1]) == 0
+local lowest = nil
+for i = 3, #ARGV, 2 do
+    redis.call('ZADD', KEYS[1], ARGV[i], ARGV[i + 1])
+    local id = tonumber(ARGV[i])
+    if lowest == nil or id < lowest then
+        lowest = id
+    end
+end
+if fresh then
+    redis.call('SET', KEYS[2], lowest - 1)
+end
+local excess = redis.call('ZCARD', KEYS[1]) - tonumber(ARGV[1])
+if excess > 0 then
+    local trimmed = redis.call('ZRANGE', KEYS[1], excess - 1, excess - 1, 'WITHSCORES')
+    redis.call('ZREMRANGEBYRANK', KEYS[1], 0, excess - 1)
+    if tonumber(trimmed[2]) > tonumber(redis.call('GET', KEYS[2]) or 0) then
+        redis.call('SET', KEYS[2], trimmed[2])
+    end
+end
+redis.call('EXPIRE', KEYS[1], ARGV[2])
+redis.call('EXPIRE', KEYS[2], ARGV[2])
+return excess
+"""
+
+# 마지막으로 받은 ID 이후 프레임 (버퍼에 빈틈 없이 남아 있지 않으면 nil)
+READ_SCRIPT = """
+local floor = redis.call('GET', KEYS[2])
+if not floor or tonumber(ARGV[1]) < tonumber(floor) then
+    return false
+end
+return redis.call('ZRANGEBYSCORE', KEYS[1], '(' .. ARGV[1], '+inf')
+"""
+
+
+def _keys(room_id):
+    return BUFFER_KEY.format(room_id=room_id), FLOOR_KEY.format(room_id=room_id)
+
+
+def _append_args(frames):
+    args = [getattr(settings, "REPLAY_BUFFER_SIZE", 200), getattr(settings, "REPLAY_BUFFER_TTL", 3600)]
+    for frame in frames:
+        args += [frame["message_id"], json.dumps(frame)]
+    return args
+
+
+def record(room_id, frames):
+    """방에 브로드캐스트한 메시지 프레임들을 링 버퍼에 추가 (뷰, DB 스레드용)"""
+    if frames:
+        get_client().eval(APPEND_SCRIPT, 2, *_keys(room_id), *_append_args(frames))
+
+
+async def arecord(room_id, frames):
+    """방에 브로드캐스트한 메시지 프레임들을 링 버퍼에 추가 (Consumer용)"""
+    if frames:
+        await get_async_client().eval(APPEND_SCRIPT, 2, *_keys(room_id), *_append_args(frames))
+
+
+async def aread_since(room_id, last_message_id):
+    """last_message_id 이후 프레임을 ID 순으로 반환 (버퍼가 그 지점까지 덮지 못하면 None → DB 조회)"""
+    frames = await get_async_client().eval(READ_SCRIPT, 2, *_keys(room_id), int(last_message_id))
+    if frames is None:
+        return None
+    return [json.loads(frame) for frame in frames]
+
+
+def since_joined(frames, joined_at):
+    """멤버 입장 이후(timestamp >= joined_at)의 프레임만 남김 (입장 전 메시지는 히스토리 API와 같이 숨김)"""
+    return [frame for frame in frames if datetime.fromisoformat(frame["timestamp"]) >= joined_at]
+
+
+def message_frame(message):
+    """저장된 메시지를 실시간 브로드캐스트와 같은 클라이언트 프레임으로 변환 (DB 재전송용)"""
+    created_at = message.created_at.isoformat()
+    username = message.user.username if message.user else None
+    if message.message_type == "system":
+        return broadcast.system_frame({
+            "message": message.content,
+            "username": username,
+            "message_id": message.id,
+            "created_at": created_at,
+        })
+    if message.message_type in ("file", "image"):
+        return broadcast.file_frame({
+            "message_id": message.id,
+            "username": username,
+            "user_id": message.user_id,
+            "file_name": message.file_name,
+            "file_size": message.file_size,
+            "file_size_human": message.file_size_human,
+            "file_url": message.file.url if message.file else None,
+            "message_type": message.message_type,
+            "timestamp": created_at,
+            "content": None,
+            "is_image": message.message_type == "image",
+        })
+    return broadcast.chat_frame({
+        "message": message.content,
+        "username": username,
+        "message_id": message.id,
+        "unread_count": message.unread_count,
+        "is_read_by_all": message.unread_count == 0,
+        "user_id": message.user_id,
+        "created_at": created_at,
+    })
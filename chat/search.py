@@ -0,0 +1,32 @@
+from django.contrib.postgres.search import SearchQuery, SearchRank, TrigramWordSimilarity
+from django.db.models import F, FloatField, Q
+from django.db.models.functions import Cast
+
+from chat.models import ChatMessage
+
+# 검색어 최소 길이 (한 글자는 대부분의 메시지와 부분 일치해 인덱스로 거를 수 없음)
+MIN_QUERY_LENGTH = 2
+
+
+def search_messages(user, text, room_id=None):
+    """
+    사용자가 속한 방(room_id면 그 방만)에서 입장 이후 메시지 검색, 관련도(rank) 주석 포함
+    - 단어 일치: search_vector @@ websearch_to_tsquery (GIN 인덱스)
+    - 부분 일치: UPPER(content) LIKE (trigram GIN 인덱스, 한국어 조사가 붙은 단어 등)
+    관련도 = ts_rank + 검색어와 내용의 trigram 단어 유사도
+    """
+    query = SearchQuery(text, config="simple", search_type="websearch")
+    messages = ChatMessage.objects.filter(
+        room__members__user=user,
+        room__members__joined_at__lte=F("created_at"),
+        room__is_active=True,
+        is_deleted=False,
+    ).exclude(message_type="system")
+    if room_id is not None:
+        messages = messages.filter(room_id=room_id)
+
+    # real은 텍스트로 받으면 정확한 값이 아니므로 double로 변환 (키셋 커서의 rank 비교가 정확히 맞도록)
+    rank = Cast(SearchRank(F("search_vector"), query) + TrigramWordSimilarity(text, "content"), FloatField())
+    return messages.filter(Q(search_vector=query) | Q(content__icontains=text)).annotate(
+        rank=rank,
+    ).defer("search_vector").select_related("user", "room")
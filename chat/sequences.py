@@ -0,0 +1,45 @@
+from django.db.models import Q
+
+# 방 순번(seq)을 올리는 메시지 종류: 안읽은 수(방 last_seq - 멤버 last_read_seq)에 포함되는 메시지
+# 시스템 메시지는 새 순번 없이 직전 메시지의 순번을 함께 사용
+# 순번은 생성 시점에 한 번만 매기고 바꾸지 않으므로, 삭제된 메시지도 멤버가 읽고 지나갈 때까지 안읽은 수에 남음
+SEQ_MESSAGE_TYPES = ("text", "file", "image")
+
+
+def advances_seq(user_id, message_type, is_deleted=False):
+    """사용자가 보낸 텍스트/파일/이미지 메시지인지 (방 순번을 하나 올리는 메시지, 백필에서는 삭제된 메시지 제외)"""
+    return user_id is not None and message_type in SEQ_MESSAGE_TYPES and not is_deleted
+
+
+def resequence_room(message_model, room_id, batch_size=1000):
+    """
+    방의 메시지에 (created_at, id) 순서대로 1부터 순번 부여 (시스템/삭제 메시지는 직전 순번을 공유)
+    배치 단위로 키셋 순회하며 바뀐 행만 bulk_update, 마지막 순번 반환
+    마이그레이션(과거 모델)과 백필 명령(현재 모델)에서만 사용, 운영 중 삭제로는 순번을 다시 매기지 않음
+    """
+    seq = 0
+    cursor = None
+
+    while True:
+        messages = message_model.objects.filter(room_id=room_id).order_by("created_at", "id")
+        if cursor:
+            messages = messages.filter(
+                Q(created_at__gt=cursor[0]) | Q(created_at=cursor[0], id__gt=cursor[1])
+            )
+        batch = list(messages.only("id", "created_at", "seq", "user", "message_type", "is_deleted")[:batch_size])
+        if not batch:
+            break
+
+        changed = []
+        for message in batch:
+            if advances_seq(message.user_id, message.message_type, message.is_deleted):
+                seq += 1
+            if message.seq != seq:
+                message.seq = seq
+                changed.append(message)
+
+        if changed:
+            message_model.objects.bulk_update(changed, ["seq"])
+        cursor = (batch[-1].created_at, batch[-1].id)
+
+    return seq
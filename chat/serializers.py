@@ -2,6 +2,7 @@ from rest_framework import serializers, status
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from django.contrib.auth import authenticate, login
+from django.db.models import OuterRef, Subquery
 from django.utils import timezone
 
 from chat.models import ChatMessage, MessageReaction, PushSubscription
@@ -21,9 +22,22 @@ class LoginResponseSerializer(serializers.Serializer):
     error = serializers.CharField(required=False)
 
 
+def annotate_reactions(queryset, user):
+    """
+    메시지 쿼리셋에 요청 사용자의 반응을 주석으로 추가
+    ChatMessageSerializer가 메시지마다 추가 쿼리를 하지 않도록 목록 조회 전에 적용
+    (반응 개수는 메시지의 카운터 필드를 그대로 사용)
+    """
+    user_reaction = MessageReaction.objects.filter(
+        message=OuterRef("pk"), user=user
+    ).values("reaction_type")[:1]
+    return queryset.annotate(user_reaction_type=Subquery(user_reaction))
+
+
 class ChatMessageSerializer(serializers.ModelSerializer):
-    username = serializers.CharField(source="user.username")
-    user_id = serializers.IntegerField(source="user.id")
+    # 작성자 없는 시스템 메시지는 None
+    username = serializers.CharField(source="user.username", default=None)
+    user_id = serializers.IntegerField(source="user.id", default=None)
     room_name = serializers.CharField(source="room.name")
     reactions=serializers.SerializerMethodField()
     user_reaction = serializers.SerializerMethodField()
@@ -49,25 +63,37 @@ class ChatMessageSerializer(serializers.ModelSerializer):
         ]
     
     def get_reactions(self, obj):
-        # 각 반응별 개수 집계
-        reaction_counts = {
-            "like": 0,
-            "good": 0,
-            "check": 0,
-        }
-        reactions = MessageReaction.objects.filter(message=obj)
-        for r in reactions:
-            if r.reaction_type in reaction_counts:
-                reaction_counts[r.reaction_type] += 1
-        return reaction_counts
+        # 반응 유형별 개수 (메시지 카운터 필드)
+        return obj.reaction_counts
     
     def get_user_reaction(self, obj):
+        if hasattr(obj, "user_reaction_type"):
+            return obj.user_reaction_type
+
         request = self.context.get('request')
         reaction = MessageReaction.objects.filter(
             message=obj, user=request.user
         ).first()
         return reaction.reaction_type if reaction else None
     
+class CachedMessageSerializer(ChatMessageSerializer):
+    """메시지 첫 페이지 캐시에 저장하는 공통 부분 (방 이름, 반응, 안읽은 수는 chat.history가 따로 보관)"""
+
+    class Meta(ChatMessageSerializer.Meta):
+        fields = [
+            "id",
+            "user_id",
+            "username",
+            "content",
+            "file",
+            "file_name",
+            "file_size",
+            "message_type",
+            "created_at",
+            "edited_at",
+        ]
+
+
 class PushSubscriptionSerializer(serializers.ModelSerializer):
     class Meta:
         model = PushSubscription
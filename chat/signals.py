@@ -0,0 +1,73 @@
+from django.contrib.auth.models import User
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from chat import directory, history, stats
+from chat.models import ChatMessage, ChatRoom, RoomMember
+
+
+@receiver(post_save, sender=RoomMember)
+def increment_member_count(sender, instance, created, **kwargs):
+    """멤버 추가 시 방 멤버 수 증가"""
+    if created:
+        ChatRoom.objects.filter(id=instance.room_id).update(
+            member_count=F("member_count") + 1, updated_at=timezone.now()
+        )
+        directory.invalidate()
+        history.member_joined(instance.room_id, instance.user_id, instance.joined_at)
+
+
+@receiver(post_delete, sender=RoomMember)
+def decrement_member_count(sender, instance, **kwargs):
+    """멤버 삭제 시 방 멤버 수 감소"""
+    ChatRoom.objects.filter(id=instance.room_id).update(
+        member_count=Greatest(F("member_count") - 1, 0), updated_at=timezone.now()
+    )
+    directory.invalidate()
+    history.member_left(instance.room_id, instance.user_id)
+
+
+@receiver(post_save, sender=ChatRoom)
+def invalidate_room_directory(sender, instance, **kwargs):
+    """방 생성/수정/비활성화 시 공개 방 목록 캐시 무효화"""
+    directory.invalidate()
+
+
+@receiver(post_save, sender=ChatRoom)
+def invalidate_room_history(sender, instance, created, **kwargs):
+    """방 이름 변경/비활성화 시 메시지 첫 페이지 캐시 삭제"""
+    if not created:
+        history.invalidate(instance.id)
+
+
+@receiver(post_save, sender=ChatRoom)
+def count_created_room(sender, instance, created, **kwargs):
+    """방 생성 시 활성 방 수 증가 (비활성화는 뷰에서 stats.room_deactivated)"""
+    if created and instance.is_active:
+        stats.room_created()
+
+
+@receiver(post_save, sender=ChatMessage)
+def count_created_message(sender, instance, created, **kwargs):
+    """메시지 저장 시 오늘 메시지 수 증가"""
+    if created and not instance.is_deleted:
+        stats.message_created(instance)
+
+
+@receiver(post_save, sender=ChatMessage)
+def update_room_history(sender, instance, created, **kwargs):
+    """새 메시지는 첫 페이지 캐시에 추가, 수정/삭제는 방 캐시 삭제"""
+    if created:
+        history.messages_created(instance.room_id, [instance])
+    else:
+        history.invalidate(instance.room_id)
+
+
+@receiver(post_save, sender=User)
+def count_signed_up_user(sender, instance, created, **kwargs):
+    """회원가입 시 전체 사용자 수 증가"""
+    if created:
+        stats.user_signed_up()
@@ -0,0 +1,115 @@
+from datetime import datetime, time, timedelta
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+from chat.models import ChatMessage, ChatRoom, UserProfile
+
+# 공유 캐시에 두는 서버 통계 카운터 (이벤트마다 증감, 주기적으로 DB 기준 재계산)
+ACTIVE_ROOMS_KEY = "stats:active_rooms"
+TOTAL_USERS_KEY = "stats:total_users"
+ONLINE_USERS_KEY = "stats:online_users"
+MESSAGES_KEY = "stats:messages:{date}"
+
+# 날짜별 메시지 카운터는 하루가 지나면 필요 없으므로 이틀 뒤 만료
+MESSAGES_TIMEOUT = 60 * 60 * 48
+
+
+def _messages_key(date=None):
+    return MESSAGES_KEY.format(date=(date or timezone.localdate()).isoformat())
+
+
+def _incr(key, delta=1):
+    """커밋 후 카운터 증감 (키가 없으면 다음 조회/재계산 때 DB에서 채움)"""
+    def apply():
+        try:
+            cache.incr(key, delta)
+        except ValueError:
+            pass
+
+    transaction.on_commit(apply)
+
+
+def message_created(message):
+    _incr(_messages_key(timezone.localdate(message.created_at)))
+
+
+def messages_created(count):
+    """bulk_create로 저장한 메시지 수만큼 증가 (post_save가 호출되지 않으므로 직접 반영)"""
+    _incr(_messages_key(), count)
+
+
+def room_created():
+    _incr(ACTIVE_ROOMS_KEY)
+
+
+def room_deactivated():
+    _incr(ACTIVE_ROOMS_KEY, -1)
+
+
+def user_signed_up():
+    _incr(TOTAL_USERS_KEY)
+
+
+def user_came_online():
+    _incr(ONLINE_USERS_KEY)
+
+
+def user_went_offline():
+    _incr(ONLINE_USERS_KEY, -1)
+
+
+def online_users():
+    """온라인 사용자 수 (캐시 카운터, 없으면 DB 기준 재계산)"""
+    count = cache.get(ONLINE_USERS_KEY)
+    if count is None:
+        return reconcile()["online_users"]
+    return max(0, count)
+
+
+def reconcile():
+    """
+    DB 기준으로 모든 카운터 재계산 후 저장 (django_crontab, 캐시 누락 시)
+    오늘 메시지는 created_at__date 대신 하루 범위 조건으로 셈 (컬럼에 함수를 씌우지 않는 조건)
+    created_at 단독 인덱스는 두지 않음: 주기 작업과 캐시 누락 때만 실행되므로 메시지 INSERT마다
+    인덱스를 갱신하는 비용보다 가끔의 순차 스캔이 싸다고 판단
+    """
+    today = timezone.localdate()
+    day_start = timezone.make_aware(datetime.combine(today, time.min))
+    day_end = day_start + timedelta(days=1)
+
+    stats = {
+        ACTIVE_ROOMS_KEY: ChatRoom.objects.filter(is_active=True).count(),
+        TOTAL_USERS_KEY: User.objects.count(),
+        ONLINE_USERS_KEY: UserProfile.objects.filter(is_online=True).count(),
+    }
+    cache.set_many(stats, timeout=None)
+
+    today_messages = ChatMessage.objects.filter(
+        created_at__gte=day_start, created_at__lt=day_end, is_deleted=False
+    ).count()
+    cache.set(_messages_key(today), today_messages, timeout=MESSAGES_TIMEOUT)
+
+    return {
+        "total_rooms": stats[ACTIVE_ROOMS_KEY],
+        "total_users": stats[TOTAL_USERS_KEY],
+        "online_users": stats[ONLINE_USERS_KEY],
+        "today_messages": today_messages,
+    }
+
+
+def get_stats():
+    """서버 통계 조회 (캐시 한 번 읽기, 빠진 카운터가 있을 때만 DB 재계산)"""
+    messages_key = _messages_key()
+    values = cache.get_many([ACTIVE_ROOMS_KEY, TOTAL_USERS_KEY, ONLINE_USERS_KEY, messages_key])
+    if len(values) < 4:
+        return reconcile()
+
+    return {
+        "total_rooms": values[ACTIVE_ROOMS_KEY],
+        "total_users": values[TOTAL_USERS_KEY],
+        "online_users": values[ONLINE_USERS_KEY],
+        "today_messages": values[messages_key],
+    }
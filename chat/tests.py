@@ -1,10 +1,52 @@
 # chat/tests.py
-from channels.testing import ChannelsLiveServerTestCase
+import asyncio
+import json
+import time
+from datetime import datetime, timezone as dt_timezone
+from io import StringIO
+from unittest.mock import patch
+
+import msgpack
+from asgiref.sync import async_to_sync
+from channels.db import database_sync_to_async
+from channels.generic.websocket import AsyncWebsocketConsumer
+from channels.layers import get_channel_layer
+from channels.routing import URLRouter
+from channels.testing import ChannelsLiveServerTestCase, WebsocketCommunicator
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import DatabaseError, connection
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
 from selenium import webdriver
 from selenium.webdriver.common.action_chains import ActionChains
 from selenium.webdriver.common.by import By
 from selenium.webdriver.common.keys import Keys
 from selenium.webdriver.support.wait import WebDriverWait
+from daphne.http_protocol import HTTPFactory
+from daphne.ws_protocol import WebSocketFactory
+from twisted.internet.abstract import FileDescriptor
+from twisted.internet.address import IPv4Address
+from twisted.internet.error import ConnectionDone
+from twisted.internet.testing import MemoryReactor
+
+from chat import broadcast, flowcontrol, history, metrics, presence, replay, stats, topics
+from chat.consumers import ChatConsumer
+from chat.ingest import MessageIngestor
+from chat.management.commands.fake_push_server import (
+    make_fake_subscription_keys, make_vapid_private_key, start_fake_push_server,
+)
+from chat.messages import create_message
+from chat.protocol import FrameProtocolMixin
+from chat.models import ChatMessage, ChatRoom, MessageReaction, PushSubscription, RoomMember
+from chat.push import PushDispatcher
+from chat.reactions import recount_reactions, toggle_reaction
+from chat.receipts import MARK_READ_SQL, mark_read
+from chat.routing import websocket_urlpatterns
+from chat.serializers import annotate_reactions
+from config.server import BackpressureWebSocketProtocol, Server
 
 
 class ChatTests(ChannelsLiveServerTestCase):
@@ -103,4 +145,1412 @@ class ChatTests(ChannelsLiveServerTestCase):
     def _chat_log_value(self):
         return self.driver.find_element(
             by=By.CSS_SELECTOR, value="#chat-log"
-        ).get_property("value")
\ No newline at end of file
+        ).get_property("value")
+
+
+# 첫 페이지 캐시를 끄고 DB 조회 경로의 쿼리 수를 측정
+@override_settings(HISTORY_CACHE_ENABLED=False)
+class MessageHistoryQueryTests(TestCase):
+    """메시지 목록 API가 메시지 수와 관계없이 일정한 쿼리 수로 응답하는지 확인"""
+
+    # 방 조회, 멤버 조회, 메시지+반응 조회
+    EXPECTED_QUERIES = 3
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="reader", password="pw")
+        self.others = [User.objects.create_user(username=f"user{i}", password="pw") for i in range(3)]
+        self.room = ChatRoom.objects.create(name="history", created_by=self.user)
+        for user in [self.user, *self.others]:
+            RoomMember.objects.create(room=self.room, user=user)
+
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def _add_messages(self, count):
+        for i in range(count):
+            message = ChatMessage.objects.create(room=self.room, user=self.others[0], content=f"msg {i}")
+            toggle_reaction(message, self.user, "like")
+            toggle_reaction(message, self.others[1], "like")
+            toggle_reaction(message, self.others[2], "check")
+
+    def _get_messages(self):
+        return self.client.get(f"/chat/api/rooms/{self.room.id}/messages/")
+
+    def test_message_page_uses_constant_queries(self):
+        self._add_messages(5)
+        with self.assertNumQueries(self.EXPECTED_QUERIES):
+            response = self._get_messages()
+        self.assertEqual(len(response.data["results"]), 5)
+
+        self._add_messages(40)
+        with self.assertNumQueries(self.EXPECTED_QUERIES):
+            response = self._get_messages()
+        self.assertEqual(len(response.data["results"]), 30)
+
+    def test_message_page_reaction_fields(self):
+        self._add_messages(1)
+        result = self._get_messages().data["results"][0]
+        self.assertEqual(result["reactions"], {"like": 2, "good": 0, "check": 1})
+        self.assertEqual(result["user_reaction"], "like")
+
+
+@override_settings(HISTORY_CACHE_ENABLED=False)
+class MessageCursorPaginationTests(TestCase):
+    """페이지를 넘기는 사이 새 메시지가 들어와도 커서 페이지가 겹치거나 빠지지 않는지 확인"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="scroller", password="pw")
+        self.room = ChatRoom.objects.create(name="cursor", created_by=self.user)
+        RoomMember.objects.create(room=self.room, user=self.user)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def _add_messages(self, count, prefix):
+        return [
+            ChatMessage.objects.create(room=self.room, user=self.user, content=f"{prefix} {i}").id
+            for i in range(count)
+        ]
+
+    def _ids(self, response):
+        return [row["id"] for row in response.data["results"]]
+
+    def test_pages_stay_stable_under_concurrent_inserts(self):
+        old_ids = self._add_messages(10, "old")
+        # 같은 created_at끼리는 id로 순서가 정해져야 함
+        tied_at = ChatMessage.objects.get(id=old_ids[3]).created_at
+        ChatMessage.objects.filter(id__in=old_ids[3:7]).update(created_at=tied_at)
+
+        first = self.client.get(f"/chat/api/rooms/{self.room.id}/messages/?page_size=4")
+        self.assertEqual(self._ids(first), old_ids[:-5:-1])
+
+        new_ids = self._add_messages(5, "new")
+
+        seen = self._ids(first)
+        next_url = first.data["next"]
+        while next_url:
+            page = self.client.get(next_url)
+            seen += self._ids(page)
+            next_url = page.data["next"]
+        self.assertEqual(seen, old_ids[::-1])
+
+        # 첫 페이지 맨 위 메시지 이후로 이어 받으면 새 메시지만 오래된 것부터 채워짐
+        newer = self.client.get(f"/chat/api/rooms/{self.room.id}/messages/?page_size=4&after_id={old_ids[-1]}")
+        self.assertEqual(self._ids(newer), new_ids[3::-1])
+        newest = self.client.get(newer.data["previous"])
+        self.assertEqual(self._ids(newest), new_ids[4:])
+        self.assertIsNone(newest.data["previous"])
+
+    def test_invalid_positions_are_rejected(self):
+        self._add_messages(3, "msg")
+        url = f"/chat/api/rooms/{self.room.id}/messages/"
+        self.assertEqual(self.client.get(url, {"after_id": "abc"}).status_code, 400)
+        self.assertEqual(self.client.get(url, {"before": "not-a-cursor"}).status_code, 400)
+        self.assertEqual(self.client.get(url, {"after_id": 10 ** 9}).status_code, 404)
+
+
+class MessageSequenceTests(TestCase):
+    """순번 기반 안읽은 수가 시스템 메시지를 빼고 세는지, 삭제가 순번을 바꾸지 않는지, 백필이 순번을 다시 매기는지 확인"""
+
+    def setUp(self):
+        self.reader = User.objects.create_user(username="reader", password="pw")
+        self.writer = User.objects.create_user(username="writer", password="pw")
+        self.room = ChatRoom.objects.create(name="sequence", created_by=self.writer)
+        for user in (self.reader, self.writer):
+            RoomMember.objects.create(room=self.room, user=user)
+
+    def _unread(self, user):
+        return RoomMember.objects.select_related("room").get(room=self.room, user=user).unread_messages_count
+
+    def test_unread_excludes_system_messages(self):
+        texts = [ChatMessage.objects.create(room=self.room, user=self.writer, content=f"msg {i}") for i in range(4)]
+        create_message(self.room.id, self.writer, "writer님이 입장했습니다.", "system")
+        ChatMessage.objects.create(room=self.room, user=self.writer, message_type="system", content="writer님이 퇴장했습니다.")
+
+        self.assertEqual(self._unread(self.reader), 4)
+        self.assertEqual(self._unread(self.writer), 0)
+
+        mark_read(self.room.id, [self.reader.id], up_to_seq=texts[1].seq)
+        self.assertEqual(self._unread(self.reader), 2)
+
+        ChatMessage.objects.create(room=self.room, user=self.writer, content="new")
+        self.assertEqual(self._unread(self.reader), 3)
+        mark_read(self.room.id, [self.reader.id])
+        self.assertEqual(self._unread(self.reader), 0)
+        self.assertEqual(self._unread(self.writer), 0)
+
+    def test_delete_keeps_sequence_numbers(self):
+        texts = [ChatMessage.objects.create(room=self.room, user=self.writer, content=f"msg {i}") for i in range(4)]
+        mark_read(self.room.id, [self.reader.id], up_to_seq=texts[1].seq)
+
+        texts[0].is_deleted = True
+        texts[0].save()
+        texts[2].is_deleted = True
+        texts[2].save()
+
+        # 다른 메시지의 순번과 멤버의 읽은 순번은 그대로, 삭제된 메시지는 읽기 전까지 안읽은 수에 남음
+        self.assertEqual(list(self.room.messages.order_by("id").values_list("seq", flat=True)), [1, 2, 3, 4])
+        self.room.refresh_from_db()
+        self.assertEqual(self.room.last_seq, 4)
+        self.assertEqual(RoomMember.objects.get(room=self.room, user=self.reader).last_read_seq, 2)
+        self.assertEqual(self._unread(self.reader), 2)
+
+        mark_read(self.room.id, [self.reader.id])
+        self.assertEqual(self._unread(self.reader), 0)
+
+    def test_backfill_resequences_existing_messages(self):
+        other_room = ChatRoom.objects.create(name="sequence-missing", created_by=self.writer)
+        kinds = [("text", False), ("system", False), ("text", False), ("file", True), ("image", False), ("text", False)]
+        # 이전 규칙(모든 메시지가 순번을 올림)으로 매겨진 방과 순번이 없는 방
+        ChatMessage.objects.bulk_create([
+            ChatMessage(room=self.room, user=self.writer, message_type=kind, is_deleted=deleted, content="m", seq=i + 1)
+            for i, (kind, deleted) in enumerate(kinds)
+        ] + [
+            ChatMessage(room=other_room, user=self.writer, message_type=kind, is_deleted=deleted, content="m")
+            for kind, deleted in kinds
+        ])
+        ChatRoom.objects.filter(id=self.room.id).update(last_seq=len(kinds))
+        # 세 번째 메시지(text)까지 읽은 멤버
+        RoomMember.objects.filter(room=self.room, user=self.reader).update(last_read_seq=3)
+
+        call_command("backfill_message_seq", stdout=StringIO())
+
+        for room in (self.room, other_room):
+            room.refresh_from_db()
+            seqs = list(room.messages.order_by("created_at", "id").values_list("seq", flat=True))
+            # 텍스트/파일/이미지만 1부터 빈틈없이, 시스템/삭제 메시지는 직전 순번 공유
+            self.assertEqual(seqs, [1, 1, 2, 2, 3, 4])
+            self.assertEqual(room.last_seq, 4)
+
+        self.assertEqual(RoomMember.objects.get(room=self.room, user=self.reader).last_read_seq, 2)
+        self.assertEqual(self._unread(self.reader), 2)
+
+
+class MarkReadTests(TestCase):
+    """읽음 처리(MARK_READ_SQL)가 앞으로만 이동하고 반복해도 같은 결과인지, 메시지 안읽은 수를 맞게 차감하는지 확인"""
+
+    def setUp(self):
+        self.writer = User.objects.create_user(username="writer", password="pw")
+        self.readers = [User.objects.create_user(username=f"reader{i}", password="pw") for i in range(2)]
+        self.room = ChatRoom.objects.create(name="receipts", created_by=self.writer)
+        for user in (self.writer, *self.readers):
+            RoomMember.objects.create(room=self.room, user=user)
+        self.messages = [create_message(self.room.id, self.writer, f"msg {i}") for i in range(4)]
+
+    def _unread_counts(self):
+        return list(ChatMessage.objects.filter(room=self.room).order_by("seq").values_list("unread_count", flat=True))
+
+    def _read_seqs(self):
+        return [RoomMember.objects.get(room=self.room, user=user).last_read_seq for user in self.readers]
+
+    def test_mark_read_is_idempotent(self):
+        reader_ids = [user.id for user in self.readers]
+        changed = mark_read(self.room.id, reader_ids, up_to_seq=self.messages[1].seq)
+        self.assertEqual(changed, [(self.messages[0].id, 0), (self.messages[1].id, 0)])
+
+        # 같은 위치까지 다시 읽어도 아무것도 바뀌지 않음
+        self.assertEqual(mark_read(self.room.id, reader_ids, up_to_seq=self.messages[1].seq), [])
+        self.assertEqual(self._unread_counts(), [0, 0, 2, 2])
+        self.assertEqual(self._read_seqs(), [2, 2])
+
+    def test_mark_read_only_moves_forward(self):
+        reader = self.readers[0]
+        mark_read(self.room.id, [reader.id], up_to_seq=self.messages[2].seq)
+        self.assertEqual(self._unread_counts(), [1, 1, 1, 2])
+
+        # 뒤로 이동하는 요청은 무시되고 이미 차감한 수도 되돌리지 않음
+        self.assertEqual(mark_read(self.room.id, [reader.id], up_to_seq=self.messages[0].seq), [])
+        self.assertEqual(self._read_seqs(), [3, 0])
+        self.assertEqual(self._unread_counts(), [1, 1, 1, 2])
+
+        # 멤버마다 이전 위치에서 새 위치까지만 차감, 기본값은 방의 마지막 순번
+        changed = mark_read(self.room.id, [user.id for user in self.readers])
+        self.assertEqual(changed, [(message.id, 0) for message in self.messages])
+        self.assertEqual(self._read_seqs(), [4, 4])
+        self.assertEqual(RoomMember.objects.select_related("room").get(room=self.room, user=reader).unread_messages_count, 0)
+
+
+@override_settings(CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}})
+class CreateMessageTests(TestCase):
+    """메시지 저장 빠른 경로(CREATE_MESSAGE_SQL)가 save()와 같은 값을 남기고 통계/첫 페이지 캐시를 갱신하는지 확인"""
+
+    def setUp(self):
+        cache.clear()
+        self.writer = User.objects.create_user(username="writer", password="pw")
+        self.room = ChatRoom.objects.create(name="fast-path", created_by=self.writer)
+        for user in (self.writer, *[User.objects.create_user(username=f"member{i}", password="pw") for i in range(2)]):
+            RoomMember.objects.create(room=self.room, user=user)
+
+    def test_create_message_returns_saved_values(self):
+        first = create_message(self.room.id, self.writer, "first")
+        message = create_message(self.room.id, self.writer, "second")
+        self.assertEqual((message.seq, message.unread_count, message.total_members_at_time), (2, 2, 3))
+
+        saved = ChatMessage.objects.get(id=message.id)
+        self.assertEqual((saved.seq, saved.unread_count, saved.content), (2, 2, "second"))
+        self.room.refresh_from_db()
+        self.assertEqual(self.room.last_seq, 2)
+        self.assertEqual(self.room.last_message_id, message.id)
+        self.assertEqual(RoomMember.objects.get(room=self.room, user=self.writer).last_read_seq, 2)
+        self.assertLess(first.id, message.id)
+
+        # 작성자 없는 시스템 메시지는 모든 멤버가 안 읽은 상태, 순번과 마지막 메시지는 그대로
+        system = create_message(self.room.id, None, "공지", "system")
+        self.assertEqual((system.seq, system.unread_count), (2, 3))
+        self.room.refresh_from_db()
+        self.assertEqual((self.room.last_seq, self.room.last_message_id), (2, message.id))
+
+    def test_create_message_updates_stats_and_history(self):
+        before = stats.get_stats()["today_messages"]
+        with patch.object(history, "messages_created") as messages_created:
+            with self.captureOnCommitCallbacks(execute=True):
+                message = create_message(self.room.id, self.writer, "hello")
+
+        self.assertEqual(stats.get_stats()["today_messages"], before + 1)
+        messages_created.assert_called_once_with(self.room.id, [message])
+        self.assertEqual(messages_created.call_args.args[1][0].user, self.writer)
+
+
+class MessageIngestTests(TransactionTestCase):
+    """배치 저장기가 크기/시간 기준으로 저장하고, 저장 실패 시 전송자에게 None을 돌려주는지 확인"""
+
+    def setUp(self):
+        self.writer = User.objects.create_user(username="writer", password="pw")
+        self.room = ChatRoom.objects.create(name="ingest", created_by=self.writer)
+        for user in (self.writer, User.objects.create_user(username="member", password="pw")):
+            RoomMember.objects.create(room=self.room, user=user)
+
+        self.ingestor = MessageIngestor()
+        # 접속자 레지스트리와 브로드캐스트는 배치 경계만 기록
+        self.batches = []
+        patches = [
+            patch("chat.ingest.presence.online_user_ids", return_value=[]),
+            patch("chat.ingest.broadcast_batch", side_effect=self._record_batch),
+        ]
+        for patcher in patches:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    async def _record_batch(self, room_id, saved, updated_messages):
+        self.batches.append([message["message"] for message in saved])
+
+    async def _submit(self, *contents):
+        return await asyncio.wait_for(
+            asyncio.gather(*(self.ingestor.submit(self.room.id, self.writer, content) for content in contents)), 5
+        )
+
+    async def test_full_batch_flushes_without_waiting(self):
+        self.ingestor.window, self.ingestor.max_batch = 10, 3
+        saved = await self._submit("a", "b", "c")
+        self.assertEqual(self.batches, [["a", "b", "c"]])
+        self.assertEqual([message["seq"] for message in saved], [1, 2, 3])
+        # create_message와 같이 방의 멤버 수 기준 (작성자 제외)
+        self.assertEqual([message["unread_count"] for message in saved], [1, 1, 1])
+
+    async def test_partial_batch_flushes_after_window(self):
+        self.ingestor.window, self.ingestor.max_batch = 0.05, 100
+        started = asyncio.get_running_loop().time()
+        saved = await self._submit("a", "b")
+        self.assertGreaterEqual(asyncio.get_running_loop().time() - started, 0.05)
+        self.assertEqual(self.batches, [["a", "b"]])
+        self.assertEqual(self.ingestor.stats, {"messages": 2, "batches": 1})
+        self.assertEqual(await ChatMessage.objects.filter(room=self.room).acount(), len(saved))
+
+    async def test_failed_flush_returns_none_and_recovers(self):
+        self.ingestor.window = 0.01
+        with patch("chat.ingest.persist_messages", side_effect=RuntimeError("db down")):
+            self.assertEqual(await self._submit("a", "b"), [None, None])
+        self.assertEqual(self.batches, [])
+        self.assertFalse(await ChatMessage.objects.filter(room=self.room).aexists())
+
+        # 실패한 배치 이후 메시지는 정상 저장
+        saved = await self._submit("c")
+        self.assertEqual(saved[0]["seq"], 1)
+        self.assertEqual(self.batches, [["c"]])
+
+
+class PushDispatcherTests(TransactionTestCase):
+    """푸시 발송기가 가짜 푸시 서버로 전송하고, 일시적 실패는 재시도, 404/410 구독은 삭제하는지 확인"""
+
+    def setUp(self):
+        self.server, self.base_url = start_fake_push_server()
+        self.addCleanup(self.server.shutdown)
+        settings_override = override_settings(VAPID_PRIVATE_KEY=make_vapid_private_key())
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        online = patch("chat.push.presence.online_user_ids", return_value=[])
+        online.start()
+        self.addCleanup(online.stop)
+
+        self.sender = User.objects.create_user(username="sender", password="pw")
+        self.room = ChatRoom.objects.create(name="push", created_by=self.sender)
+        RoomMember.objects.create(room=self.room, user=self.sender)
+        self._subscribe(self.sender, "ok")
+        for kind in ("ok", "flaky", "gone", "missing"):
+            user = User.objects.create_user(username=f"push-{kind}", password="pw")
+            RoomMember.objects.create(room=self.room, user=user)
+            self._subscribe(user, kind)
+
+    def _subscribe(self, user, kind):
+        PushSubscription.objects.create(user=user, endpoint=f"{self.base_url}/{kind}/{user.id}", **make_fake_subscription_keys())
+
+    async def test_dispatcher_delivers_retries_and_prunes(self):
+        dispatcher = PushDispatcher()
+        dispatcher.retry_backoff = 0.01
+        self.assertTrue(dispatcher.enqueue(self.room.id, self.sender.id, "sender", "hello"))
+        await asyncio.wait_for(dispatcher.join(), 10)
+        for task in dispatcher._tasks:
+            task.cancel()
+
+        # 작성자 본인 구독은 대상에서 제외, flaky는 503 뒤 재시도로 전송
+        self.assertEqual(dict(self.server.RequestHandlerClass.counts), {201: 2, 503: 1, 410: 1, 404: 1})
+        self.assertEqual(
+            {key: dispatcher.stats[key] for key in ("sent", "retried", "pruned", "failed")},
+            {"sent": 2, "retried": 1, "pruned": 2, "failed": 0},
+        )
+        remaining = [endpoint.split("/")[3] async for endpoint in PushSubscription.objects.exclude(
+            user=self.sender
+        ).order_by("id").values_list("endpoint", flat=True)]
+        self.assertEqual(remaining, ["ok", "flaky"])
+
+
+class LastSeenFlushTests(TestCase):
+    """마지막 접속 시각 반영이 실패해도 기록을 잃지 않고 다음 반영에서 새 기록과 합쳐지는지 확인"""
+
+    def setUp(self):
+        try:
+            presence.get_client().ping()
+        except Exception:
+            self.skipTest("Redis 서버가 필요합니다.")
+
+        self.client = presence.get_client()
+        self.pending_key = f"{presence.LAST_SEEN_KEY}:flushing"
+        self.client.delete(presence.LAST_SEEN_KEY, self.pending_key)
+        self.addCleanup(self.client.delete, presence.LAST_SEEN_KEY, self.pending_key)
+
+        users = [User.objects.create_user(username=f"seen{i}", password="pw") for i in range(2)]
+        self.room = ChatRoom.objects.create(name="last-seen", created_by=users[0])
+        self.members = [RoomMember.objects.create(room=self.room, user=user) for user in users]
+        RoomMember.objects.filter(room=self.room).update(last_seen=datetime(2020, 1, 1, tzinfo=dt_timezone.utc))
+
+    def _record(self, member, ts):
+        self.client.hset(presence.LAST_SEEN_KEY, presence._member(self.room.id, member.user_id), ts)
+
+    def _last_seen(self, member):
+        member.refresh_from_db()
+        return member.last_seen.timestamp()
+
+    def test_failed_flush_keeps_pending_entries(self):
+        first, second = self.members
+        self._record(first, 1_700_000_100)
+        with patch("chat.presence.connection") as connection_mock:
+            connection_mock.cursor.side_effect = DatabaseError("db down")
+            with self.assertRaises(DatabaseError):
+                presence.flush_last_seen()
+        self.assertEqual(self.client.hgetall(self.pending_key), {f"{self.room.id}:{first.user_id}": "1700000100"})
+
+        # 다음 주기: 남은 기록에 새 기록을 합침 (같은 멤버의 더 이른 시각은 무시)
+        self._record(first, 1_700_000_000)
+        self._record(second, 1_700_000_200)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(presence.flush_last_seen(), 2)
+
+        self.assertEqual(self._last_seen(first), 1_700_000_100)
+        self.assertEqual(self._last_seen(second), 1_700_000_200)
+        self.assertFalse(self.client.exists(presence.LAST_SEEN_KEY, self.pending_key))
+
+
+class DaphneConnectionMixin:
+    """Daphne의 HTTP → WebSocket 업그레이드를 메모리 소켓 위에서 실행 (리액터 없이 config.server 경로 그대로)"""
+
+    UPGRADE_REQUEST = (
+        b"GET /ws/chat/1/ HTTP/1.1\r\nHost: testserver\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+        b"Sec-WebSocket-Key: dGhlIHNhbXBsZSBub25jZQ==\r\nSec-WebSocket-Version: 13\r\n\r\n"
+    )
+
+    def _upgrade(self, application):
+        class Socket(FileDescriptor):
+            """draining이 False인 동안은 한 바이트도 보내지 못하는 소켓 (보낸 바이트는 written에 기록)"""
+            draining = False
+
+            def writeSomeData(self, data):
+                if not self.draining:
+                    return 0
+                self.written += bytes(data)
+                return len(data)
+
+            def startWriting(self):
+                # 메모리 리액터는 쓰기 이벤트를 돌리지 않으므로 비우는 중이면 바로 전송
+                super().startWriting()
+                if self.draining:
+                    self.doWrite()
+
+            def getPeer(self):
+                return IPv4Address("TCP", "127.0.0.1", 50000)
+
+            def getHost(self):
+                return IPv4Address("TCP", "127.0.0.1", 8000)
+
+        server = Server(application, endpoints=["tcp:0"])
+        # Server.run()에서 리액터 시작 전에 하는 팩토리 준비만 수행
+        server.connections = {}
+        server.http_factory = HTTPFactory(server)
+        server.ws_factory = WebSocketFactory(server, server="daphne")
+        server.configure_websockets()
+
+        transport = Socket(reactor=MemoryReactor())
+        transport.connected = True
+        transport.written = b""
+        http_channel = server.http_factory.buildProtocol(transport.getPeer())
+        transport.protocol = http_channel
+        http_channel.makeConnection(transport)
+        http_channel.dataReceived(self.UPGRADE_REQUEST)
+        protocol = transport.protocol
+        self.addCleanup(lambda: server.connections[protocol]["application_instance"].cancel())
+        return transport, protocol
+
+    def _drain(self, transport):
+        transport.draining = True
+        transport.doWrite()
+
+
+@override_settings(WS_SEND_BUFFER_HIGH_WATER=250)
+class SendBackpressureTests(DaphneConnectionMixin, SimpleTestCase):
+    """업그레이드된 연결의 송신 버퍼가 상한을 넘으면 트랜스포트가 다시 쓸 수 있을 때까지 앱의 send가 대기하는지 확인"""
+
+    def setUp(self):
+        self.sent = []
+
+    async def application(self, scope, receive, send):
+        """연결을 수락하고 100바이트 프레임 5개를 연달아 전송"""
+        await receive()
+        await send({"type": "websocket.accept"})
+        for i in range(5):
+            await send({"type": "websocket.send", "text": "x" * 100})
+            self.sent.append(i)
+        await receive()
+
+    async def test_send_waits_until_transport_drains(self):
+        transport, protocol = self._upgrade(self.application)
+        # HTTPChannel 대신 송신 게이트가 트랜스포트의 프로듀서
+        self.assertIsInstance(protocol, BackpressureWebSocketProtocol)
+        self.assertIs(transport.producer, protocol.send_gate)
+
+        await asyncio.sleep(0.1)
+        # 101 응답과 프레임 2개로 상한을 넘은 뒤 나머지 전송은 대기
+        self.assertTrue(transport.producerPaused)
+        self.assertEqual(self.sent, [0, 1])
+
+        self._drain(transport)
+        await asyncio.sleep(0.1)
+        self.assertEqual(self.sent, [0, 1, 2, 3, 4])
+
+    async def test_disconnect_releases_waiting_send(self):
+        transport, protocol = self._upgrade(self.application)
+        await asyncio.sleep(0.1)
+        self.assertEqual(self.sent, [0, 1])
+
+        transport.connectionLost(ConnectionDone())
+        await asyncio.sleep(0.1)
+        self.assertTrue(protocol.send_gate.writable.is_set())
+        self.assertEqual(len(self.sent), 5)
+
+
+class FloodingConsumer(FrameProtocolMixin, AsyncWebsocketConsumer):
+    """연결 직후 100바이트 프레임 10개를 조금씩 간격을 두고 보내는 테스트용 Consumer"""
+    connections = []
+
+    async def connect(self):
+        FloodingConsumer.connections.append(self)
+        await self.accept_frames()
+        for i in range(10):
+            await self.send_frame({"type": "flood", "seq": i, "payload": "x" * 100})
+            await asyncio.sleep(0.01)
+
+    async def disconnect(self, close_code):
+        await self.stop_frames()
+
+
+@override_settings(
+    WS_SEND_BUFFER_HIGH_WATER=250,
+    WS_OUTBOUND_QUEUE_SIZE=2,
+    CHANNEL_LAYERS={"default": {"BACKEND": "channels.layers.InMemoryChannelLayer"}},
+    CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}},
+)
+class SlowConsumerTests(DaphneConnectionMixin, SimpleTestCase):
+    """소켓이 밀린 연결은 송신 큐가 차서 프레임을 버리고, disconnect 정책이면 1013으로 종료되는지 확인 (chat.protocol)"""
+
+    # 서버 → 클라이언트 close 프레임 (마스킹 없음, 코드 1013)
+    CLOSE_1013 = b"\x88\x02\x03\xf5"
+
+    def setUp(self):
+        FloodingConsumer.connections = []
+
+    async def _flood(self, stalled):
+        transport, protocol = self._upgrade(FloodingConsumer.as_asgi())
+        if not stalled:
+            self._drain(transport)
+        await asyncio.sleep(0.3)
+        self._drain(transport)
+        await asyncio.sleep(0.05)
+        consumer, = FloodingConsumer.connections
+        return transport, consumer
+
+    async def test_draining_socket_gets_every_frame(self):
+        transport, consumer = await self._flood(stalled=False)
+        self.assertEqual(consumer.flow_counters["dropped_frames"], 0)
+        self.assertEqual(transport.written.count(b'"type": "flood"'), 10)
+        self.assertNotIn(self.CLOSE_1013, transport.written)
+
+    async def test_stalled_socket_is_evicted(self):
+        transport, consumer = await self._flood(stalled=True)
+        self.assertEqual(consumer.flow_counters["dropped_frames"], 1)
+        self.assertEqual(consumer.flow_counters["evicted_connections"], 1)
+        self.assertLess(transport.written.count(b'"type": "flood"'), 10)
+        self.assertTrue(transport.written.endswith(self.CLOSE_1013))
+
+    @override_settings(WS_OUTBOUND_POLICY="drop")
+    async def test_stalled_socket_drops_frames(self):
+        transport, consumer = await self._flood(stalled=True)
+        self.assertGreater(consumer.flow_counters["dropped_frames"], 0)
+        self.assertEqual(consumer.flow_counters["evicted_connections"], 0)
+        # 버리지 않은 프레임은 소켓이 비면 순서대로 전송되고 연결은 유지
+        delivered = transport.written.count(b'"type": "flood"')
+        self.assertEqual(delivered + consumer.flow_counters["dropped_frames"], 10)
+        self.assertNotIn(self.CLOSE_1013, transport.written)
+
+
+class ReactionCounterTests(TestCase):
+    """반응 카운터가 토글과 재계산에서 MessageReaction과 일치하는지 확인"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="reactor", password="pw")
+        self.other = User.objects.create_user(username="other", password="pw")
+        self.room = ChatRoom.objects.create(name="reactions", created_by=self.user)
+        self.message = ChatMessage.objects.create(room=self.room, user=self.other, content="hi")
+
+    def test_toggle_updates_counters(self):
+        self.assertEqual(toggle_reaction(self.message, self.user, "like"), ("added", {"like": 1, "good": 0, "check": 0}))
+        self.assertEqual(toggle_reaction(self.message, self.other, "like")[1]["like"], 2)
+        self.assertEqual(toggle_reaction(self.message, self.user, "good"), ("updated", {"like": 1, "good": 1, "check": 0}))
+        self.assertEqual(toggle_reaction(self.message, self.user, "good"), ("removed", {"like": 1, "good": 0, "check": 0}))
+
+    def test_recount_repairs_drift(self):
+        toggle_reaction(self.message, self.user, "like")
+        MessageReaction.objects.create(message=self.message, user=self.other, reaction_type="check")
+        ChatMessage.objects.filter(id=self.message.id).update(like_count=5)
+
+        recount_reactions(ChatMessage, MessageReaction, batch_size=1)
+        self.message.refresh_from_db()
+        self.assertEqual(self.message.reaction_counts, {"like": 1, "good": 0, "check": 1})
+
+
+class MyRoomsQueryTests(TestCase):
+    """내 채팅방 목록 API가 방 개수와 관계없이 쿼리 1회로 응답하는지 확인"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="inbox", password="pw")
+        self.other = User.objects.create_user(username="friend", password="pw")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def _add_rooms(self, count):
+        start = ChatRoom.objects.count()
+        for i in range(start, start + count):
+            room = ChatRoom.objects.create(name=f"room {i}", created_by=self.other)
+            RoomMember.objects.create(room=room, user=self.user)
+            RoomMember.objects.create(room=room, user=self.other)
+            ChatMessage.objects.create(room=room, user=self.other, content=f"last {i}")
+
+    def test_my_rooms_uses_single_query(self):
+        self._add_rooms(2)
+        with self.assertNumQueries(1):
+            response = self.client.get("/chat/api/my-rooms/")
+        self.assertEqual(len(response.data), 2)
+
+        self._add_rooms(10)
+        with self.assertNumQueries(1):
+            response = self.client.get("/chat/api/my-rooms/")
+        self.assertEqual(len(response.data), 12)
+
+        room = response.data[0]
+        self.assertEqual(room["member_count"], 2)
+        self.assertEqual(room["unread_count"], 1)
+        self.assertTrue(room["last_message"].startswith("last"))
+
+    def test_my_rooms_since_returns_changed_rooms(self):
+        self._add_rooms(3)
+        since = ChatRoom.objects.order_by("-updated_at").values_list("updated_at", flat=True).first()
+        changed = ChatRoom.objects.order_by("id").first()
+        ChatMessage.objects.create(room=changed, user=self.other, content="new")
+
+        response = self.client.get("/chat/api/my-rooms/", {"since": since.isoformat()})
+        self.assertEqual([room["id"] for room in response.data["rooms"]], [changed.id])
+        self.assertEqual(response.data["rooms"][0]["last_message"], "new")
+        self.assertEqual(response.data["removed_room_ids"], [])
+
+    def test_my_rooms_since_includes_read_state_and_left_rooms(self):
+        self._add_rooms(3)
+        read, left, _ = ChatRoom.objects.order_by("id")
+        since = timezone.now()
+
+        # 다른 기기에서 읽음 처리한 방과 나간 방
+        mark_read(read.id, [self.user.id])
+        self.client.post(f"/chat/api/rooms/{left.id}/leave/")
+
+        response = self.client.get("/chat/api/my-rooms/", {"since": since.isoformat()})
+        self.assertEqual([room["id"] for room in response.data["rooms"]], [read.id])
+        self.assertEqual(response.data["rooms"][0]["unread_count"], 0)
+        self.assertEqual(response.data["removed_room_ids"], [left.id])
+
+        # 다시 들어온 방은 나간 방에서 빠지고 변경된 방으로 포함
+        RoomMember.objects.create(room=left, user=self.user)
+        response = self.client.get("/chat/api/my-rooms/", {"since": since.isoformat()})
+        self.assertEqual({room["id"] for room in response.data["rooms"]}, {read.id, left.id})
+        self.assertEqual(response.data["removed_room_ids"], [])
+
+    def test_deleting_last_message_recomputes_room(self):
+        self._add_rooms(1)
+        room = ChatRoom.objects.get()
+        first = room.last_message
+        second = ChatMessage.objects.create(room=room, user=self.other, content="second")
+        since = ChatRoom.objects.get(id=room.id).updated_at
+
+        second.is_deleted = True
+        second.save()
+        room.refresh_from_db()
+        self.assertEqual(room.last_message_id, first.id)
+        self.assertEqual(room.last_message_at, first.created_at)
+        self.assertGreater(room.updated_at, since)
+
+        response = self.client.get("/chat/api/my-rooms/", {"since": since.isoformat()})
+        self.assertEqual([changed["last_message"] for changed in response.data["rooms"]], [first.content])
+
+        first.is_deleted = True
+        first.save()
+        room.refresh_from_db()
+        self.assertIsNone(room.last_message_id)
+        self.assertIsNone(room.last_message_at)
+
+
+@override_settings(CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}})
+class RoomDirectoryCacheTests(TestCase):
+    """공개 방 목록이 캐시에서 제공되고 방/멤버 변경 시 무효화되는지 확인"""
+
+    def setUp(self):
+        cache.clear()
+        self.owner = User.objects.create_user(username="owner", password="pw")
+        for i in range(25):
+            room = ChatRoom.objects.create(name=f"public {i}", created_by=self.owner)
+            RoomMember.objects.create(room=room, user=self.owner)
+        self.client = APIClient()
+
+    def test_directory_pages_with_cursor(self):
+        first = self.client.get("/chat/api/rooms/").data
+        self.assertEqual(len(first["results"]), 20)
+        second = self.client.get(first["next"]).data
+        self.assertEqual(len(second["results"]), 5)
+        self.assertIsNone(second["next"])
+        ids = [room["id"] for room in first["results"] + second["results"]]
+        self.assertEqual(len(set(ids)), 25)
+
+    def test_cached_directory_skips_database(self):
+        self.client.get("/chat/api/rooms/")
+        with self.assertNumQueries(0):
+            self.client.get("/chat/api/rooms/")
+
+    def test_member_change_invalidates_directory(self):
+        room = ChatRoom.objects.order_by("-created_at", "-id").first()
+        self.client.get("/chat/api/rooms/")
+
+        joiner = User.objects.create_user(username="joiner", password="pw")
+        with self.captureOnCommitCallbacks(execute=True):
+            RoomMember.objects.create(room=room, user=joiner)
+
+        results = self.client.get("/chat/api/rooms/").data["results"]
+        self.assertEqual(results[0]["member_count"], 2)
+
+
+@override_settings(CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}})
+class ServerStatsTests(TestCase):
+    """서버 통계가 캐시 카운터에서 제공되고 이벤트마다 증가하는지 확인"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username="stats", password="pw")
+        self.room = ChatRoom.objects.create(name="stats room", created_by=self.user)
+        self.client = APIClient()
+
+    def _stats(self):
+        return self.client.get("/chat/api/stats/").data["stats"]
+
+    def test_stats_are_read_from_cache(self):
+        self.assertEqual(self._stats()["total_rooms"], 1)
+        with self.assertNumQueries(0):
+            self._stats()
+
+    def test_counters_follow_events(self):
+        before = self._stats()
+        with self.captureOnCommitCallbacks(execute=True):
+            ChatMessage.objects.create(room=self.room, user=self.user, content="hello")
+            ChatRoom.objects.create(name="another room", created_by=self.user)
+            User.objects.create_user(username="newbie", password="pw")
+
+        after = self._stats()
+        self.assertEqual(after["today_messages"], before["today_messages"] + 1)
+        self.assertEqual(after["total_rooms"], before["total_rooms"] + 1)
+        self.assertEqual(after["total_users"], before["total_users"] + 1)
+
+
+@override_settings(CHANNEL_LAYERS={"default": {"BACKEND": "channels.layers.InMemoryChannelLayer"}})
+class TopicSubscriptionTests(TransactionTestCase):
+    """글로벌 소켓은 구독한 토픽의 이벤트만 받는지 확인"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="topics", password="pw")
+
+    async def _connect(self):
+        communicator = WebsocketCommunicator(URLRouter(websocket_urlpatterns), f"/ws/global/{self.user.id}/")
+        connected, _ = await communicator.connect()
+        self.assertTrue(connected)
+        self.assertEqual((await communicator.receive_json_from())["type"], "all_unread_counts")
+        return communicator
+
+    async def test_only_subscribers_receive_topic_events(self):
+        subscriber = await self._connect()
+        other = await self._connect()
+
+        await subscriber.send_json_to({"type": "subscribe", "topics": ["room_members.7", "unknown"]})
+        self.assertEqual(await subscriber.receive_json_from(), {"type": "subscribed", "topics": ["room_members.7"]})
+
+        await get_channel_layer().group_send(
+            topics.group_name(topics.room_members(7)),
+            {"type": "room_member_update", "room_id": 7, "member_count": 3},
+        )
+        self.assertEqual((await subscriber.receive_json_from())["member_count"], 3)
+        self.assertTrue(await other.receive_nothing())
+
+        await subscriber.send_json_to({"type": "unsubscribe", "topics": ["room_members.7"]})
+        await subscriber.receive_nothing()
+        await get_channel_layer().group_send(
+            topics.group_name(topics.room_members(7)),
+            {"type": "room_member_update", "room_id": 7, "member_count": 4},
+        )
+        self.assertTrue(await subscriber.receive_nothing())
+
+        await subscriber.disconnect()
+        await other.disconnect()
+
+
+@override_settings(
+    CHANNEL_LAYERS={"default": {"BACKEND": "channels.layers.InMemoryChannelLayer"}},
+    CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}},
+)
+class MetricBroadcastTests(TransactionTestCase):
+    """지표 변경이 간격당 한 번, 최신 값으로 합쳐져 전송되는지 확인"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username="metrics", password="pw")
+        self.room = ChatRoom.objects.create(name="metrics room", created_by=self.user)
+
+    async def test_member_updates_are_coalesced(self):
+        channel_layer = get_channel_layer()
+        channel = await channel_layer.new_channel()
+        await channel_layer.group_add(topics.group_name(topics.room_members(self.room.id)), channel)
+
+        for i in range(1, 6):
+            await RoomMember.objects.acreate(room=self.room, user=await User.objects.acreate(username=f"member{i}"))
+            await metrics.room_members_changed(self.room.id)
+
+        first = await channel_layer.receive(channel)
+        self.assertEqual(first["member_count"], 1)
+        latest = await asyncio.wait_for(channel_layer.receive(channel), timeout=3)
+        self.assertEqual(latest["member_count"], 5)
+        with self.assertRaises(asyncio.TimeoutError):
+            await asyncio.wait_for(channel_layer.receive(channel), timeout=1.5)
+        self.assertGreaterEqual(metrics.metric_broadcaster.stats["coalesced"], 4)
+
+
+@override_settings(
+    CHANNEL_LAYERS={"default": {"BACKEND": "channels.layers.InMemoryChannelLayer"}},
+    CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}},
+)
+class SyncMetricBroadcastTests(TransactionTestCase):
+    """동기 코드(뷰)에서 알린 지표 변경도 요청이 끝난 뒤 간격 끝에 최신 값으로 전송되는지 확인"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username="sync-metrics", password="pw")
+        self.room = ChatRoom.objects.create(name="sync metrics room", created_by=self.user)
+
+    def test_trailing_update_outlives_request(self):
+        channel_layer = get_channel_layer()
+        channel = async_to_sync(channel_layer.new_channel)()
+        async_to_sync(channel_layer.group_add)(topics.group_name(topics.room_members(self.room.id)), channel)
+
+        for i in range(1, 4):
+            RoomMember.objects.create(room=self.room, user=User.objects.create(username=f"sync-member{i}"))
+            metrics.notify(metrics.room_members_changed, self.room.id)
+
+        # 알림 호출이 모두 끝난 뒤에도 간격 끝 전송이 이어짐
+        time.sleep(metrics.metric_broadcaster.interval + 0.5)
+        first = async_to_sync(asyncio.wait_for)(channel_layer.receive(channel), timeout=3)
+        latest = async_to_sync(asyncio.wait_for)(channel_layer.receive(channel), timeout=3)
+        self.assertEqual((first["member_count"], latest["member_count"]), (1, 3))
+
+
+@override_settings(
+    CHANNEL_LAYERS={"default": {"BACKEND": "channels.layers.InMemoryChannelLayer"}},
+    CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}},
+    WS_RATE_LIMITS={"*": (1, 3)},
+    WS_RATE_LIMIT_EVICT_AFTER=5,
+    WS_MAX_FRAME_BYTES=1024,
+)
+class FlowControlTests(TransactionTestCase):
+    """연결별 수신 속도 제한과 강제 종료, 지표 집계 확인"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username="flow", password="pw")
+
+    async def _connect(self):
+        communicator = WebsocketCommunicator(URLRouter(websocket_urlpatterns), f"/ws/global/{self.user.id}/")
+        connected, _ = await communicator.connect()
+        self.assertTrue(connected)
+        await communicator.receive_json_from()
+        return communicator
+
+    async def test_flooding_connection_is_throttled_then_evicted(self):
+        communicator = await self._connect()
+        for _ in range(3):
+            await communicator.send_json_to({"type": "noop"})
+        self.assertTrue(await communicator.receive_nothing())
+
+        # 공용 버킷 프레임은 해석 전에 제한되므로 어떤 프레임이었는지는 알리지 않음
+        await communicator.send_json_to({"type": "noop", "client_id": 1})
+        throttled = await communicator.receive_json_from()
+        self.assertEqual(throttled["type"], "rate_limited")
+        self.assertIsNone(throttled["client_id"])
+
+        for _ in range(4):
+            await communicator.send_json_to({"type": "noop"})
+        while (output := await communicator.receive_output()).get("type") != "websocket.close":
+            pass
+        self.assertEqual(output["code"], 1008)
+        await communicator.disconnect()
+
+        metrics = flowcontrol.get_metrics()
+        self.assertEqual(metrics["throttled_connections"], 1)
+        self.assertEqual(metrics["throttled_frames"], 5)
+        self.assertEqual(metrics["evicted_connections"], 1)
+
+    @override_settings(WS_PING_INTERVAL=1)
+    async def test_live_connection_metrics_are_flushed_periodically(self):
+        communicator = await self._connect()
+        for _ in range(4):
+            await communicator.send_json_to({"type": "noop"})
+        self.assertEqual((await communicator.receive_json_from())["type"], "rate_limited")
+
+        # 연결을 유지한 채 ping 주기가 지나면 지표에 반영
+        self.assertEqual((await communicator.receive_json_from(timeout=2))["type"], "ping")
+        metrics = flowcontrol.get_metrics()
+        self.assertEqual((metrics["throttled_connections"], metrics["throttled_frames"]), (1, 1))
+
+        # 종료 시에는 그 이후 늘어난 만큼만 더함 (제한된 연결 수는 그대로)
+        for _ in range(3):
+            await communicator.send_json_to({"type": "noop"})
+        self.assertEqual((await communicator.receive_json_from())["type"], "rate_limited")
+        await communicator.disconnect()
+        metrics = flowcontrol.get_metrics()
+        self.assertEqual(metrics["throttled_connections"], 1)
+        self.assertGreaterEqual(metrics["throttled_frames"], 2)
+
+    async def test_malformed_frames_are_rate_limited(self):
+        communicator = await self._connect()
+        for _ in range(3):
+            await communicator.send_to(text_data="{not json")
+        self.assertTrue(await communicator.receive_nothing())
+
+        # 해석 전에 공용 버킷에서 차감하므로 깨진 프레임도 제한에 걸림
+        await communicator.send_to(text_data="{not json")
+        throttled = await communicator.receive_json_from()
+        self.assertEqual((throttled["type"], throttled["message_type"]), ("rate_limited", None))
+        await communicator.disconnect()
+
+        metrics = flowcontrol.get_metrics()
+        self.assertEqual((metrics["malformed_frames"], metrics["throttled_frames"]), (3, 1))
+
+    @override_settings(WS_RATE_LIMITS={"*": (1, 3), "refresh_unread_counts": (100, 100)})
+    async def test_typed_frames_do_not_use_shared_bucket(self):
+        communicator = await self._connect()
+        for _ in range(5):
+            await communicator.send_json_to({"type": "refresh_unread_counts"})
+            self.assertEqual((await communicator.receive_json_from())["type"], "all_unread_counts")
+        await communicator.disconnect()
+
+    @override_settings(WS_MALFORMED_EVICT_AFTER=2)
+    async def test_malformed_frames_evict_connection(self):
+        communicator = await self._connect()
+        await communicator.send_to(bytes_data=b"\xc1")
+        await communicator.send_to(text_data="[1, 2]")
+        output = await communicator.receive_output()
+        self.assertEqual(output, {"type": "websocket.close", "code": 1008})
+        await communicator.disconnect()
+        self.assertEqual(flowcontrol.get_metrics()["evicted_connections"], 1)
+
+    async def test_oversized_frame_closes_connection(self):
+        communicator = await self._connect()
+        await communicator.send_to(text_data="x" * 2048)
+        output = await communicator.receive_output()
+        self.assertEqual(output, {"type": "websocket.close", "code": 1009})
+        await communicator.disconnect()
+
+
+@override_settings(
+    CHANNEL_LAYERS={"default": {"BACKEND": "channels.layers.InMemoryChannelLayer"}},
+    WS_PING_INTERVAL=1,
+    WS_PING_TIMEOUT=2,
+)
+class HeartbeatTests(TransactionTestCase):
+    """서버 ping에 응답하지 않는 연결이 종료되는지 확인"""
+
+    async def test_silent_connection_is_closed(self):
+        user = await User.objects.acreate(username="heartbeat")
+        communicator = WebsocketCommunicator(URLRouter(websocket_urlpatterns), f"/ws/global/{user.id}/")
+        connected, _ = await communicator.connect()
+        self.assertTrue(connected)
+        await communicator.receive_json_from()
+
+        self.assertEqual(await communicator.receive_json_from(timeout=2), {"type": "ping"})
+        await communicator.send_json_to({"type": "pong"})
+        self.assertEqual(await communicator.receive_json_from(timeout=2), {"type": "ping"})
+
+        # 응답을 멈추면 WS_PING_TIMEOUT 뒤 종료
+        while (output := await communicator.receive_output(timeout=4))["type"] != "websocket.close":
+            pass
+        self.assertEqual(output["code"], 4000)
+        await communicator.disconnect()
+
+
+@override_settings(CHANNEL_LAYERS={"default": {"BACKEND": "channels.layers.InMemoryChannelLayer"}})
+class FrameEncodingTests(TransactionTestCase):
+    """msgpack 서브프로토콜 연결이 바이너리로 송수신하고, 방 브로드캐스트는 한 번 전송으로 연결마다 협상한 형식 하나만 받는지 확인"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="packer", password="pw")
+        self.room = ChatRoom.objects.create(name="encoding", created_by=self.user)
+        RoomMember.objects.create(room=self.room, user=self.user)
+
+    async def _connect(self, msgpack_protocol):
+        communicator = WebsocketCommunicator(
+            URLRouter(websocket_urlpatterns), f"/ws/chat/{self.room.id}/",
+            subprotocols=["msgpack"] if msgpack_protocol else None,
+        )
+        communicator.scope["user"] = self.user
+        connected, subprotocol = await communicator.connect()
+        self.assertTrue(connected)
+        self.assertEqual(subprotocol, "msgpack" if msgpack_protocol else None)
+        return communicator
+
+    async def test_msgpack_round_trip(self):
+        communicator = await self._connect(True)
+        await communicator.send_to(bytes_data=msgpack.packb({"type": "resume", "last_message_id": 0}))
+        output = await communicator.receive_output(timeout=3)
+        self.assertNotIn("text", output)
+        self.assertEqual(
+            msgpack.unpackb(output["bytes"]),
+            {"type": "resume_complete", "source": "database", "count": 0, "truncated": False},
+        )
+        await communicator.disconnect()
+
+    async def _broadcast_to_both(self):
+        packed, text = await self._connect(True), await self._connect(False)
+        channel_layer = get_channel_layer()
+        sent = []
+        layer_group_send = channel_layer.group_send
+
+        async def counting_group_send(group, message):
+            sent.append(group)
+            await layer_group_send(group, message)
+
+        channel_layer.group_send = counting_group_send
+        try:
+            await broadcast.group_send(channel_layer, f"chat_{self.room.id}", {
+                "type": "chat_message", "message": "hi", "username": "packer", "message_id": 1,
+                "unread_count": 0, "is_read_by_all": True, "user_id": self.user.id,
+                "created_at": "2026-01-01T00:00:00+00:00",
+            })
+        finally:
+            del channel_layer.group_send
+        # 형식과 관계없이 채널 레이어 전송은 브로드캐스트당 한 번
+        self.assertEqual(sent, [f"chat_{self.room.id}"])
+        packed_output, text_output = await packed.receive_output(timeout=3), await text.receive_output(timeout=3)
+        # 각 연결은 프레임 하나만 받음
+        self.assertTrue(await packed.receive_nothing())
+        self.assertTrue(await text.receive_nothing())
+        await packed.disconnect()
+        await text.disconnect()
+        return packed_output, text_output
+
+    async def test_broadcast_sends_only_negotiated_format(self):
+        for preencoded in (True, False):
+            with self.subTest(preencoded=preencoded), override_settings(BROADCAST_PREENCODED=preencoded):
+                packed_output, text_output = await self._broadcast_to_both()
+                self.assertEqual(set(packed_output) & {"text", "bytes"}, {"bytes"})
+                self.assertIsNone(text_output.get("bytes"))
+                frame = msgpack.unpackb(packed_output["bytes"])
+                self.assertEqual(frame, json.loads(text_output["text"]))
+                self.assertEqual((frame["type"], frame["message"]), ("chat", "hi"))
+
+
+@override_settings(CHANNEL_LAYERS={"default": {"BACKEND": "channels.layers.InMemoryChannelLayer"}})
+class ConsumerIdentityTests(TransactionTestCase):
+    """채팅 소켓이 프레임의 사용자를 연결 동안 한 번만 조회하고, 입장 프레임에서만 멤버를 만드는지 확인"""
+
+    def setUp(self):
+        self.alice = User.objects.create_user(username="alice", password="pw")
+        self.bob = User.objects.create_user(username="bob", password="pw")
+        self.room = ChatRoom.objects.create(name="identity", created_by=self.bob)
+        RoomMember.objects.create(room=self.room, user=self.bob)
+        self.message = create_message(self.room.id, self.bob, "hello")
+
+    async def _sync(self, communicator):
+        # resume 응답을 받으면 앞서 보낸 프레임은 모두 처리된 상태
+        await communicator.send_json_to({"type": "resume", "last_message_id": 10 ** 9})
+        while not (await communicator.receive_json_from(timeout=3))["type"].startswith("resume_"):
+            pass
+
+    async def test_identity_is_cached_until_member_leaves(self):
+        lookups = []
+        load_user = ChatConsumer.load_user
+
+        async def counting_load_user(consumer, username):
+            lookups.append(username)
+            return await load_user(consumer, username)
+
+        with patch.object(ChatConsumer, "load_user", counting_load_user):
+            communicator = WebsocketCommunicator(URLRouter(websocket_urlpatterns), f"/ws/chat/{self.room.id}/")
+            connected, _ = await communicator.connect()
+            self.assertTrue(connected)
+
+            for username in ("alice", "alice", "bob", "bob"):
+                await communicator.send_json_to({"type": "mark_read", "username": username, "message_id": self.message.id})
+            await self._sync(communicator)
+            self.assertEqual(lookups, ["alice", "bob"])
+            # 입장 외의 프레임은 멤버를 만들지 않음
+            self.assertFalse(await RoomMember.objects.filter(room=self.room, user=self.alice).aexists())
+
+            # 연결 이후 쌓인 메시지까지 읽은 상태로 입장 (연결 시점의 방 정보가 아닌 현재 last_seq)
+            for i in range(3):
+                await database_sync_to_async(create_message)(self.room.id, self.bob, f"msg {i}")
+            await communicator.send_json_to({"type": "user_join", "username": "alice"})
+            await self._sync(communicator)
+            member = await RoomMember.objects.select_related("room").aget(room=self.room, user=self.alice)
+            self.assertEqual(member.last_read_seq, member.room.last_seq)
+            self.assertEqual(member.unread_messages_count, 0)
+            self.assertEqual(lookups, ["alice", "bob", "alice"])
+
+            # 나간 사용자는 캐시에서 지워져 다음 프레임에서 다시 조회
+            await get_channel_layer().group_send(f"chat_{self.room.id}", {"type": "member_left", "user_id": self.alice.id})
+            await communicator.send_json_to({"type": "mark_read", "username": "alice", "message_id": self.message.id})
+            await self._sync(communicator)
+            self.assertEqual(lookups, ["alice", "bob", "alice", "alice"])
+            await communicator.disconnect()
+
+
+@override_settings(
+    CHANNEL_LAYERS={"default": {"BACKEND": "channels.layers.InMemoryChannelLayer"}},
+    CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}},
+)
+class ConsumerQueryTests(TransactionTestCase):
+    """비동기 ORM으로 바꾼 소켓 조회(방, 읽음 처리, 전체 안읽은 수)가 이전과 같은 결과를 내는지 확인"""
+
+    def setUp(self):
+        self.writer = User.objects.create_user(username="writer", password="pw")
+        self.reader = User.objects.create_user(username="reader", password="pw")
+        self.room = ChatRoom.objects.create(name="queries", created_by=self.writer)
+        for user in (self.writer, self.reader):
+            RoomMember.objects.create(room=self.room, user=user)
+        self.messages = [create_message(self.room.id, self.writer, f"msg {i}") for i in range(3)]
+
+    async def _connect(self, path):
+        communicator = WebsocketCommunicator(URLRouter(websocket_urlpatterns), path)
+        connected, _ = await communicator.connect()
+        return communicator, connected
+
+    async def test_inactive_room_is_refused(self):
+        await ChatRoom.objects.filter(id=self.room.id).aupdate(is_active=False)
+        communicator, connected = await self._connect(f"/ws/chat/{self.room.id}/")
+        self.assertFalse(connected)
+
+    async def test_mark_read_moves_reader_and_broadcasts(self):
+        communicator, connected = await self._connect(f"/ws/chat/{self.room.id}/")
+        self.assertTrue(connected)
+
+        await communicator.send_json_to({"type": "mark_read", "username": "reader", "message_id": self.messages[1].id})
+        frame = await communicator.receive_json_from(timeout=3)
+        self.assertEqual(frame["type"], "messages_read_count_update")
+        self.assertEqual(frame["reader_username"], "reader")
+        self.assertEqual(
+            [update["id"] for update in frame["updated_messages"]],
+            [self.messages[0].id, self.messages[1].id],
+        )
+        member = await RoomMember.objects.aget(room=self.room, user=self.reader)
+        self.assertEqual(member.last_read_seq, self.messages[1].seq)
+
+        # 다른 방이거나 없는 메시지는 읽음 처리하지 않음
+        await communicator.send_json_to({"type": "mark_read", "username": "reader", "message_id": 10 ** 9})
+        self.assertTrue(await communicator.receive_nothing())
+        await communicator.disconnect()
+
+    async def test_global_socket_sends_unread_counts(self):
+        closed = await ChatRoom.objects.acreate(name="closed", created_by=self.writer, is_active=False)
+        await RoomMember.objects.acreate(room=closed, user=self.reader)
+
+        communicator, connected = await self._connect(f"/ws/global/{self.reader.id}/")
+        self.assertTrue(connected)
+        # 비활성 방은 제외
+        self.assertEqual(
+            await communicator.receive_json_from(timeout=3),
+            {"type": "all_unread_counts", "unread_counts": {str(self.room.id): 3}},
+        )
+
+        await database_sync_to_async(mark_read)(self.room.id, [self.reader.id])
+        await communicator.send_json_to({"type": "refresh_unread_counts"})
+        frame = await communicator.receive_json_from(timeout=3)
+        self.assertEqual(frame["unread_counts"], {str(self.room.id): 0})
+        await communicator.disconnect()
+
+
+@override_settings(
+    CHANNEL_LAYERS={"default": {"BACKEND": "channels.layers.InMemoryChannelLayer"}},
+    REPLAY_DB_LIMIT=3,
+)
+class ReplayResumeTests(TransactionTestCase):
+    """재연결한 클라이언트의 resume 요청에 놓친 메시지가 ID 순으로 재전송되는지 확인 (링 버퍼에 없으면 DB)"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="resumer", password="pw")
+        self.room = ChatRoom.objects.create(name="resume", created_by=self.user)
+        RoomMember.objects.create(room=self.room, user=self.user)
+        self.messages = [
+            ChatMessage.objects.create(room=self.room, user=self.user, content=f"msg {i}") for i in range(5)
+        ]
+        self.messages[2].is_deleted = True
+        self.messages[2].save()
+
+    async def _resume(self, last_message_id, user=None):
+        communicator = WebsocketCommunicator(URLRouter(websocket_urlpatterns), f"/ws/chat/{self.room.id}/")
+        if user is not None:
+            communicator.scope["user"] = user
+        connected, _ = await communicator.connect()
+        self.assertTrue(connected)
+        await communicator.send_json_to({"type": "resume", "last_message_id": last_message_id})
+        frames = []
+        while (frame := await communicator.receive_json_from(timeout=3))["type"] not in ("resume_complete", "resume_rejected"):
+            frames.append(frame)
+        await communicator.disconnect()
+        return frames, frame
+
+    async def test_resume_replays_missed_messages_from_database(self):
+        frames, complete = await self._resume(self.messages[0].id, self.user)
+        # 삭제된 메시지는 건너뜀
+        expected = [self.messages[i].id for i in (1, 3, 4)]
+        self.assertEqual([frame["message_id"] for frame in frames], expected)
+        self.assertEqual(frames[0]["type"], "chat")
+        self.assertEqual(frames[0]["message"], "msg 1")
+        self.assertEqual(complete, {"type": "resume_complete", "source": "database", "count": 3, "truncated": False})
+
+    async def test_resume_reports_truncated_gap(self):
+        frames, complete = await self._resume(0, self.user)
+        self.assertEqual(len(frames), 3)
+        self.assertTrue(complete["truncated"])
+
+    async def test_resume_rejects_unauthenticated_socket(self):
+        frames, rejected = await self._resume(0)
+        self.assertEqual(frames, [])
+        self.assertEqual(rejected, {"type": "resume_rejected", "reason": "not_member"})
+
+    async def test_resume_rejects_non_member(self):
+        outsider = await User.objects.acreate(username="outsider")
+        frames, rejected = await self._resume(0, outsider)
+        self.assertEqual(frames, [])
+        self.assertEqual(rejected["type"], "resume_rejected")
+
+    async def test_resume_skips_messages_before_join(self):
+        late = await User.objects.acreate(username="late")
+        await RoomMember.objects.acreate(room=self.room, user=late)
+        await RoomMember.objects.filter(user=late).aupdate(joined_at=self.messages[3].created_at)
+
+        frames, complete = await self._resume(0, late)
+        self.assertEqual([frame["message_id"] for frame in frames], [self.messages[3].id, self.messages[4].id])
+        self.assertFalse(complete["truncated"])
+
+        # 링 버퍼 프레임도 같은 기준으로 거름
+        buffered = [replay.message_frame(message) for message in self.messages]
+        kept = replay.since_joined(buffered, self.messages[3].created_at)
+        self.assertEqual([frame["message_id"] for frame in kept], [self.messages[3].id, self.messages[4].id])
+
+
+class HistoryCacheTests(TransactionTestCase):
+    """메시지 첫 페이지 캐시가 쓰기와 함께 갱신되어 DB 조회와 같은 응답을 DB 없이 돌려주는지 확인"""
+
+    def setUp(self):
+        try:
+            presence.get_client().ping()
+        except Exception:
+            self.skipTest("Redis 서버가 필요합니다.")
+
+        self.user = User.objects.create_user(username="reader", password="pw")
+        self.other = User.objects.create_user(username="writer", password="pw")
+        self.room = ChatRoom.objects.create(name="history-cache", created_by=self.user)
+        presence.get_client().delete(*history._keys(self.room.id))
+        for user in (self.user, self.other):
+            RoomMember.objects.create(room=self.room, user=user)
+        for i in range(35):
+            create_message(self.room.id, self.other, f"msg {i}")
+
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def _get_messages(self, cached=True):
+        with override_settings(HISTORY_CACHE_ENABLED=cached):
+            return self.client.get(f"/chat/api/rooms/{self.room.id}/messages/").json()
+
+    def test_cached_page_is_written_through(self):
+        # 캐시를 채우는 첫 요청도 DB 조회와 같은 응답
+        self.assertEqual(self._get_messages(), self._get_messages(cached=False))
+
+        newest = ChatMessage.objects.filter(room=self.room).latest("id")
+        toggle_reaction(newest, self.user, "like")
+        mark_read(self.room.id, [self.user.id])
+        create_message(self.room.id, self.other, "new")
+
+        with self.assertNumQueries(0):
+            cached = self._get_messages()
+        self.assertEqual(cached, self._get_messages(cached=False))
+        self.assertEqual(cached["results"][0]["content"], "new")
+        self.assertEqual(cached["results"][1]["user_reaction"], "like")
+        self.assertEqual(cached["results"][1]["unread_count"], 0)
+        self.assertIsNotNone(cached["next"])
+
+
+class MessageSearchTests(TestCase):
+    """메시지 검색이 내가 속한 방의 메시지만 관련도순으로 찾고 키셋으로 이어지는지 확인"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="searcher", password="pw")
+        self.other = User.objects.create_user(username="other", password="pw")
+        self.room = ChatRoom.objects.create(name="search", created_by=self.user)
+        self.hidden_room = ChatRoom.objects.create(name="hidden", created_by=self.other)
+        RoomMember.objects.create(room=self.room, user=self.user)
+        RoomMember.objects.create(room=self.hidden_room, user=self.other)
+
+        self.exact = ChatMessage.objects.create(room=self.room, user=self.other, content="내일 회의 10시")
+        self.partial = ChatMessage.objects.create(room=self.room, user=self.other, content="회의록 공유드립니다")
+        ChatMessage.objects.create(room=self.room, user=self.other, content="점심 메뉴")
+        ChatMessage.objects.create(room=self.hidden_room, user=self.other, content="비공개 회의")
+
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def _search(self, **params):
+        return self.client.get("/chat/api/messages/search/", params)
+
+    def test_search_ranks_member_room_messages(self):
+        response = self._search(q="회의")
+        self.assertEqual(response.status_code, 200)
+        # 단어 일치가 부분 일치보다 앞, 멤버가 아닌 방은 제외
+        self.assertEqual([m["id"] for m in response.data["results"]], [self.exact.id, self.partial.id])
+
+        response = self._search(q="회의", room_id=self.hidden_room.id)
+        self.assertEqual(response.data["results"], [])
+
+    def test_search_keyset_pagination(self):
+        first = self._search(q="회의", page_size=1)
+        self.assertEqual([m["id"] for m in first.data["results"]], [self.exact.id])
+
+        second = self.client.get(first.data["next"])
+        self.assertEqual([m["id"] for m in second.data["results"]], [self.partial.id])
+        self.assertIsNone(second.data["next"])
+
+    def test_search_requires_query(self):
+        self.assertEqual(self._search(q=" 회 ").status_code, 400)
+
+
+class HotQueryIndexTests(TestCase):
+    """
+    자주 실행되는 조회의 실행 계획이 0021 마이그레이션의 새 인덱스를 쓰는지 EXPLAIN으로 확인
+    순차 스캔을 끄지 않고, 방/멤버/메시지 수를 실제 분포에 가깝게 채워 플래너가 스스로 고르게 함
+    """
+
+    ROOMS = 40
+    USERS = 100
+    MESSAGES_PER_ROOM = 500
+    UNREAD_PER_ROOM = 20
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = User.objects.bulk_create([User(username=f"index{i}") for i in range(cls.USERS)])
+        cls.rooms = ChatRoom.objects.bulk_create([
+            ChatRoom(name=f"index{i}", last_seq=cls.MESSAGES_PER_ROOM) for i in range(cls.ROOMS)
+        ])
+        read_seq = cls.MESSAGES_PER_ROOM - cls.UNREAD_PER_ROOM
+        RoomMember.objects.bulk_create([
+            RoomMember(room=room, user=user, last_read_seq=read_seq) for room in cls.rooms for user in cls.users
+        ])
+        ChatMessage.objects.bulk_create([
+            ChatMessage(
+                room=room,
+                user=cls.users[seq % cls.USERS],
+                content=f"msg {seq}",
+                seq=seq,
+                # 대부분의 메시지는 모두 읽은 상태, 최근 메시지만 안읽은 멤버가 남음
+                unread_count=3 if seq > read_seq else 0,
+                is_deleted=seq % 50 == 0,
+            )
+            for room in cls.rooms for seq in range(1, cls.MESSAGES_PER_ROOM + 1)
+        ], batch_size=5000)
+        with connection.cursor() as cursor:
+            for model in (ChatMessage, ChatRoom, RoomMember):
+                cursor.execute(f"ANALYZE {model._meta.db_table}")
+
+    def _index_names(self, sql, params=None):
+        """실행 계획에서 사용한 인덱스 이름 목록"""
+        with connection.cursor() as cursor:
+            cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+            plan = cursor.fetchone()[0]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+
+        names = []
+        nodes = [plan[0]["Plan"]]
+        while nodes:
+            node = nodes.pop()
+            if "Index Name" in node:
+                names.append(node["Index Name"])
+            nodes.extend(node.get("Plans", []))
+        return names
+
+    def _queryset_index_names(self, queryset):
+        return self._index_names(*queryset.query.sql_with_params())
+
+    def test_history_page_uses_partial_page_index(self):
+        room, user = self.rooms[0], self.users[0]
+        member = RoomMember.objects.get(room=room, user=user)
+        messages = annotate_reactions(ChatMessage.objects.filter(
+            room=room, is_deleted=False, created_at__gte=member.joined_at,
+        ).select_related("user", "room"), user).order_by("-created_at", "-id")[:31]
+        self.assertIn("chat_message_room_page_idx", self._queryset_index_names(messages))
+
+    def test_mark_read_uses_partial_unread_index(self):
+        names = self._index_names(MARK_READ_SQL, {
+            "room_id": self.rooms[0].id, "user_ids": [self.users[0].id], "up_to_seq": None, "read_at": timezone.now(),
+        })
+        self.assertIn("chat_message_unread_idx", names)
+
+    def test_inbox_uses_member_seen_index(self):
+        inbox = RoomMember.objects.filter(user=self.users[0], room__is_active=True).select_related(
+            "room", "room__created_by", "room__last_message"
+        ).order_by("-last_seen")
+        self.assertIn("chat_member_user_seen_idx", self._queryset_index_names(inbox))
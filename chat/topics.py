@@ -0,0 +1,24 @@
+import re
+
+# 글로벌 WebSocket 구독 토픽
+# 클라이언트는 화면에 그리는 정보의 토픽만 구독하고, 서버는 토픽 그룹에만 이벤트를 보냄
+STATS = "stats"  # 서버 통계 (online_stats)
+DIRECTORY = "directory"  # 방 목록 생성/비활성화 (room_created)
+ROOM_MEMBERS = "room_members.{room_id}"  # 방별 인원수 (room_member_update)
+
+ROOM_MEMBERS_PATTERN = re.compile(r"room_members\.(\d{1,18})", re.ASCII)
+
+
+def room_members(room_id):
+    return ROOM_MEMBERS.format(room_id=room_id)
+
+
+def group_name(topic):
+    """토픽 → 채널 레이어 그룹 이름 (알 수 없는 토픽이면 None)"""
+    if topic in (STATS, DIRECTORY):
+        return f"topic_{topic}"
+    if isinstance(topic, str):
+        match = ROOM_MEMBERS_PATTERN.fullmatch(topic)
+        if match:
+            return f"topic_room_members_{int(match.group(1))}"
+    return None
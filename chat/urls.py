@@ -13,8 +13,10 @@ urlpatterns = [
     path("api/my-rooms/", views.MyRoomsAPIView.as_view(), name="api_user_room_list"),
     path("api/rooms/create/", views.RoomCreateAPIView.as_view(), name="api_room_create"),
     path("api/stats/", views.RoomStatsAPIView.as_view(), name="api_room_stats"),
+    path("api/stats/connections/", views.ConnectionMetricsAPIView.as_view(), name="api_connection_metrics"),
     path("api/rooms/delete/<int:room_id>/", views.RoomDeleteAPIView.as_view(), name="api_room_delete"),
     path("api/rooms/<int:room_id>/messages/", views.GetMessageAPIView.as_view(), name="api_message_list"),
+    path("api/messages/search/", views.MessageSearchAPIView.as_view(), name="api_message_search"),
     path("api/rooms/<int:room_id>/join/", views.JoinRoomAPIView.as_view(), name="api_room_join"),
     path("api/rooms/<int:room_id>/leave/", views.LeaveRoomAPIView.as_view(), name="api_room_leave"),
     path('api/rooms/<int:room_id>/info/', views.RoomInfoAPIView.as_view(), name='room_info'),
@@ -14,4 +14,22 @@ def send_web_push(subscription_info, data):
         return True
     except WebPushException as ex:
         print("Web push failed: {}", repr(ex))
-        return False
\ No newline at end of file
+        return False
+
+def deliver_web_push(subscription_info, data, timeout=None):
+    """웹 푸시 1건 전송 후 푸시 서비스의 HTTP 응답 코드 반환 (네트워크 오류는 예외 그대로 전달)"""
+    try:
+        response = webpush(
+            subscription_info=subscription_info,
+            data=data,
+            vapid_private_key=settings.VAPID_PRIVATE_KEY,
+            vapid_claims={
+                "sub": "mailto:admin@example.com"
+            },
+            timeout=timeout,
+        )
+        return response.status_code
+    except WebPushException as ex:
+        if ex.response is None:
+            raise
+        return ex.response.status_code
@@ -1,4 +1,3 @@
-from datetime import datetime
 import mimetypes
 import os
 from django.http import HttpResponse, JsonResponse
@@ -6,21 +5,30 @@ from django.shortcuts import get_object_or_404, render
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
+from rest_framework.exceptions import ValidationError
+from rest_framework.utils.urls import replace_query_param
 from django.contrib.auth.models import User
-from rest_framework.permissions import AllowAny, IsAuthenticated
+from rest_framework.permissions import AllowAny, IsAdminUser, IsAuthenticated
 from rest_framework_simplejwt.tokens import RefreshToken
+from chat import broadcast, directory, flowcontrol, history, metrics, presence, replay, stats, topics
+from chat.reactions import toggle_reaction
+from chat.receipts import as_read_updates, mark_read
 from chat.serializers import (
     ChatMessageSerializer,
     LoginRequestSerializer,
+    annotate_reactions,
     LoginResponseSerializer,
     PushSubscriptionSerializer,
 )
-from .models import ChatRoom, ChatMessage, MessageReaction, PushSubscription, RoomMember, UserProfile
+from .models import ChatRoom, ChatMessage, MessageReaction, PushSubscription, RoomDeparture, RoomMember, UserProfile
+from django.db.models import Q
 from django.utils import timezone
+from django.utils.dateparse import parse_datetime
 from django.contrib.auth import authenticate
 from drf_spectacular.utils import extend_schema
 from rest_framework.parsers import MultiPartParser, FormParser
-from rest_framework.pagination import PageNumberPagination
+from chat.pagination import MessageCursorPagination, SearchCursorPagination
+from chat.search import MIN_QUERY_LENGTH, search_messages
 
 
 # 테스트용 템플릿 뷰
@@ -65,24 +73,17 @@ class LoginAPIView(APIView):
                     user=user,
                     defaults={"is_online": True, "last_activity": timezone.now()},
                 )
+                was_online = not created and profile.is_online
                 if not created:
                     profile.is_online = True
                     profile.last_activity = timezone.now()
                     profile.save()
-                
-                online_users_count = UserProfile.objects.filter(is_online=True).count()
-                try:
-                    from channels.layers import get_channel_layer
-                    from asgiref.sync import async_to_sync
 
-                    channel_layer = get_channel_layer()
-                    async_to_sync(channel_layer.group_send)(
-                        "global",
-                        {
-                            "type": "online_stats",
-                            "online_users": online_users_count
-                        }
-                    )
+                # 온라인 수는 캐시 카운터로 관리, 브로드캐스트는 간격당 한 번으로 합침
+                if not was_online:
+                    stats.user_came_online()
+                try:
+                    metrics.notify(metrics.online_users_changed)
                 except:
                     raise Exception("채널 레이어 오류 발생")
                 return Response({
@@ -121,6 +122,8 @@ class LogoutAPIView(APIView):
             # 사용자 오프라인 상태 변경
             try:
                 profile = UserProfile.objects.get(user=request.user)
+                if profile.is_online:
+                    stats.user_went_offline()
                 profile.is_online = False
                 profile.last_activity = timezone.now()
                 profile.save()
@@ -135,20 +138,9 @@ class LogoutAPIView(APIView):
                     token.blacklist()
                 except:
                     pass
-            online_users_count = UserProfile.objects.filter(is_online=True).count()
 
             try:
-                from channels.layers import get_channel_layer
-                from asgiref.sync import async_to_sync
-
-                channel_layer = get_channel_layer()
-                async_to_sync(channel_layer.group_send)(
-                    "global",
-                    {
-                        "type": "online_stats",
-                        "online_users": online_users_count
-                    }
-                )
+                metrics.notify(metrics.online_users_changed)
             except:
                 raise Exception("채널 레이어 오류 발생")
 
@@ -196,49 +188,52 @@ class RoomListAPIView(APIView):
     """
     채팅방 목록 조회 API
     활성화된 모든 채팅방 목록 반환 (본인이 속한 방 제외)
+    방 목록 페이지는 공유 캐시(chat.directory)에서 읽고, next 커서(before)로 이어서 조회
+    본인이 속한 방은 캐시된 페이지에서 걸러내므로 페이지가 page_size보다 짧을 수 있음
     """
     permission_classes = [AllowAny]
 
     def get(self, request):
         try:
+            try:
+                page_size = max(1, min(int(request.query_params.get("page_size", 20)), 100))
+            except ValueError:
+                page_size = 20
+            rooms, next_cursor = directory.get_page(request.query_params.get("before"), page_size)
+
             # 본인이 속한 방 ID 목록 조회
             rooms_in_me = (
-                RoomMember.objects.filter(
+                set(RoomMember.objects.filter(
                     user=request.user, room__is_active=True
-                ).values_list("room_id", flat=True)
+                ).values_list("room_id", flat=True))
                 if request.user.is_authenticated
-                else []
-            )
-            
-            # 본인이 속하지 않은 활성 채팅방 조회 (최대 20개)
-            rooms = (
-                ChatRoom.objects.filter(is_active=True)
-                .exclude(id__in=rooms_in_me)
-                .select_related("created_by")[:20]
+                else set()
             )
 
             rooms_data = []
             for room in rooms:
-                # 삭제 권한 확인 (방 생성자만 가능)
-                can_delete = (
-                    request.user.is_authenticated and 
-                    room.created_by and 
-                    room.created_by == request.user
-                )
+                if room["id"] in rooms_in_me:
+                    continue
 
                 rooms_data.append({
-                    "id": room.id,
-                    "name": room.name,
-                    "description": room.description,
-                    "created_at": room.created_at.isoformat(),
-                    "created_by": room.created_by.username if room.created_by else "알 수 없음",
-                    "max_members": room.max_members,
-                    "member_count": RoomMember.objects.filter(room=room).count(),
-                    "can_delete": can_delete,
+                    "id": room["id"],
+                    "name": room["name"],
+                    "description": room["description"],
+                    "created_at": room["created_at"].isoformat(),
+                    "created_by": room["created_by__username"] or "알 수 없음",
+                    "max_members": room["max_members"],
+                    "member_count": room["member_count"],
+                    # 삭제 권한 확인 (방 생성자만 가능)
+                    "can_delete": request.user.is_authenticated and room["created_by_id"] == request.user.id,
                 })
 
-            return Response({"results": rooms_data})
+            next_url = None
+            if next_cursor:
+                next_url = replace_query_param(request.build_absolute_uri(), "before", next_cursor)
+            return Response({"results": rooms_data, "next": next_url})
 
+        except ValidationError:
+            raise
         except Exception as e:
             return Response(
                 {"success": False, "detail": str(e)},
@@ -250,6 +245,9 @@ class MyRoomsAPIView(APIView):
     """
     내가 속한 채팅방 목록 조회 API
     현재 사용자가 멤버로 등록된 모든 활성 방 목록 반환
+    방의 비정규화 필드(member_count, last_message)를 조인해 방 개수와 관계없이 쿼리 1회
+    since=<ISO 시각>이면 {"rooms": 그 이후 변경된 방, "removed_room_ids": 그 이후 나간 방 ID} 반환
+    (방 정보/마지막 메시지 변경과 다른 기기에서의 읽음 처리 포함, 비활성화된 방은 is_active=false로 포함)
     """
     permission_classes = [IsAuthenticated]
 
@@ -257,55 +255,59 @@ class MyRoomsAPIView(APIView):
         try:
             # 사용자가 속한 모든 활성 방 조회 (최근 접속순)
             my_memberships = (
-                RoomMember.objects.filter(user=request.user, room__is_active=True)
-                .select_related("room", "room__created_by")
+                RoomMember.objects.filter(user=request.user)
+                .select_related("room", "room__created_by", "room__last_message")
                 .order_by("-last_seen")
             )
 
+            since = request.query_params.get("since")
+            if since:
+                # URL에서 인코딩되지 않은 "+" 오프셋은 공백으로 들어오므로 복원
+                since_at = parse_datetime(since.replace(" ", "+"))
+                if since_at is None:
+                    return Response(
+                        {"success": False, "detail": "since는 ISO 8601 형식이어야 합니다."},
+                        status=status.HTTP_400_BAD_REQUEST,
+                    )
+                my_memberships = my_memberships.filter(
+                    Q(room__updated_at__gt=since_at) | Q(last_read_at__gt=since_at)
+                )
+            else:
+                my_memberships = my_memberships.filter(room__is_active=True)
+
             rooms_data = []
             for membership in my_memberships:
                 room = membership.room
-                current_member_count = RoomMember.objects.filter(room=room).count()
-
-                # 안읽은 메시지 수 계산
-                last_read_time = (
-                    membership.last_read_message.created_at 
-                    if membership.last_read_message 
-                    else timezone.make_aware(datetime.min)
-                )
-                unread_count = ChatMessage.objects.filter(
-                    room=room,
-                    created_at__gt=last_read_time,
-                    user__isnull=False,  # 시스템 메시지 제외
-                    is_deleted=False
-                ).count()
-
-                # 마지막 메시지 정보 조회
-                last_message = ChatMessage.objects.filter(
-                    room=room,
-                    is_deleted=False,
-                    user__isnull=False
-                ).order_by('-created_at').first()
-
-                last_message_content = last_message.content if last_message else None
-                last_message_time = last_message.created_at.isoformat() if last_message else None
+                last_message = room.last_message
 
                 rooms_data.append({
                     "id": room.id,
                     "name": room.name,
                     "description": room.description,
                     "created_at": room.created_at.isoformat(),
+                    "updated_at": room.updated_at.isoformat(),
                     "created_by": room.created_by.username if room.created_by else "알 수 없음",
                     "max_members": room.max_members,
-                    "member_count": current_member_count,
+                    "member_count": room.member_count,
+                    "is_active": room.is_active,
                     "is_admin": membership.is_admin,
                     "last_seen": membership.last_seen.isoformat() if membership.last_seen else None,
                     "joined_at": membership.joined_at.isoformat() if membership.joined_at else None,
-                    "unread_count": unread_count,
-                    "last_message": last_message_content,
-                    "last_message_time": last_message_time,
+                    # 안읽은 메시지 수 (순번 차이)
+                    "unread_count": max(0, room.last_seq - membership.last_read_seq),
+                    "last_message": last_message.content if last_message else None,
+                    "last_message_time": room.last_message_at.isoformat() if room.last_message_at else None,
                 })
 
+            if since:
+                # 나간 뒤 다시 들어온 방은 목록 변경분에 포함되므로 제외
+                removed_room_ids = RoomDeparture.objects.filter(
+                    user=request.user, left_at__gt=since_at
+                ).exclude(
+                    room_id__in=RoomMember.objects.filter(user=request.user).values("room_id")
+                ).values_list("room_id", flat=True)
+                return Response({"rooms": rooms_data, "removed_room_ids": list(removed_room_ids)})
+
             return Response(rooms_data)
 
         except Exception as e:
@@ -380,7 +382,7 @@ class RoomCreateAPIView(APIView):
                 
                 channel_layer = get_channel_layer()
                 async_to_sync(channel_layer.group_send)(
-                    "global",
+                    topics.group_name(topics.DIRECTORY),
                     {
                         "type": "room_created",
                         "room": room_data,
@@ -436,6 +438,19 @@ class RoomDeleteAPIView(APIView):
             room_name = room.name
             room.is_active = False
             room.save()
+            stats.room_deactivated()
+
+            # 접속 중인 채팅 소켓에 비활성화 알림 (연결별 캐시 무효화)
+            try:
+                from channels.layers import get_channel_layer
+                from asgiref.sync import async_to_sync
+
+                channel_layer = get_channel_layer()
+                async_to_sync(channel_layer.group_send)(
+                    f"chat_{room_id}", {"type": "room_deactivated", "room_id": room_id}
+                )
+            except Exception as e:
+                print(f"방 비활성화 브로드캐스트 오류: {e}")
 
             return Response(
                 {"success": True, "message": f"{room_name} 채팅방이 삭제되었습니다."}
@@ -452,33 +467,19 @@ class RoomStatsAPIView(APIView):
     """
     서버 통계 API
     전체 방 수, 사용자 수, 온라인 사용자 수, 오늘 메시지 수 등 통계 반환
+    카운터는 chat.stats가 이벤트마다 증감하고 크론으로 재계산
     """
     permission_classes = [AllowAny]
 
     def get(self, request):
         try:
-            # 서버 통계 데이터 수집
-            total_rooms = ChatRoom.objects.filter(is_active=True).count()
-            total_users = User.objects.count()
-            
-            today = timezone.now().date()
-            today_messages = ChatMessage.objects.filter(
-                created_at__date=today, is_deleted=False
-            ).count()
-
-            # 온라인 사용자 수 (안전하게 처리)
-            try:
-                online_users = UserProfile.objects.filter(is_online=True).count()
-            except:
-                online_users = 0
+            # 이벤트마다 갱신되는 캐시 카운터 조회 (DB 집계 없음)
+            server_stats = stats.get_stats()
 
             return Response({
                 "success": True,
                 "stats": {
-                    "total_rooms": total_rooms,
-                    "total_users": total_users,
-                    "online_users": online_users,
-                    "today_messages": today_messages,
+                    **server_stats,
                     "server_status": "healthy",
                 },
                 "message": "통계 정보를 가져왔습니다.",
@@ -491,14 +492,32 @@ class RoomStatsAPIView(APIView):
             )
 
 
+class ConnectionMetricsAPIView(APIView):
+    """
+    WebSocket 연결 제어 지표 API (관리자 전용)
+    속도 제한에 걸린 프레임/연결 수, 버려진 송신 프레임 수, 강제 종료된 연결 수 반환
+    """
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response({"success": True, "metrics": flowcontrol.get_metrics()})
+
+
 class GetMessageAPIView(APIView):
     """
     채팅방 메시지 조회 API
     사용자가 입장한 시점 이후의 메시지만 조회
+    before/after 커서 또는 after_id로 이어서 조회 (MessageCursorPagination)
+    커서 없는 최신 페이지는 방별 캐시에서 응답 (chat.history)
     """
     permission_classes = [IsAuthenticated]
 
     def get(self, request, room_id):
+        if history.is_first_page(request):
+            page = history.get_first_page(room_id, request)
+            if page is not None:
+                return Response(page)
+
         try:
             room = ChatRoom.objects.get(id=room_id, is_active=True)
             room_member = RoomMember.objects.get(room=room, user=request.user)
@@ -508,11 +527,12 @@ class GetMessageAPIView(APIView):
                 room=room,
                 is_deleted=False,
                 created_at__gte=room_member.joined_at,
-            ).select_related("user", "room").order_by("-created_at")
+            ).select_related("user", "room")
+            # 반응 개수와 내 반응을 한 쿼리로 함께 조회
+            messages = annotate_reactions(messages, request.user)
 
-            # 페이지네이션 적용
-            paginator = PageNumberPagination()
-            paginator.page_size = 30
+            # 커서 페이지네이션 적용 (정렬은 페이지네이터가 결정)
+            paginator = MessageCursorPagination()
             paginated_messages = paginator.paginate_queryset(messages, request)
 
             serializer = ChatMessageSerializer(paginated_messages, many=True, context={"request": request})
@@ -530,6 +550,38 @@ class GetMessageAPIView(APIView):
             )
 
 
+class MessageSearchAPIView(APIView):
+    """
+    메시지 검색 API
+    내가 속한 방(room_id를 주면 그 방만)에서 입장 이후 메시지를 검색해 관련도순으로 반환
+    cursor로 이어서 조회 (SearchCursorPagination)
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        text = request.query_params.get("q", "").strip()
+        if len(text) < MIN_QUERY_LENGTH:
+            return Response(
+                {"detail": f"검색어는 {MIN_QUERY_LENGTH}자 이상 입력해 주세요."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        room_id = request.query_params.get("room_id")
+        if room_id is not None and not room_id.isdigit():
+            return Response(
+                {"detail": "room_id는 숫자여야 합니다."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        messages = search_messages(request.user, text, int(room_id) if room_id else None)
+        messages = annotate_reactions(messages, request.user)
+
+        paginator = SearchCursorPagination()
+        results = paginator.paginate_queryset(messages, request)
+        serializer = ChatMessageSerializer(results, many=True, context={"request": request})
+        return paginator.get_paginated_response(serializer.data)
+
+
 class JoinRoomAPIView(APIView):
     """
     채팅방 입장 API
@@ -547,14 +599,14 @@ class JoinRoomAPIView(APIView):
             )
 
         current_members = RoomMember.objects.filter(room=room).count()
-        member, created = RoomMember.objects.get_or_create(room=room, user=request.user)
-
-        # 실시간 접속 상태 업데이트
-        member.last_seen = timezone.now()
-        member.is_currently_in_room = True
-        member.save()
+        # 신규 멤버는 입장 시점까지의 메시지를 읽은 것으로 시작
+        member, created = RoomMember.objects.get_or_create(
+            room=room, user=request.user, defaults={"last_read_seq": room.last_seq}
+        )
 
-        online_members_count = RoomMember.objects.filter(room=room, is_currently_in_room=True).count()
+        # 방 마지막 접속 기록 (DB 반영은 주기 작업), 접속자 수는 Redis 레지스트리에서 조회
+        presence.touch(room.id, request.user.id)
+        online_members_count = presence.online_count(room.id)
 
         # 글로벌 WebSocket으로 안읽은 수 업데이트 브로드캐스트
         try:
@@ -562,18 +614,7 @@ class JoinRoomAPIView(APIView):
             from asgiref.sync import async_to_sync
             
             # 현재 사용자의 안읽은 메시지 수 계산
-            last_read_time = (
-                member.last_read_message.created_at 
-                if member.last_read_message 
-                else timezone.make_aware(datetime.min)
-            )
-            
-            unread_count = ChatMessage.objects.filter(
-                room=room,
-                created_at__gt=last_read_time,
-                user__isnull=False,
-                is_deleted=False
-            ).count()
+            unread_count = max(0, room.last_seq - member.last_read_seq)
             
             channel_layer = get_channel_layer()
             async_to_sync(channel_layer.group_send)(
@@ -584,15 +625,9 @@ class JoinRoomAPIView(APIView):
                     "unread_count": unread_count
                 }
             )
-            member_count = RoomMember.objects.filter(room_id=room_id).count()
-            async_to_sync(channel_layer.group_send)(
-                "global",
-                {
-                    "type": "room_member_update",
-                    "room_id": room_id,
-                    "member_count": member_count
-                }
-            )
+            # 인원수는 새 멤버일 때만 바뀜
+            if created:
+                metrics.notify(metrics.room_members_changed, room_id)
         except Exception as e:
             print(f"입장 시 글로벌 WebSocket 브로드캐스트 오류: {e}")
 
@@ -628,58 +663,27 @@ class LeaveRoomAPIView(APIView):
             )
 
         try:
-            member = RoomMember.objects.get(room=room, user=request.user)
-            
-            # 나가기 전 안 읽은 메시지들을 모두 읽음 처리
-            last_read_time = (
-                member.last_read_message.created_at 
-                if member.last_read_message 
-                else timezone.make_aware(datetime.min)
-            )
-            unread_messages = ChatMessage.objects.filter(
-                room=room,
-                created_at__gt=last_read_time,
-                user__isnull=False,  # 시스템 메시지 제외
-                is_deleted=False
-            ).order_by('created_at')
+            RoomMember.objects.only('id').get(room=room, user=request.user)
             
-            processed_count = 0
-            updated_messages = []
+            # 나가기 전 안 읽은 메시지들을 한 번에 읽음 처리
+            updated_messages = as_read_updates(mark_read(room.id, [request.user.id]))
+            processed_count = len(updated_messages)
             
-            if unread_messages.exists():
-                latest_message = unread_messages.latest('created_at')
-                
-                # 각 메시지 읽음 처리
-                for message in unread_messages:
-                    if message.mark_as_read_by(request.user):
-                        processed_count += 1
-                    
-                    message.refresh_from_db()
-                    updated_messages.append({
-                        'id': message.id,
-                        'unread_count': message.unread_count,
-                        'is_read_by_all': message.is_read_by_all
-                    })
-                
-                # 멤버의 마지막 읽은 메시지 업데이트
-                member.last_read_message = latest_message
-                member.last_seen = timezone.now()
-                member.save()
+            # WebSocket으로 실시간 브로드캐스트 (나가기 전에)
+            if updated_messages:
+                from channels.layers import get_channel_layer
+                from asgiref.sync import async_to_sync
                 
-                # WebSocket으로 실시간 브로드캐스트 (나가기 전에)
-                if updated_messages:
-                    from channels.layers import get_channel_layer
-                    from asgiref.sync import async_to_sync
-                    
-                    channel_layer = get_channel_layer()
-                    async_to_sync(channel_layer.group_send)(
-                        f"chat_{room_id}",
-                        {
-                            "type": "messages_read_count_update",
-                            "updated_messages": updated_messages,
-                            "reader_username": request.user.username
-                        }
-                    )
+                channel_layer = get_channel_layer()
+                async_to_sync(broadcast.group_send)(
+                    channel_layer,
+                    f"chat_{room_id}",
+                    {
+                        "type": "messages_read_count_update",
+                        "updated_messages": updated_messages,
+                        "reader_username": request.user.username
+                    }
+                )
 
         except RoomMember.DoesNotExist:
             return Response(
@@ -693,6 +697,20 @@ class LeaveRoomAPIView(APIView):
         ).delete()
 
         if deleted_count > 0:
+            # 다른 기기의 방 목록 변경분 조회에서 나간 방으로 알려주기 위해 기록
+            RoomDeparture.objects.update_or_create(
+                room=room, user=request.user, defaults={"left_at": timezone.now()}
+            )
+
+            from channels.layers import get_channel_layer
+            from asgiref.sync import async_to_sync
+
+            channel_layer = get_channel_layer()
+            # 접속 중인 채팅 소켓에서 나간 사용자의 접속 상태 정리
+            async_to_sync(channel_layer.group_send)(
+                f"chat_{room_id}", {"type": "member_left", "user_id": request.user.id}
+            )
+
             remaining_members = RoomMember.objects.filter(room=room)
             member_count = remaining_members.count()
 
@@ -700,14 +718,14 @@ class LeaveRoomAPIView(APIView):
             if member_count == 0:
                 room.is_active = False
                 room.save()
+                stats.room_deactivated()
 
                 try:
-                    from channels.layers import get_channel_layer
-                    from asgiref.sync import async_to_sync
-                    
-                    channel_layer = get_channel_layer()
                     async_to_sync(channel_layer.group_send)(
-                        "global",
+                        f"chat_{room_id}", {"type": "room_deactivated", "room_id": room_id}
+                    )
+                    async_to_sync(channel_layer.group_send)(
+                        topics.group_name(topics.DIRECTORY),
                         {
                             "type": "room_created",
                             "room": {"id": room_id, "deactivated": True},
@@ -729,18 +747,7 @@ class LeaveRoomAPIView(APIView):
                     first_member.save()
 
                 try:
-                    from asgiref.sync import async_to_sync
-                    from channels.layers import get_channel_layer
-
-                    member_count = RoomMember.objects.filter(room_id=room_id).count()
-                    async_to_sync(channel_layer.group_send)(
-                        "global",
-                        {
-                            "type": "room_member_update",
-                            "room_id": room_id,
-                            "member_count": member_count
-                        }
-                    )
+                    metrics.notify(metrics.room_members_changed, room_id)
                 except Exception as e:
                     print(f"퇴장 시 글로벌 WebSocket 브로드캐스트 오류: {e}")
                 return Response({
@@ -775,7 +782,7 @@ class RoomInfoAPIView(APIView):
 
         # 방 통계 정보 계산
         current_members = RoomMember.objects.filter(room=room).count()
-        online_members = RoomMember.objects.filter(room=room, is_currently_in_room=True).count()
+        online_members = presence.online_count(room.id)
 
         return Response({
             "success": True,
@@ -801,76 +808,44 @@ class MarkAsReadAPIView(APIView):
 
     def post(self, request, room_id):
         try:
-            room = ChatRoom.objects.get(id=room_id)
             user = request.user
-            member = RoomMember.objects.get(room=room, user=user)
+            member = RoomMember.objects.select_related('room').get(room_id=room_id, user=user)
+            previous_read_seq = member.last_read_seq
             
-            # 안 읽은 메시지 찾기
-            last_read_time = (
-                member.last_read_message.created_at 
-                if member.last_read_message 
-                else timezone.make_aware(datetime.min)
-            )
-            unread_messages = ChatMessage.objects.filter(
-                room=room,
-                created_at__gt=last_read_time,
-                user__isnull=False  # 시스템 메시지 제외
-            ).order_by('created_at')
+            # 안 읽은 메시지 전체를 한 번에 읽음 처리
+            updated_messages = as_read_updates(mark_read(room_id, [user.id]))
             
-            processed_count = 0
-            updated_messages = []
+            presence.touch(room_id, user.id)
+            member = RoomMember.objects.select_related('room').get(pk=member.pk)
+            processed_count = member.last_read_seq - previous_read_seq
             
-            if unread_messages.exists():
-                latest_message = unread_messages.latest('created_at')
-                
-                # 각 메시지 읽음 처리
-                for message in unread_messages:
-                    message.mark_as_read_by(user)
-                    processed_count += 1
-                    
-                    message.refresh_from_db()
-                    updated_messages.append({
-                        'id': message.id,
-                        'unread_count': message.unread_count,
-                        'is_read_by_all': message.is_read_by_all
-                    })
-                
-                # 멤버의 마지막 읽은 메시지 업데이트
-                member.last_read_message = latest_message
-                member.last_seen = timezone.now()
-                member.save()
-                
-                # WebSocket으로 실시간 브로드캐스트
-                if updated_messages:
-                    from channels.layers import get_channel_layer
-                    from asgiref.sync import async_to_sync
-                    
-                    channel_layer = get_channel_layer()
-                    async_to_sync(channel_layer.group_send)(
-                        f"chat_{room_id}",
-                        {
-                            "type": "messages_read_count_update",
-                            "updated_messages": updated_messages,
-                            "reader_username": user.username
-                        }
-                    )
-                    
-                    # 글로벌 WebSocket으로도 안읽은 수 업데이트 브로드캐스트
-                    final_unread_count = ChatMessage.objects.filter(
-                        room=room,
-                        created_at__gt=latest_message.created_at,
-                        user__isnull=False,
-                        is_deleted=False
-                    ).count()
-                    
-                    async_to_sync(channel_layer.group_send)(
-                        f"user_{user.id}_global",
-                        {
-                            "type": "unread_count_update",
-                            "room_id": room_id,
-                            "unread_count": final_unread_count
-                        }
-                    )
+            from channels.layers import get_channel_layer
+            from asgiref.sync import async_to_sync
+            
+            channel_layer = get_channel_layer()
+            
+            # WebSocket으로 실시간 브로드캐스트
+            if updated_messages:
+                async_to_sync(broadcast.group_send)(
+                    channel_layer,
+                    f"chat_{room_id}",
+                    {
+                        "type": "messages_read_count_update",
+                        "updated_messages": updated_messages,
+                        "reader_username": user.username
+                    }
+                )
+            
+            # 글로벌 WebSocket으로도 안읽은 수 업데이트 브로드캐스트
+            if processed_count:
+                async_to_sync(channel_layer.group_send)(
+                    f"user_{user.id}_global",
+                    {
+                        "type": "unread_count_update",
+                        "room_id": room_id,
+                        "unread_count": member.unread_messages_count
+                    }
+                )
             
             return Response({
                 'success': True,
@@ -900,15 +875,11 @@ class DisconnectRoomAPIView(APIView):
     
     def post(self, request, room_id):
         try:
-            room = ChatRoom.objects.get(id=room_id, is_active=True)
-            member = RoomMember.objects.get(room=room, user=request.user)
-            
-            # 실시간 접속 상태만 변경
-            member.is_currently_in_room = False
-            member.last_seen = timezone.now()
-            member.save()
+            member = RoomMember.objects.get(room_id=room_id, room__is_active=True, user=request.user)
             
-            online_count = RoomMember.objects.filter(room=room, is_currently_in_room=True).count()
+            # 실시간 접속 상태는 WebSocket 연결 종료 시 정리되므로 마지막 접속 시각만 기록
+            presence.touch(member.room_id, request.user.id)
+            online_count = presence.online_count(member.room_id)
             
             return Response({
                 "success": True,
@@ -941,38 +912,8 @@ class CreateReactionAPIView(APIView):
 
             message = get_object_or_404(ChatMessage, id=message_id)
 
-            # 기존 반응 확인
-            existing_reaction = MessageReaction.objects.filter(
-                message=message, user=request.user
-            ).first()
-
-            if existing_reaction:
-                if existing_reaction.reaction_type == reaction_type:
-                    # 동일한 리액션이면 제거
-                    existing_reaction.delete()
-                    action = "removed"
-                else:
-                    # 다른 리액션이면 업데이트
-                    existing_reaction.reaction_type = reaction_type
-                    existing_reaction.save()
-                    action = "updated"
-            else:
-                # 새로운 리액션 추가
-                MessageReaction.objects.create(
-                    message=message,
-                    user=request.user,
-                    reaction_type=reaction_type
-                )
-                action = "added"
-            
-            # 모든 반응 타입별 개수 계산
-            reaction_counts = {}
-            for choice_key, choice_value in MessageReaction.REACTION_CHOICES:
-                count = MessageReaction.objects.filter(
-                    message=message,
-                    reaction_type=choice_key
-                ).count()
-                reaction_counts[choice_key] = count
+            # 반응 변경과 카운터 갱신을 한 트랜잭션에서 처리, 갱신된 카운터 반환
+            action, reaction_counts = toggle_reaction(message, request.user, reaction_type)
             
             # WebSocket으로 실시간 업데이트 브로드캐스트
             try:
@@ -980,9 +921,10 @@ class CreateReactionAPIView(APIView):
                 from asgiref.sync import async_to_sync
                 
                 channel_layer = get_channel_layer()
-                room_id = message.room.id
+                room_id = message.room_id
                 
-                async_to_sync(channel_layer.group_send)(
+                async_to_sync(broadcast.group_send)(
+                    channel_layer,
                     f"chat_{room_id}",
                     {
                         "type": "reaction_update",
@@ -1017,24 +959,12 @@ class ReactionAPIView(APIView):
     def get(self, request, message_id):
         try:
             message = get_object_or_404(ChatMessage, id=message_id)
-            
-            reaction_counts = {}
-            user_reaction = None
-
-            # 모든 반응 타입별 개수 및 사용자 반응 확인
-            for choice_key, choice_value in MessageReaction.REACTION_CHOICES:
-                reactions = MessageReaction.objects.filter(
-                    message=message,
-                    reaction_type=choice_key
-                ).select_related('user')
-                
-                count = reactions.count()
-                reaction_counts[choice_key] = count
-                
-                # 현재 사용자가 이 반응을 했는지 확인
-                user_reacted = reactions.filter(user=request.user).exists()
-                if user_reacted:
-                    user_reaction = choice_key
+
+            # 반응 개수는 메시지 카운터에서, 사용자 반응은 한 번의 조회로 확인
+            reaction_counts = message.reaction_counts
+            user_reaction = MessageReaction.objects.filter(
+                message=message, user=request.user
+            ).values_list("reaction_type", flat=True).first()
             
             return JsonResponse({
                 'reaction_counts': reaction_counts,
@@ -1101,37 +1031,30 @@ class FileUploadAPIView(APIView):
             from asgiref.sync import async_to_sync
 
             channel_layer = get_channel_layer()
-            async_to_sync(channel_layer.group_send)(
-                f"chat_{room_id}",
-                {
-                    'type': 'file_message',
-                    'message_id': chat_message.id,
-                    'username': user.username,
-                    'user_id': user.id,
-                    'file_name': chat_message.file_name,
-                    'file_size': chat_message.file_size,
-                    'file_size_human': chat_message.file_size_human,
-                    'file_url': chat_message.file.url if chat_message.file else None,
-                    'message_type': message_type,
-                    'timestamp': chat_message.created_at.isoformat(),
-                    'content': None,
-                    'is_image': message_type == 'image'
-                }
-            )
+            file_event = {
+                'type': 'file_message',
+                'message_id': chat_message.id,
+                'username': user.username,
+                'user_id': user.id,
+                'file_name': chat_message.file_name,
+                'file_size': chat_message.file_size,
+                'file_size_human': chat_message.file_size_human,
+                'file_url': chat_message.file.url if chat_message.file else None,
+                'message_type': message_type,
+                'timestamp': chat_message.created_at.isoformat(),
+                'content': None,
+                'is_image': message_type == 'image'
+            }
+            # 재연결한 클라이언트가 놓친 이벤트를 받을 수 있도록 방 링 버퍼에 기록
+            try:
+                replay.record(room.id, [broadcast.file_frame(file_event)])
+            except Exception as e:
+                print(f"재전송 버퍼 기록 오류: {e}")
+            async_to_sync(broadcast.group_send)(channel_layer, f"chat_{room_id}", file_event)
 
-            members = RoomMember.objects.filter(room=room).select_related('user', 'last_read_message')
+            members = RoomMember.objects.filter(room=room).select_related('user', 'room')
             for member in members:
-                last_read_time = (
-                    member.last_read_message.created_at 
-                    if member.last_read_message 
-                    else timezone.make_aware(datetime.min)
-                )
-                unread_count = ChatMessage.objects.filter(
-                    room=room,
-                    created_at__gt=last_read_time,
-                    user__isnull=False,
-                    is_deleted=False,
-                ).count()
+                unread_count = member.unread_messages_count
                 async_to_sync(channel_layer.group_send)(
                     f"user_{member.user.id}_global",
                     {
@@ -0,0 +1,138 @@
+"""
+WebSocket permessage-deflate 압축을 지원하는 Daphne 서버
+
+daphne 명령 대신 실행 (옵션은 daphne와 동일)::
+
+    python -m config.server -b 0.0.0.0 -p 8000 config.asgi:application
+
+압축 여부/기준 크기 등은 settings의 WS_COMPRESSION* 값으로 설정
+송신 버퍼가 WS_SEND_BUFFER_HIGH_WATER를 넘은 연결은 트랜스포트가 다시 쓸 수 있다고 알릴 때까지 send가 대기하므로 앱의 송신 큐 제한(chat.protocol)이 동작
+"""
+
+import asyncio
+import os
+
+from autobahn.websocket.compress import (
+    PerMessageDeflateOffer,
+    PerMessageDeflateOfferAccept,
+)
+from daphne import server
+from daphne.cli import CommandLineInterface
+from daphne.ws_protocol import WebSocketProtocol
+from django.conf import settings
+from twisted.internet.interfaces import IPushProducer
+from zope.interface import implementer
+
+# chat.protocol이 연결을 끊을 때 쓰는 RFC 6455 종료 코드 (1008: 수신 속도 초과, 1009: 프레임 크기 초과, 1013: 송신이 밀림)
+FLOW_CONTROL_CLOSE_CODES = (1008, 1009, 1013)
+
+
+@implementer(IPushProducer)
+class SendGate:
+    """
+    소켓 송신 버퍼 상태를 받는 스트리밍 프로듀서 (Twisted producer/consumer API)
+    버퍼가 bufferSize를 넘으면 트랜스포트가 pauseProducing, 다 비우면 resumeProducing을 호출
+    연결이 끊기면 stopProducing으로 대기 중인 전송을 풀어 줌
+    """
+
+    def __init__(self):
+        self.writable = asyncio.Event()
+        self.writable.set()
+
+    def pauseProducing(self):
+        self.writable.clear()
+
+    def resumeProducing(self):
+        self.writable.set()
+
+    def stopProducing(self):
+        self.writable.set()
+
+    async def wait(self):
+        await self.writable.wait()
+
+
+class BackpressureWebSocketProtocol(WebSocketProtocol):
+    """송신 버퍼 상한(WS_SEND_BUFFER_HIGH_WATER)을 넘으면 SendGate가 닫히도록 트랜스포트에 프로듀서 등록"""
+
+    send_gate = None
+
+    def connectionMade(self):
+        super().connectionMade()
+        # HTTP 업그레이드로 넘겨받은 트랜스포트에는 Daphne의 HTTPChannel이 프로듀서로 남아 있으므로 해제 후 교체
+        self.transport.unregisterProducer()
+        self.transport.bufferSize = settings.WS_SEND_BUFFER_HIGH_WATER
+        self.send_gate = SendGate()
+        self.transport.registerProducer(self.send_gate, True)
+
+    def serverClose(self, code=None):
+        # autobahn의 sendClose는 1000과 3000~4999만 허용하므로 흐름 제어 종료 코드는 close 프레임을 직접 전송
+        if code in FLOW_CONTROL_CLOSE_CODES and self.state == self.STATE_OPEN:
+            self.sendCloseFrame(code=code)
+            return
+        super().serverClose(code)
+
+
+class CompressedWebSocketProtocol(BackpressureWebSocketProtocol):
+    """압축이 협상된 연결에서도 WS_COMPRESSION_MIN_SIZE보다 작은 프레임은 압축하지 않고 전송"""
+
+    def sendMessage(self, payload, isBinary=False, fragmentSize=None, sync=False, doNotCompress=False):
+        if len(payload) < self.factory.compression_min_size:
+            doNotCompress = True
+        return super().sendMessage(payload, isBinary, fragmentSize, sync, doNotCompress)
+
+
+def accept_deflate(offers):
+    """클라이언트가 제안한 permessage-deflate를 수락 (창 크기/메모리 레벨은 설정값, 클라이언트 요청보다 크지 않게)"""
+    for offer in offers:
+        if not isinstance(offer, PerMessageDeflateOffer):
+            continue
+        window_bits = settings.WS_COMPRESSION_WINDOW_BITS
+        if offer.request_max_window_bits:
+            window_bits = min(window_bits, offer.request_max_window_bits)
+        return PerMessageDeflateOfferAccept(
+            offer,
+            window_bits=window_bits,
+            mem_level=settings.WS_COMPRESSION_MEM_LEVEL,
+        )
+    return None
+
+
+class Server(server.Server):
+    """WebSocket 팩토리가 만들어진 뒤(리액터 시작 전) 압축/프레임 크기 설정을 적용하는 Daphne 서버"""
+
+    def __init__(self, *args, ready_callable=None, **kwargs):
+        def ready():
+            self.configure_websockets()
+            if ready_callable:
+                ready_callable()
+
+        super().__init__(*args, ready_callable=ready, **kwargs)
+
+    def configure_websockets(self):
+        self.ws_factory.setProtocolOptions(maxMessagePayloadSize=settings.WS_MAX_FRAME_BYTES)
+        self.ws_factory.protocol = BackpressureWebSocketProtocol
+        self.configure_compression()
+
+    async def handle_reply(self, protocol, message):
+        """송신 버퍼가 가득 찬 연결은 트랜스포트가 프로듀서를 재개할 때까지(또는 연결이 끊길 때까지) 전송 대기"""
+        gate = getattr(protocol, "send_gate", None)
+        if gate is not None and message.get("type") == "websocket.send":
+            await gate.wait()
+        await super().handle_reply(protocol, message)
+
+    def configure_compression(self):
+        if not settings.WS_COMPRESSION:
+            return
+        self.ws_factory.protocol = CompressedWebSocketProtocol
+        self.ws_factory.compression_min_size = settings.WS_COMPRESSION_MIN_SIZE
+        self.ws_factory.setProtocolOptions(perMessageCompressionAccept=accept_deflate)
+
+
+class CompressedCommandLineInterface(CommandLineInterface):
+    server_class = Server
+
+
+if __name__ == "__main__":
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+    CompressedCommandLineInterface.entrypoint()
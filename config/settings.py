@@ -39,6 +39,14 @@ ALLOWED_HOSTS = ["*"]
 VAPID_PUBLIC_KEY = os.environ.get("REACT_APP_VAPID_PUBLIC_KEY")
 VAPID_PRIVATE_KEY = os.environ.get("REACT_APP_VAPID_PRIVATE_KEY")
 
+# Web push dispatcher (chat.push)
+PUSH_WORKERS = env.int("PUSH_WORKERS", default=8)  # 동시 발송 워커 수
+PUSH_QUEUE_SIZE = env.int("PUSH_QUEUE_SIZE", default=1000)  # 대기 작업 최대 수
+PUSH_PER_ENDPOINT_CONCURRENCY = env.int("PUSH_PER_ENDPOINT_CONCURRENCY", default=4)  # 푸시 서비스별 동시 발송 수
+PUSH_MAX_RETRIES = env.int("PUSH_MAX_RETRIES", default=3)
+PUSH_RETRY_BACKOFF = env.float("PUSH_RETRY_BACKOFF", default=0.5)  # 초, 재시도마다 2배
+PUSH_TIMEOUT = env.float("PUSH_TIMEOUT", default=10)
+
 # Application definition
 INSTALLED_APPS = [
     # Unfold Admin & Extensions - https://unfoldadmin.com/docs/installation/quickstart/
@@ -59,6 +67,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     # Development / Debugging tools
     'django_extensions',
     'django_crontab',
@@ -164,7 +173,11 @@ TIME_ZONE = 'Asia/Seoul'
 USE_I18N = True
 USE_TZ = True
 
-CRONJOBS = []
+CRONJOBS = [
+    ('* * * * *', 'chat.cron.flush_presence_last_seen'),
+    ('*/10 * * * *', 'chat.cron.reconcile_server_stats'),
+    ('* * * * *', 'chat.cron.reap_stale_presence'),
+]
 
 INTERNAL_IPS = [
     # "localhost",
@@ -256,6 +269,64 @@ CHANNEL_LAYERS = {
     },
 }
 
+# Cache - 공개 방 목록(chat.directory) 등 프로세스 간 공유 캐시
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": env("CACHE_REDIS_URL", default="redis://127.0.0.1:6379/1"),
+        "KEY_PREFIX": "chat",
+    },
+}
+ROOM_DIRECTORY_CACHE_TIMEOUT = env.int("ROOM_DIRECTORY_CACHE_TIMEOUT", default=60)  # 초
+
+# Message ingestion (chat.ingest) - 방별로 잠깐 모아서 한 번에 저장
+INGEST_BATCH_WINDOW_MS = env.int("INGEST_BATCH_WINDOW_MS", default=5)  # 밀리초, 첫 메시지 이후 대기 시간
+INGEST_MAX_BATCH = env.int("INGEST_MAX_BATCH", default=100)  # 배치당 최대 메시지 수
+
+# Group broadcast (chat.broadcast) - 방 이벤트를 보내는 쪽에서 한 번만 JSON/msgpack 인코딩
+BROADCAST_PREENCODED = env.bool("BROADCAST_PREENCODED", default=True)
+GLOBAL_MAX_TOPICS = env.int("GLOBAL_MAX_TOPICS", default=500)  # 글로벌 소켓 연결당 최대 구독 토픽 수 (chat.topics)
+METRIC_BROADCAST_INTERVAL = env.int("METRIC_BROADCAST_INTERVAL", default=1)  # 초, 온라인 수/방 인원수 브로드캐스트 최소 간격 (chat.metrics)
+
+# WebSocket compression (config.server) - permessage-deflate, 기준 크기보다 작은 프레임은 압축하지 않음
+WS_COMPRESSION = env.bool("WS_COMPRESSION", default=True)
+WS_COMPRESSION_MIN_SIZE = env.int("WS_COMPRESSION_MIN_SIZE", default=128)  # 바이트
+WS_COMPRESSION_WINDOW_BITS = env.int("WS_COMPRESSION_WINDOW_BITS", default=12)  # 9~15, 연결당 압축 메모리 = 2^(bits+2) + 2^(mem_level+9)
+WS_COMPRESSION_MEM_LEVEL = env.int("WS_COMPRESSION_MEM_LEVEL", default=5)  # 1~9
+
+# Connection flow control (chat.protocol, chat.flowcontrol) - 연결별 수신 속도 제한, 송신 큐 제한
+WS_MAX_FRAME_BYTES = env.int("WS_MAX_FRAME_BYTES", default=65536)  # 수신 프레임 최대 크기, 넘으면 1009로 종료
+WS_RATE_LIMITS = {  # 메시지 타입: (초당 허용 수, 최대 연속 허용 수), "*"는 그 외 타입 공용
+    "text": (5, 20),
+    "mark_read": (20, 50),
+    "user_join": (1, 5),
+    "user_leave": (1, 5),
+    "resume": (1, 3),
+    "*": (10, 30),
+}
+WS_RATE_LIMIT_EVICT_AFTER = env.int("WS_RATE_LIMIT_EVICT_AFTER", default=200)  # 제한 초과 프레임 수, 넘으면 1008로 종료
+WS_MALFORMED_EVICT_AFTER = env.int("WS_MALFORMED_EVICT_AFTER", default=20)  # 해석할 수 없는 프레임 수, 넘으면 1008로 종료
+WS_OUTBOUND_QUEUE_SIZE = env.int("WS_OUTBOUND_QUEUE_SIZE", default=256)  # 연결별 송신 대기 프레임 수
+WS_OUTBOUND_POLICY = env("WS_OUTBOUND_POLICY", default="disconnect")  # 송신 큐가 가득 차면 drop(버림) 또는 disconnect(1013으로 종료)
+WS_SEND_BUFFER_HIGH_WATER = env.int("WS_SEND_BUFFER_HIGH_WATER", default=262144)  # 바이트, config.server 소켓 송신 버퍼 상한
+
+# Presence registry (chat.presence) - 기본값은 채널 레이어와 같은 Redis
+PRESENCE_REDIS_URL = env("PRESENCE_REDIS_URL", default=None)
+PRESENCE_TTL = env.int("PRESENCE_TTL", default=90)  # 초, 하트비트가 끊기면 이 시간 뒤 접속 해제로 간주
+
+# WebSocket heartbeat (chat.protocol) - 서버 ping에 클라이언트가 pong(또는 아무 프레임)으로 응답
+WS_PING_INTERVAL = env.int("WS_PING_INTERVAL", default=25)  # 초, ping 주기 (응답 확인된 연결만 접속 만료 시각 연장)
+WS_PING_TIMEOUT = env.int("WS_PING_TIMEOUT", default=60)  # 초, 이 시간 동안 클라이언트 프레임이 없으면 연결 종료
+
+# 재연결 메시지 재전송 (chat.replay) - 방별 최근 메시지 링 버퍼, presence Redis 사용
+REPLAY_BUFFER_SIZE = env.int("REPLAY_BUFFER_SIZE", default=200)  # 방별로 보관할 최근 메시지 프레임 수
+REPLAY_BUFFER_TTL = env.int("REPLAY_BUFFER_TTL", default=3600)  # 초, 메시지가 없는 방의 버퍼 보관 시간
+REPLAY_DB_LIMIT = env.int("REPLAY_DB_LIMIT", default=200)  # 버퍼보다 오래된 공백을 DB에서 재전송할 최대 메시지 수
+
+# 메시지 첫 페이지 캐시 (chat.history) - 방별 최신 페이지를 presence Redis에 보관, 메시지/반응/읽음 변경 시 함께 갱신
+HISTORY_CACHE_ENABLED = env.bool("HISTORY_CACHE_ENABLED", default=True)
+HISTORY_CACHE_TTL = env.int("HISTORY_CACHE_TTL", default=600)  # 초, 변경이 없는 방의 캐시 보관 시간
+
 CORS_ALLOW_ALL_ORIGINS = True
 CSRF_TRUSTED_ORIGINS = ['http://127.0.0.1:8000']
 